@@ -1,172 +1,437 @@
 # agents/gemini_chatbot_agent.py
 from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.documents import Document
 from fastapi import HTTPException
-import google.generativeai as genai
 import os
+import shutil
+import threading
 import uuid
-from typing import Dict, Optional, List
-from config.settings import GOOGLE_API_KEY, PHYSIOTHERAPY_PROMPT, BICEP_CURL_PROMPT
+from typing import AsyncIterator, Optional, List, Tuple
+from config.settings import GOOGLE_API_KEY, PHYSIOTHERAPY_PROMPT, BICEP_CURL_PROMPT, SHARED_INDEX_PATH, RETRIEVAL_K, SESSION_INDEX_PATH, KEYWORD_CONFIDENCE, MAX_UPLOAD_MB, UPLOAD_CHUNK_BYTES, INGESTION_PROCESS_WORKERS
+from utils import gemini_clients
+from utils.concurrency import run_blocking, llm_semaphore
+from utils.embedding_scheduler import embedding_scheduler
+from utils.embedding_cache import file_sha256
+from utils.pdf_pipeline import get_pool, iter_pdf_chunks
+from utils.answer_cache import answer_cache
+from utils.single_flight import answer_flight, summary_flight
+from yantra_common.instrumentation import log_event, record_cache, record_usage, timed
+from utils.context_builder import build_context
+from utils.keyword_index import KeywordIndex, reciprocal_rank_fusion, retrieval_stats
+from agents.knowledge_base import get_knowledge_base, chunk_hash
+from agents import index_store
+from agents.session_cache import AgentCache
+from agents.session_index import SessionIndex
+
+# Session file pointing at the shared index for the document's content hash
+DOCUMENT_HASH_FILE = "document.sha256"
+# Document summary persisted beside the index when the document is ingested
+SUMMARY_FILE = "summary.txt"
+NO_ANSWER_MESSAGE = "I apologize, but I couldn't generate a response. Please try rephrasing your question."
+# Per-upload copies of the PDF (hard links) that ingestion jobs parse
+UPLOAD_FILE_PREFIX = "upload-"
+# Rough fixed cost of an agent object before any index is loaded
+AGENT_BASE_BYTES = 16 * 1024
+
+def vector_store_path_for(session_id: str, document_hash: Optional[str]) -> str:
+    if document_hash:
+        return os.path.join(SHARED_INDEX_PATH, document_hash)
+    return f"backend/sessions/{session_id}/vector_store"
+
+def split_pdf(pdf_path: str) -> List[Document]:
+    """Parse a PDF and split it into chunks sized for Gemini's context window.
+
+    Page batches are parsed in parallel across the shared process pool.
+    """
+    batches = iter_pdf_chunks(pdf_path, executor=get_pool(), max_in_flight=INGESTION_PROCESS_WORKERS)
+    return [chunk for batch in batches for chunk in batch]
+
 
 class GeminiChatbotAgent:
     def __init__(self, session_id: str, pdf_path: str):
         self.session_id = session_id
         self.pdf_path = pdf_path
-        self.vector_store = None
+        self.vector_store = None  # overlay: only chunks not already in the knowledge base
         self.document_chunks = []
+        self.document_hash = self._read_document_hash()
+        self.knowledge_base = get_knowledge_base()
+        self._index_loaded = False
+        self._index_lock = threading.Lock()
+        self._layout = []
+        # False while chunks are still being added during ingestion
+        self.index_complete = True
+        self.keyword_index: Optional[KeywordIndex] = None
+        self.memory_bytes = AGENT_BASE_BYTES
         
-        # Configure Google AI
         if not GOOGLE_API_KEY:
             raise HTTPException(status_code=500, detail="Google API key not configured")
         
-        genai.configure(api_key=GOOGLE_API_KEY)
-        
-        # Use Google Gemini embeddings - optimized for latest version
-        try:
-            self.embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001",
-                google_api_key=GOOGLE_API_KEY,
-                task_type="retrieval_document"  # Optimized for document retrieval
-            )
-        except Exception as e:
-            # Fallback for older versions
-            self.embeddings = GoogleGenerativeAIEmbeddings(
-                model="models/embedding-001",
-                google_api_key=GOOGLE_API_KEY
-            )
-        
-        # Initialize Gemini model
-        self.model = genai.GenerativeModel(
-            "gemini-2.0-flash",
-            generation_config=genai.GenerationConfig(
-                temperature=0.7,
-                top_p=0.8,
-                top_k=40,
-                max_output_tokens=2048,
-            )
-        )
-        
-    def load_document(self):
-        """Load and process the PDF document with optimized chunking for Gemini"""
-        if not os.path.exists(self.pdf_path):
-            raise HTTPException(status_code=404, detail="PDF document not found.")
+        # Shared, process-wide clients (configured and connected once);
+        # embeddings go through the content-addressed cache
+        self.embeddings = gemini_clients.get_cached_embeddings()
+        self.model = gemini_clients.get_chat_model()
+    
+    @property
+    def vector_store_path(self) -> str:
+        """Index shared by every session with the same document, or the legacy per-session store"""
+        return vector_store_path_for(self.session_id, self.document_hash)
+    
+    def _read_document_hash(self) -> Optional[str]:
+        hash_path = os.path.join(os.path.dirname(self.pdf_path), DOCUMENT_HASH_FILE)
+        if os.path.exists(hash_path):
+            with open(hash_path) as f:
+                return f.read().strip() or None
+        return None
+    
+    def assign_document_hash(self) -> str:
+        """Hash the session's PDF and point the session at the matching shared index"""
+        self.document_hash = file_sha256(self.pdf_path)
+        with open(os.path.join(os.path.dirname(self.pdf_path), DOCUMENT_HASH_FILE), "w") as f:
+            f.write(self.document_hash)
+        return self.document_hash
+    
+    def load_shared_index(self) -> bool:
+        """Reuse an index already built for an identical document, if there is one"""
+        if not self.document_hash or not index_store.exists(self.vector_store_path):
+            return False
+        if not self._load_vector_store():
+            return False
+        log_event("shared_index_reused", session_id=self.session_id, document_hash=self.document_hash[:12])
+        return True
         
-        try:
-            # Load PDF
-            loader = PyPDFLoader(self.pdf_path)
-            documents = loader.load()
-            
-            # Optimize text splitting for Gemini's context window
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1500,  # Larger chunks work better with Gemini
-                chunk_overlap=300,  # More overlap for better context
-                separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]
-            )
-            
-            # Split documents
-            self.document_chunks = text_splitter.split_documents(documents)
-            
-            # Create vector store with Gemini embeddings
-            self.vector_store = FAISS.from_documents(
-                self.document_chunks, 
-                self.embeddings
-            )
-            
-            # Save vector store for persistence
-            self._save_vector_store()
-            
-            print(f"✅ Processed {len(self.document_chunks)} document chunks")
+    def start_index(self):
+        """Reset the in-memory index before chunks are added batch by batch"""
+        with self._index_lock:
+            self.document_chunks = []
+            self.vector_store = None
+            self._layout = []
+            self.keyword_index = None
+            self.index_complete = False
+            self._index_loaded = True
+    
+    def add_chunks(self, chunks: List[Document], vectors: List[List[float]]):
+        """Add embedded chunks to the overlay; they are searchable as soon as this returns.
+
+        Chunks already present in the shared knowledge base are referenced
+        by hash instead of being indexed again. Only the new chunks are
+        indexed; memory is measured once in ``finish_index``.
+        """
+        overlay_chunks, overlay_vectors = [], []
+        with self._index_lock:
+            overlay_size = len(self.vector_store.index_to_docstore_id) if self.vector_store is not None else 0
+            for chunk, vector in zip(chunks, vectors):
+                if self.knowledge_base is not None and self.knowledge_base.lookup(chunk.page_content) is not None:
+                    self._layout.append(["base", chunk_hash(chunk.page_content)])
+                else:
+                    self._layout.append(["overlay", overlay_size + len(overlay_chunks)])
+                    overlay_chunks.append(chunk)
+                    overlay_vectors.append(vector)
             
-        except Exception as e:
-            print(f"❌ Error processing PDF: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+            if overlay_chunks:
+                text_embeddings = zip([chunk.page_content for chunk in overlay_chunks], overlay_vectors)
+                metadatas = [chunk.metadata for chunk in overlay_chunks]
+                if self.vector_store is None:
+                    self.vector_store = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas)
+                else:
+                    self.vector_store.add_embeddings(text_embeddings, metadatas=metadatas)
+            self.document_chunks.extend(chunks)
+            if self.keyword_index is None:
+                self.keyword_index = KeywordIndex()
+            self.keyword_index.add(chunks)
     
-    def _save_vector_store(self):
-        """Save vector store to disk for persistence"""
-        vector_store_path = f"backend/sessions/{self.session_id}/vector_store"
-        os.makedirs(os.path.dirname(vector_store_path), exist_ok=True)
-        
-        if self.vector_store:
-            try:
-                self.vector_store.save_local(vector_store_path)
-                print(f"✅ Vector store saved for session {self.session_id}")
-            except Exception as e:
-                print(f"❌ Error saving vector store: {str(e)}")
+    def finish_index(self):
+        """Persist the completed index"""
+        self._save_vector_store(self._layout)
+        self.index_complete = True
+        self._measure_memory()
+        shared = sum(1 for source, _ in self._layout if source == "base")
+        log_event("document_indexed", session_id=self.session_id, chunks=len(self.document_chunks), shared=shared)
+    
+    def _save_vector_store(self, layout: list):
+        """Save the overlay and chunk layout as a new index version"""
+        try:
+            index_store.save(self.vector_store_path, self.vector_store, layout)
+            log_event("vector_store_saved", session_id=self.session_id)
+        except Exception as e:
+            log_event("vector_store_save_failed", level="error", session_id=self.session_id, error=str(e))
     
     def _load_vector_store(self):
-        """Load vector store from disk"""
-        vector_store_path = f"backend/sessions/{self.session_id}/vector_store"
+        """Load the overlay from disk and restore the document's chunks"""
+        vector_store_path = self.vector_store_path
         
         try:
-            if os.path.exists(vector_store_path):
-                self.vector_store = FAISS.load_local(
-                    vector_store_path, 
-                    self.embeddings,
-                    allow_dangerous_deserialization=True  # Required for FAISS loading
-                )
-                print(f"✅ Vector store loaded for session {self.session_id}")
+            if index_store.exists(vector_store_path):
+                legacy = index_store.is_legacy(vector_store_path)
+                vector_store, layout = index_store.load(vector_store_path, self.embeddings)
+                overlay_docs = index_store.overlay_documents(vector_store)
+                if layout is None:
+                    # Oldest stores: every chunk lives in the session's own index
+                    layout = [["overlay", i] for i in range(len(overlay_docs))]
+                self.vector_store = vector_store
+                self.document_chunks = self._chunks_from_layout(layout, overlay_docs)
+                
+                self.keyword_index = KeywordIndex(self.document_chunks)
+                self._index_loaded = True
+                self._measure_memory()
+                log_event("vector_store_loaded", session_id=self.session_id)
+                if legacy:
+                    # Rewrite pickle-based stores once so later loads are fast and safe
+                    self._save_vector_store(layout)
                 return True
         except Exception as e:
-            print(f"❌ Error loading vector store: {str(e)}")
+            log_event("vector_store_load_failed", level="error", session_id=self.session_id, error=str(e))
         
         return False
+    
+    def _measure_memory(self):
+        """Estimate memory held by this agent alone (the knowledge base is shared)"""
+        size = AGENT_BASE_BYTES
+        if self.vector_store is not None:
+            index = self.vector_store.index
+            size += index.ntotal * index.d * 4
+            size += sum(
+                len(self.vector_store.docstore.search(doc_id).page_content)
+                for doc_id in self.vector_store.index_to_docstore_id.values()
+            )
+        # References into the chunk list, whether overlay or base
+        size += len(self.document_chunks) * 64
+        if self.keyword_index is not None:
+            size += sum(self.keyword_index.doc_lengths) * 16
+        self.memory_bytes = size
+
+    def _chunks_from_layout(self, layout: list, overlay_docs: List[Document]) -> List[Document]:
+        chunks = []
+        for source, ref in layout:
+            if source == "overlay":
+                chunks.append(overlay_docs[ref])
+            elif self.knowledge_base is not None:
+                base_id = self.knowledge_base.lookup_hash(ref)
+                if base_id is not None:
+                    chunks.append(self.knowledge_base.chunks[base_id])
+        return chunks
 
-    def get_answer(self, query: str, prompt_template: str = PHYSIOTHERAPY_PROMPT) -> str:
-        """Get answer using Gemini with retrieved context"""
-        # Try to load existing vector store first
-        if self.vector_store is None:
+    def _ensure_vector_store(self):
+        """Load the persisted vector store if it is not in memory yet"""
+        if not self._index_loaded:
             if not self._load_vector_store():
                 raise HTTPException(
                     status_code=500, 
                     detail="Document not loaded. Please upload a PDF first."
                 )
+
+    def _retrieve(self, query_embedding: List[float], k: int) -> List[Document]:
+        """Search the session overlay and the shared knowledge base and merge by distance"""
+        results = []
+        with self._index_lock:
+            if self.vector_store is not None:
+                results.extend(self.vector_store.similarity_search_with_score_by_vector(query_embedding, k=k))
+        if self.knowledge_base is not None:
+            results.extend(self.knowledge_base.search(query_embedding, k))
         
-        try:
-            # Search for relevant documents with higher k for better context
-            docs = self.vector_store.similarity_search(query, k=5)
-            
-            # Create rich context from retrieved documents
-            context_parts = []
-            for i, doc in enumerate(docs, 1):
-                context_parts.append(f"Section {i}:\n{doc.page_content}\n")
-            context = "\n".join(context_par
+        # Both indexes use L2 distance over the same embedding model, so scores are comparable
+        results.sort(key=lambda result: result[1])
+        docs, seen = [], set()
+        for doc, _ in results:
+            if doc.page_content not in seen:
+                seen.add(doc.page_content)
+                docs.append(doc)
+            if len(docs) == k:
+                break
+        return docs
 
-            # Use the selected prompt template
-            prompt = prompt_template.format(context=context, query=query)
+    @staticmethod
+    def _build_prompt(docs, query: str, prompt_template: str) -> str:
+        """Create rich context from retrieved documents and fill the prompt template"""
+        # Overlapping and duplicate chunks are merged and the result packed to the token budget
+        context_parts = []
+        for i, passage in enumerate(build_context(docs), 1):
+            context_parts.append(f"Section {i}:\n{passage}\n")
+        context = "\n".join(context_parts)
 
-            # Generate response using Gemini
-            response = self.model.generate_content(prompt)
-            
-            if response.text:
-                return response.text
+        # Use the selected prompt template
+        return prompt_template.format(context=context, query=query)
+
+    @staticmethod
+    def _response_text(response) -> str:
+        if response.text:
+            return response.text
+        return NO_ANSWER_MESSAGE
+
+    @property
+    def cache_scope(self) -> str:
+        """Identity of the indexed document, scoping cached answers"""
+        return self.document_hash or f"session:{self.session_id}"
+
+    def _cache_answer(self, prompt_template: str, query: str, query_embedding: Optional[List[float]], answer: str):
+        # Answers from a partially indexed document would outlive the missing pages
+        if answer != NO_ANSWER_MESSAGE and self.index_complete:
+            answer_cache.store(self.cache_scope, prompt_template, query_embedding, answer, query=query)
+
+    def _keyword_search(self, query: str) -> Tuple[List[Document], bool]:
+        """BM25 results for the query, and whether they are confident enough to use alone"""
+        if self.keyword_index is None:
+            return [], False
+        results, coverage = self.keyword_index.search(query, RETRIEVAL_K)
+        confident = len(results) >= min(RETRIEVAL_K, len(self.keyword_index.docs)) and coverage >= KEYWORD_CONFIDENCE
+        return [doc for doc, _ in results], confident
+
+    def _hybrid_retrieve(self, query_embedding: List[float], keyword_docs: List[Document]) -> List[Document]:
+        """Vector results fused with keyword results by reciprocal rank"""
+        vector_docs = self._retrieve(query_embedding, RETRIEVAL_K)
+        if not keyword_docs:
+            return vector_docs
+        return reciprocal_rank_fusion([vector_docs, keyword_docs], RETRIEVAL_K)
+
+    async def _aprepare(self, query: str, prompt_template: str):
+        """Retrieve context without blocking the event loop.
+
+        Returns (cached answer, None, query embedding) on an answer-cache hit,
+        otherwise (None, prompt, query embedding). The embedding is None when
+        keyword retrieval was confident and the query had not been embedded
+        before; the answer cache then matches the question's text instead.
+        """
+        with timed("keyword_search"):
+            keyword_docs, confident = self._keyword_search(query)
+        with timed("query_embedding"):
+            if confident:
+                query_embedding = await run_blocking(self.embeddings.cached_query_embedding, query)
             else:
-                return "I apologize, but I couldn't generate a response. Please try rephrasing your question."
+                query_embedding = await embedding_scheduler.embed_query(self.embeddings, query)
+        
+        cached = answer_cache.lookup(self.cache_scope, prompt_template, query_embedding, query=query)
+        record_cache("answer", cached is not None)
+        if cached is not None:
+            return cached, None, query_embedding
+        
+        if confident:
+            retrieval_stats["keyword"] += 1
+            docs = keyword_docs
+        else:
+            retrieval_stats["hybrid"] += 1
+            with timed("retrieval"):
+                docs = await run_blocking(self._hybrid_retrieve, query_embedding, keyword_docs)
+        with timed("prompt_build"):
+            prompt = self._build_prompt(docs, query, prompt_template)
+        return None, prompt, query_embedding
+
+    async def aget_answer(self, query: str, prompt_template: str = PHYSIOTHERAPY_PROMPT) -> str:
+        """Answer from Gemini with retrieved context.
+
+        Embedding and generation are awaited; FAISS runs off the event loop.
+        """
+        if not self._index_loaded:
+            await run_blocking(self._ensure_vector_store)
+        
+        try:
+            cached, prompt, query_embedding = await self._aprepare(query, prompt_template)
+            if cached is not None:
+                return cached
+
+            async def generate():
+                async with llm_semaphore:
+                    with timed("llm"):
+                        response = await self.model.generate_content_async(prompt)
+                record_usage(response, gemini_clients.CHAT_MODEL)
+                answer = self._response_text(response)
+                self._cache_answer(prompt_template, query, query_embedding, answer)
+                return answer
+
+            # Identical questions on the same document arriving together share one call
+            return await answer_flight.do(prompt, generate)
                 
         except Exception as e:
-            print(f"❌ Error generating response: {str(e)}")
+            log_event("response_failed", level="error", session_id=self.session_id, error=str(e))
             raise HTTPException(status_code=500, detail=f"Error generating response: {str(e)}")
 
-    def get_document_summary(self) -> str:
-        """Get a summary of the uploaded document"""
-        if not self.document_chunks:
-            return "No document loaded"
+    async def astream_answer(self, query: str, prompt_template: str = PHYSIOTHERAPY_PROMPT) -> AsyncIterator[str]:
+        """Same retrieval and prompt as aget_answer, yielding Gemini's output as it is generated"""
+        if not self._index_loaded:
+            await run_blocking(self._ensure_vector_store)
         
+        try:
+            cached, prompt, query_embedding = await self._aprepare(query, prompt_template)
+            if cached is not None:
+                yield cached
+                return
+
+            parts = []
+            async with llm_semaphore:
+                with timed("llm_stream"):
+                    response = await self.model.generate_content_async(prompt, stream=True)
+                    async for chunk in response:
+                        try:
+                            text = chunk.text
+                        except ValueError:
+                            # Chunks without text parts (e.g. safety or finish metadata)
+                            continue
+                        if text:
+                            parts.append(text)
+                            yield text
+            record_usage(response, gemini_clients.CHAT_MODEL)
+            if not parts:
+                yield NO_ANSWER_MESSAGE
+            else:
+                self._cache_answer(prompt_template, query, query_embedding, "".join(parts))
+                
+        except Exception as e:
+            log_event("response_failed", level="error", session_id=self.session_id, error=str(e))
+            raise HTTPException(status_code=500, detail=f"Error generating response: {str(e)}")
+
+    def _summary_prompt(self) -> str:
         # Get a sample of content from the document
         sample_content = ""
         for chunk in self.document_chunks[:3]:  # First 3 chunks
             sample_content += chunk.page_content + "\n\n"
         
-        prompt = f"""Provide a brief summary of this physiotherapy document based on the following content:
+        return f"""Provide a brief summary of this physiotherapy document based on the following content:
 
 {sample_content}
 
 Summary:"""
-        
+
+    def load_summary(self) -> Optional[str]:
+        """Summary persisted beside the index, shared by sessions with the same document"""
+        summary_path = os.path.join(self.vector_store_path, SUMMARY_FILE)
+        if os.path.exists(summary_path):
+            with open(summary_path, encoding="utf-8") as f:
+                return f.read() or None
+        return None
+    
+    def _save_summary(self, summary: str):
+        os.makedirs(self.vector_store_path, exist_ok=True)
+        with open(os.path.join(self.vector_store_path, SUMMARY_FILE), "w", encoding="utf-8") as f:
+            f.write(summary)
+    
+    async def asummarize(self) -> str:
+        """Generate the document summary once and persist it; raises on failure.
+
+        Concurrent requests for one document share a call.
+        """
+        summary = await run_blocking(self.load_summary)
+        if summary is None:
+            if not self._index_loaded:
+                await run_blocking(self._ensure_vector_store)
+            if not self.document_chunks:
+                raise HTTPException(status_code=400, detail="No document loaded")
+            summary = await summary_flight.do(self.vector_store_path, self._agenerate_summary)
+        return summary
+
+    async def _agenerate_summary(self) -> str:
+        async with llm_semaphore:
+            with timed("llm_summary"):
+                response = await self.model.generate_content_async(self._summary_prompt())
+        record_usage(response, gemini_clients.CHAT_MODEL)
+        if not response.text:
+            raise ValueError("Unable to generate summary")
+        await run_blocking(self._save_summary, response.text)
+        return response.text
+
+    async def aget_document_summary(self) -> str:
+        """Summary of the uploaded document, or a message explaining why there is none"""
         try:
-            response = self.model.generate_content(prompt)
-            return response.text if response.text else "Unable to generate summary"
+            return await self.asummarize()
+        except HTTPException:
+            return "No document loaded"
         except Exception as e:
             return f"Error generating summary: {str(e)}"
 
@@ -175,87 +440,208 @@ class GeminiSessionManager:
     """Enhanced session manager for Gemini-optimized agents"""
     
     def __init__(self):
-        self.sessions: Dict[str, GeminiChatbotAgent] = {}
+        self.sessions = AgentCache()
         self.session_data_path = "backend/sessions"
         os.makedirs(self.session_data_path, exist_ok=True)
+        self.index = SessionIndex(SESSION_INDEX_PATH)
+        self._backfill_index()
     
     def create_session(self) -> str:
         """Create a new session and return session ID"""
         session_id = str(uuid.uuid4())
         session_dir = os.path.join(self.session_data_path, session_id)
         os.makedirs(session_dir, exist_ok=True)
+        self.index.create(session_id)
         
-        print(f"✅ Created new session: {session_id}")
+        log_event("session_created", session_id=session_id)
         return session_id
     
-    def get_agent(self, session_id: str) -> Optional[GeminiChatbotAgent]:
-        """Get or create Gemini chatbot agent for session"""
-        if session_id not in self.sessions:
-            # Check if session directory exists
-            session_dir = os.path.join(self.session_data_path, session_id)
-            if not os.path.exists(session_dir):
-                return None
-            
-            # Check if PDF exists for this session
-            pdf_path = os.path.join(session_dir, "document.pdf")
-            if os.path.exists(pdf_path):
-                self.sessions[session_id] = GeminiChatbotAgent(session_id, pdf_path)
+    def _load_agent(self, session_id: str) -> Optional[GeminiChatbotAgent]:
+        """Build an agent from the session's files on disk; its index loads on first use"""
+        # Check if session directory exists
+        session_dir = os.path.join(self.session_data_path, session_id)
+        if not os.path.exists(session_dir):
+            return None
         
-        return self.sessions.get(session_id)
+        # Check if PDF exists for this session
+        pdf_path = os.path.join(session_dir, "document.pdf")
+        if os.path.exists(pdf_path):
+            return GeminiChatbotAgent(session_id, pdf_path)
+        return None
     
-    def upload_document(self, session_id: str, file_content: bytes, filename: str) -> GeminiChatbotAgent:
-        """Upload and process document for a session"""
+    def get_agent(self, session_id: str) -> Optional[GeminiChatbotAgent]:
+        """Get the cached agent for a session, rehydrating it from disk if it was evicted"""
+        agent = self.sessions.get(session_id)
+        if agent is None:
+            agent = self._load_agent(session_id)
+            if agent is not None:
+                self.sessions.put(session_id, agent, rehydrated=True)
+        return agent
+    
+    async def asave_upload(self, session_id: str, upload, filename: str) -> str:
+        """Stream an uploaded PDF to the session directory without holding it in memory.
+
+        Returns the upload's own file, which its ingestion job parses:
+        ``document.pdf`` is swapped to the new content, but a job still
+        reading an earlier upload keeps its own file.
+        """
         session_dir = os.path.join(self.session_data_path, session_id)
         
         if not os.path.exists(session_dir):
             raise HTTPException(status_code=404, detail="Session not found")
         
-        # Save PDF file
+        # Write beside the current document and swap it in only once complete
         pdf_path = os.path.join(session_dir, "document.pdf")
-        with open(pdf_path, "wb") as f:
-            f.write(file_content)
-        
-        print(f"✅ Saved PDF for session {session_id}: {filename}")
-        
-        # Create and initialize agent
-        agent = GeminiChatbotAgent(session_id, pdf_path)
-        agent.load_document()
-        
-        # Store in memory
-        self.sessions[session_id] = agent
+        upload_path = os.path.join(session_dir, f"{UPLOAD_FILE_PREFIX}{uuid.uuid4().hex}.pdf")
+        link_path = upload_path + ".link"
+        size = 0
+        try:
+            with open(upload_path, "wb") as f:
+                while True:
+                    block = await upload.read(UPLOAD_CHUNK_BYTES)
+                    if not block:
+                        break
+                    size += len(block)
+                    if size > MAX_UPLOAD_MB * 1024 * 1024:
+                        raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {MAX_UPLOAD_MB}MB")
+                    await run_blocking(f.write, block)
+            os.link(upload_path, link_path)
+            os.replace(link_path, pdf_path)
+        except BaseException:
+            for path in (upload_path, link_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
         
-        return agent
+        await run_blocking(self.mark_uploaded, session_id, filename)
+        log_event("pdf_saved", session_id=session_id, filename=filename, bytes=size)
+        return upload_path
     
-    def get_session_info(self, session_id: str) -> dict:
-        """Get detailed session information"""
-        agent = self.get_agent(session_id)
+    def _disk_session_info(self, session_id: str) -> Optional[dict]:
+        """Rebuild a session's index row from its files, without creating an agent"""
         session_dir = os.path.join(self.session_data_path, session_id)
+        if not os.path.isdir(session_dir):
+            return None
         
-        info = {
-            "session_id": session_id,
-            "exists": os.path.exists(session_dir),
-            "document_uploaded": False,
+        record = {
+            "created_at": os.path.getctime(session_dir),
+            "document_uploaded": os.path.exists(os.path.join(session_dir, "document.pdf")),
             "processed": False,
-            "ready_for_chat": False,
             "document_chunks": 0,
-            "document_summary": None
+            "document_hash": None,
+            "document_summary": None,
         }
+        hash_path = os.path.join(session_dir, DOCUMENT_HASH_FILE)
+        if os.path.exists(hash_path):
+            with open(hash_path) as f:
+                record["document_hash"] = f.read().strip() or None
+        index_path = vector_store_path_for(session_id, record["document_hash"])
+        if record["document_uploaded"] and index_store.exists(index_path):
+            record["processed"] = True
+            layout = index_store.read_layout(index_path)
+            if layout is not None:
+                record["document_chunks"] = len(layout)
+            summary_path = os.path.join(index_path, SUMMARY_FILE)
+            if os.path.exists(summary_path):
+                with open(summary_path, encoding="utf-8") as f:
+                    record["document_summary"] = f.read() or None
+        return record
+    
+    def _backfill_index(self):
+        """Register session directories created before the metadata index existed"""
+        known = self.index.session_ids()
+        for session_id in os.listdir(self.session_data_path):
+            if session_id not in known:
+                record = self._disk_session_info(session_id)
+                if record is not None:
+                    self.index.create(session_id, **record)
+    
+    def mark_uploaded(self, session_id: str, filename: str):
+        self.index.update(session_id, filename=filename, document_uploaded=True, processed=False,
+                          document_chunks=0, document_hash=None, document_summary=None)
+    
+    def mark_processed(self, session_id: str, agent: GeminiChatbotAgent):
+        self.index.update(session_id, processed=True, document_chunks=len(agent.document_chunks),
+                          document_hash=agent.document_hash, document_summary=agent.load_summary())
+    
+    def set_summary(self, session_id: str, summary: str):
+        self.index.update(session_id, document_summary=summary)
+    
+    def forget_agent(self, session_id: str):
+        """Drop the session's in-memory agent (e.g. before a new upload).
+
+        Answers are cached per document, not per session, so they are only
+        dropped once no other session has the same document indexed. The
+        caller must already have cleared this session's document in the
+        metadata index (``mark_uploaded`` or ``index.delete``).
+        """
+        agent = self.sessions.pop(session_id, None) or self._load_agent(session_id)
+        if agent is None:
+            return
+        if agent.document_hash and self.index.count_document(agent.document_hash):
+            return
+        answer_cache.invalidate(agent.cache_scope)
+    
+    def delete_session(self, session_id: str):
+        """Remove a session's metadata, then its agent and cached answers, then its files.
+
+        If removing the files fails, the directory is re-registered by
+        ``_backfill_index`` on the next start, so the index never lists a
+        session whose files are gone.
+        """
+        self.index.delete(session_id)
+        # Still reads the session's files to find which document's answers to drop
+        self.forget_agent(session_id)
+        session_dir = os.path.join(self.session_data_path, session_id)
+        if os.path.exists(session_dir):
+            shutil.rmtree(session_dir)
+        # A request in between may have rehydrated the agent from the files
+        self.sessions.pop(session_id, None)
+    
+    @staticmethod
+    def _info_from_record(record: dict) -> dict:
+        return {
+            "session_id": record["session_id"],
+            "exists": True,
+            "document_uploaded": record["document_uploaded"],
+            "processed": record["processed"],
+            "ready_for_chat": record["document_uploaded"] and record["processed"],
+            "document_chunks": record["document_chunks"],
+            "document_summary": record["document_summary"],
+            "filename": record["filename"],
+            "created_at": record["created_at"],
+        }
+    
+    def get_session_info(self, session_id: str) -> dict:
+        """Session information from the metadata index; never loads agents or calls Gemini"""
+        record = self.index.get(session_id)
+        if record is None:
+            disk_record = self._disk_session_info(session_id)
+            if disk_record is None:
+                return {
+                    "session_id": session_id,
+                    "exists": False,
+                    "document_uploaded": False,
+                    "processed": False,
+                    "ready_for_chat": False,
+                    "document_chunks": 0,
+                    "document_summary": None
+                }
+            self.index.create(session_id, **disk_record)
+            record = self.index.get(session_id)
         
-        pdf_path = os.path.join(session_dir, "document.pdf")
-        if os.path.exists(pdf_path):
-            info["document_uploaded"] = True
-            
-            if agent:
-                info["ready_for_chat"] = True
-                info["document_chunks"] = len(agent.document_chunks)
-                
-                vector_store_path = os.path.join(session_dir, "vector_store")
-                info["processed"] = os.path.exists(vector_store_path)
-                
-                # Get document summary
-                try:
-                    info["document_summary"] = agent.get_document_summary()
-                except:
-                    info["document_summary"] = "Summary unavailable"
-        
-        return info
\ No newline at end of file
+        return self._info_from_record(record)
+    
+    async def aget_session_info(self, session_id: str) -> dict:
+        """Async variant of get_session_info"""
+        return await run_blocking(self.get_session_info, session_id)
+    
+    def list_sessions(self, offset: int = 0, limit: int = 50) -> dict:
+        """One page of sessions from the metadata index"""
+        records, total = self.index.list(offset, limit)
+        return {
+            "sessions": [self._info_from_record(record) for record in records],
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+        }
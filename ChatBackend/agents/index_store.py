@@ -0,0 +1,201 @@
+# agents/index_store.py
+"""Atomic, versioned persistence for a document's overlay index.
+
+Each save writes a complete new version into its own directory:
+
+    <index dir>/
+        CURRENT              name of the live version
+        v<time>-<id>/
+            manifest.json    format version and counts, written last
+            index.faiss      raw FAISS index, loaded memory-mapped and read-only
+            chunks.jsonl     overlay chunk texts and metadata (no pickle)
+            layout.json      order of the document's chunks across base and overlay
+        summary.txt          document summary (not versioned)
+
+``CURRENT`` is switched with an atomic rename only after the version is
+fully on disk, so a crash mid-save leaves the previous version live and
+the partial directory is removed by the next save. Stores written before
+this format (``index.faiss`` + ``index.pkl`` from ``FAISS.save_local``)
+are still read with ``load_local`` and rewritten in the new format.
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from agents.knowledge_base import read_index
+
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.jsonl"
+LAYOUT_FILE = "layout.json"
+# Files written by FAISS.save_local before versioned stores
+LEGACY_INDEX_FILE = "index.faiss"
+LEGACY_DOCSTORE_FILE = "index.pkl"
+
+
+def _fsync(path: str):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def current_version(path: str) -> Optional[str]:
+    """Directory of the live version, or None for legacy and missing stores"""
+    try:
+        with open(os.path.join(path, CURRENT_FILE)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(path, name) if name else None
+
+
+def is_legacy(path: str) -> bool:
+    return current_version(path) is None and os.path.exists(os.path.join(path, LEGACY_DOCSTORE_FILE))
+
+
+def exists(path: str) -> bool:
+    """Whether ``path`` holds a complete index in either format"""
+    if current_version(path) is not None:
+        return True
+    return is_legacy(path) or os.path.exists(os.path.join(path, LAYOUT_FILE))
+
+
+def read_layout(path: str) -> Optional[list]:
+    """The persisted chunk layout without loading the index"""
+    version = current_version(path)
+    layout_path = os.path.join(version or path, LAYOUT_FILE)
+    if not os.path.exists(layout_path):
+        return None
+    with open(layout_path) as f:
+        return json.load(f)
+
+
+def save(path: str, vector_store: Optional[FAISS], layout: list) -> str:
+    """Write a new version of the index and make it live; returns the version directory"""
+    os.makedirs(path, exist_ok=True)
+    name = f"v{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+    version = os.path.join(path, name)
+    os.makedirs(version)
+
+    overlay_chunks = 0
+    dimension = None
+    if vector_store is not None:
+        faiss.write_index(vector_store.index, os.path.join(version, INDEX_FILE))
+        with open(os.path.join(version, CHUNKS_FILE), "w", encoding="utf-8") as f:
+            for position in range(len(vector_store.index_to_docstore_id)):
+                doc_id = vector_store.index_to_docstore_id[position]
+                doc = vector_store.docstore.search(doc_id)
+                f.write(json.dumps({"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata},
+                                   default=str) + "\n")
+        overlay_chunks = vector_store.index.ntotal
+        dimension = vector_store.index.d
+    with open(os.path.join(version, LAYOUT_FILE), "w") as f:
+        json.dump(layout, f)
+    with open(os.path.join(version, MANIFEST_FILE), "w") as f:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "created_at": time.time(),
+            "overlay_chunks": overlay_chunks,
+            "document_chunks": len(layout),
+            "dimension": dimension,
+        }, f)
+    for file_name in os.listdir(version):
+        _fsync(os.path.join(version, file_name))
+
+    pointer = os.path.join(path, f".{CURRENT_FILE}.{uuid.uuid4().hex[:8]}")
+    with open(pointer, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer, os.path.join(path, CURRENT_FILE))
+
+    _remove_stale(path, keep=name)
+    return version
+
+
+def _remove_stale(path: str, keep: str):
+    """Drop replaced versions, unfinished saves and legacy files.
+
+    Only versions older than ``keep`` are removed (names sort by creation
+    time), so a concurrent save of the same index neither loses the
+    version it just made live nor one it is still writing.
+    """
+    live = os.path.basename(current_version(path) or "")
+    for entry in os.listdir(path):
+        full = os.path.join(path, entry)
+        if entry.startswith("v") and entry < keep and entry != live and os.path.isdir(full):
+            shutil.rmtree(full, ignore_errors=True)
+        elif entry in (LEGACY_INDEX_FILE, LEGACY_DOCSTORE_FILE, LAYOUT_FILE):
+            os.remove(full)
+
+
+def load(path: str, embeddings) -> Tuple[Optional[FAISS], Optional[list]]:
+    """Overlay store (None when every chunk is in the knowledge base) and chunk layout.
+
+    Raises FileNotFoundError when ``path`` holds no complete index.
+    """
+    while True:
+        version = current_version(path)
+        if version is None:
+            return _load_legacy(path, embeddings)
+        try:
+            return _load_version(version, embeddings)
+        except FileNotFoundError:
+            # A concurrent save made a newer version live and removed this one; read that instead
+            if current_version(path) == version:
+                raise
+
+
+def _load_version(version: str, embeddings) -> Tuple[Optional[FAISS], Optional[list]]:
+    with open(os.path.join(version, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest["format"] > FORMAT_VERSION:
+        raise ValueError(f"Index at {os.path.dirname(version)} has format {manifest['format']}; "
+                         f"this server reads up to {FORMAT_VERSION}")
+
+    vector_store = None
+    if os.path.exists(os.path.join(version, INDEX_FILE)):
+        index = read_index(os.path.join(version, INDEX_FILE))
+        docs, ids = {}, {}
+        with open(os.path.join(version, CHUNKS_FILE), encoding="utf-8") as f:
+            for position, line in enumerate(f):
+                record = json.loads(line)
+                docs[record["id"]] = Document(page_content=record["page_content"], metadata=record["metadata"])
+                ids[position] = record["id"]
+        vector_store = FAISS(embeddings, index, InMemoryDocstore(docs), ids)
+    # Layout from the same version, not whatever CURRENT names by now
+    with open(os.path.join(version, LAYOUT_FILE)) as f:
+        return vector_store, json.load(f)
+
+
+def _load_legacy(path: str, embeddings) -> Tuple[Optional[FAISS], Optional[list]]:
+    vector_store = None
+    if os.path.exists(os.path.join(path, LEGACY_DOCSTORE_FILE)):
+        vector_store = FAISS.load_local(
+            path,
+            embeddings,
+            allow_dangerous_deserialization=True  # Required for stores saved with save_local
+        )
+    layout = read_layout(path)
+    if vector_store is None and layout is None:
+        raise FileNotFoundError(f"No index at {path}")
+    return vector_store, layout
+
+
+def overlay_documents(vector_store: Optional[FAISS]) -> List[Document]:
+    """Overlay chunks in index order"""
+    if vector_store is None:
+        return []
+    return [
+        vector_store.docstore.search(vector_store.index_to_docstore_id[position])
+        for position in range(len(vector_store.index_to_docstore_id))
+    ]
@@ -0,0 +1,282 @@
+# agents/ingestion.py
+"""Background ingestion of uploaded PDFs.
+
+Uploads return immediately with a job id. The job reuses the shared index
+of an identical document when one exists; otherwise it runs a pipeline
+over batches of pages: each batch is parsed and split in a worker process
+(several batches parse in parallel ahead of embedding and are consumed in
+page order; a page or batch that fails is skipped, not fatal), embedded
+through the shared embedding scheduler and added to the FAISS index. The
+session can answer from the first pages while later ones are still being
+processed; the index is saved once the last batch is in. The document
+summary is generated once after that and persisted for the status
+endpoints.
+Each job parses its own file of the upload, so a re-upload never changes
+the pages an older job is reading; the older job stops at its next page
+batch and never publishes its agent.
+Stage and percentage are tracked per job for the status endpoints, and a
+semaphore caps how many documents are ingested at once so a burst of
+uploads cannot starve chat traffic.
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Dict, Optional
+
+from config.settings import INGESTION_CONCURRENCY, INGESTION_PROCESS_WORKERS, MAX_TRACKED_JOBS, PDF_PAGES_PER_BATCH
+from agents.chatbot_agent import GeminiChatbotAgent
+from utils.pdf_pipeline import get_pool, page_count, shard_starts, shutdown_pool, split_pages
+from utils.concurrency import run_blocking
+from utils.embedding_scheduler import embedding_scheduler
+from yantra_common.instrumentation import log_event
+
+# Progress ranges (percent) covered by each stage
+STAGE_PROGRESS = {
+    "queued": 0,
+    "parsing": 5,
+    "embedding": 20,
+    "indexing": 90,
+    "done": 100,
+}
+
+
+class IngestionJob:
+    """State of one document ingestion"""
+
+    def __init__(self, session_id: str, pdf_path: str, filename: str):
+        self.job_id = str(uuid.uuid4())
+        self.session_id = session_id
+        self.pdf_path = pdf_path
+        self.filename = filename
+        self.stage = "queued"
+        self.progress = 0
+        self.error: Optional[str] = None
+        self.document_chunks = 0
+        self.reused_index = False
+        # True once the first page batch is indexed and the session can answer from it
+        self.searchable = False
+        # 1-based numbers of pages whose text could not be extracted
+        self.failed_pages = []
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    def set_stage(self, stage: str, progress: Optional[int] = None):
+        self.stage = stage
+        self.progress = STAGE_PROGRESS.get(stage, self.progress) if progress is None else progress
+        self.updated_at = time.time()
+
+    @property
+    def finished(self) -> bool:
+        return self.stage in ("done", "failed")
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "session_id": self.session_id,
+            "filename": self.filename,
+            "stage": self.stage,
+            "progress": self.progress,
+            "error": self.error,
+            "document_chunks": self.document_chunks,
+            "reused_index": self.reused_index,
+            "searchable": self.searchable,
+            "failed_pages": self.failed_pages,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class IngestionQueue:
+    """Runs document ingestion jobs in the background with bounded concurrency"""
+
+    def __init__(self, session_manager,
+                 max_concurrent: int = INGESTION_CONCURRENCY,
+                 process_workers: int = INGESTION_PROCESS_WORKERS,
+                 pages_per_batch: int = PDF_PAGES_PER_BATCH):
+        self.session_manager = session_manager
+        self.pages_per_batch = pages_per_batch
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self.session_jobs: Dict[str, str] = {}
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._process_workers = process_workers
+        self._tasks = set()
+
+    def submit(self, session_id: str, pdf_path: str, filename: str) -> IngestionJob:
+        """Queue a saved PDF for ingestion and return its job"""
+        job = IngestionJob(session_id, pdf_path, filename)
+        previous = self.job_for_session(session_id)
+        if previous is not None and previous.finished and previous.pdf_path != pdf_path:
+            # A failed job's upload is only kept for a retry, which this upload rules out
+            _remove_upload(previous)
+        self.jobs[job.job_id] = job
+        self.session_jobs[session_id] = job.job_id
+        self._trim()
+
+        # A new upload replaces whatever the session had loaded before
+        self.session_manager.forget_agent(session_id)
+
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def retry(self, job_id: str) -> IngestionJob:
+        """Re-run a failed job; chunks embedded before the failure come from the embedding cache"""
+        job = self.jobs.get(job_id)
+        if job is None or job.stage != "failed":
+            raise ValueError("Only failed jobs can be retried")
+        if self.session_jobs.get(job.session_id) != job_id:
+            raise ValueError("A newer upload replaced this job")
+        return self.submit(job.session_id, job.pdf_path, job.filename)
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def job_for_session(self, session_id: str) -> Optional[IngestionJob]:
+        job_id = self.session_jobs.get(session_id)
+        return self.jobs.get(job_id) if job_id else None
+
+    def is_ingesting(self, session_id: str) -> bool:
+        job = self.job_for_session(session_id)
+        return job is not None and not job.finished
+
+    def _trim(self):
+        """Forget the oldest finished jobs beyond MAX_TRACKED_JOBS"""
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= MAX_TRACKED_JOBS:
+                break
+            job = self.jobs[job_id]
+            if job.finished:
+                del self.jobs[job_id]
+                if self.session_jobs.get(job.session_id) == job_id:
+                    del self.session_jobs[job.session_id]
+                    _remove_upload(job)
+
+    async def _run(self, job: IngestionJob):
+        async with self._slots:
+            agent = None
+            pending = deque()
+            try:
+                agent = GeminiChatbotAgent(job.session_id, job.pdf_path)
+
+                # Identical documents share one index: skip parsing and embedding entirely
+                await run_blocking(agent.assign_document_hash)
+                if await run_blocking(agent.load_shared_index):
+                    job.document_chunks = len(agent.document_chunks)
+                    job.reused_index = True
+                    self._check_current(job)
+                    self.session_manager.sessions[job.session_id] = agent
+                    await run_blocking(self.session_manager.mark_processed, job.session_id, agent)
+                    job.set_stage("done")
+                    await self._summarize(job, agent)
+                    return
+
+                job.set_stage("parsing")
+                loop = asyncio.get_running_loop()
+                pages = await run_blocking(page_count, job.pdf_path)
+                starts = iter(shard_starts(pages, self.pages_per_batch))
+                agent.start_index()
+
+                def parse(start):
+                    future = loop.run_in_executor(get_pool(), split_pages, job.pdf_path, start, start + self.pages_per_batch)
+                    return start, future
+
+                # Page shards parse in parallel across the process pool, ahead of embedding,
+                # and are consumed in page order
+                pending = deque(parse(start) for start in islice(starts, self._process_workers))
+                while pending:
+                    self._check_current(job)
+                    start, future = pending.popleft()
+                    next_start = next(starts, None)
+                    if next_start is not None:
+                        pending.append(parse(next_start))
+                    pages_done = min(start + self.pages_per_batch, pages)
+                    try:
+                        chunks, failed = await future
+                    except Exception as e:
+                        # A crashed shard loses its pages, not the document
+                        log_event("ingestion_pages_failed", level="warning", job_id=job.job_id, first_page=start + 1,
+                                  last_page=pages_done, error=str(e))
+                        chunks, failed = [], list(range(start, pages_done))
+                    job.failed_pages.extend(page + 1 for page in failed)
+                    if not chunks:
+                        continue
+                    vectors = await self._embed(job, agent, [chunk.page_content for chunk in chunks], pages_done / pages)
+                    await run_blocking(agent.add_chunks, chunks, vectors)
+                    job.document_chunks = len(agent.document_chunks)
+                    self._check_current(job)
+                    if not job.searchable:
+                        # First pages are searchable while the rest are still being parsed
+                        self.session_manager.sessions[job.session_id] = agent
+                        job.searchable = True
+
+                if not agent.document_chunks:
+                    raise ValueError("No text could be extracted from the PDF")
+
+                job.set_stage("indexing")
+                await run_blocking(agent.finish_index)
+                self._check_current(job)
+                self.session_manager.sessions[job.session_id] = agent
+                await run_blocking(self.session_manager.mark_processed, job.session_id, agent)
+                job.set_stage("done")
+                log_event("ingestion_finished", job_id=job.job_id, chunks=len(agent.document_chunks), pages=pages)
+                await self._summarize(job, agent)
+            except Exception as e:
+                for _, future in pending:
+                    future.cancel()
+                # Do not leave a partially indexed document answering questions
+                if agent is not None and self.session_manager.sessions.peek(job.session_id) is agent:
+                    self.session_manager.sessions.pop(job.session_id)
+                job.error = str(e)
+                job.set_stage("failed", job.progress)
+                log_event("ingestion_failed", level="error", job_id=job.job_id, error=str(e))
+            finally:
+                # Keep a failed job's upload for retry() unless a newer upload replaced it
+                if job.stage == "done" or self.session_jobs.get(job.session_id) != job.job_id:
+                    _remove_upload(job)
+
+    def _check_current(self, job: IngestionJob):
+        """A newer upload for the same session supersedes this job"""
+        if self.session_jobs.get(job.session_id) != job.job_id:
+            raise RuntimeError("Superseded by a newer upload")
+
+    async def _summarize(self, job: IngestionJob, agent: GeminiChatbotAgent):
+        """Generate and persist the document summary once the session can already chat"""
+        try:
+            summary = await agent.asummarize()
+            await run_blocking(self.session_manager.set_summary, job.session_id, summary)
+        except Exception as e:
+            # Status keeps reporting no summary; the summary endpoint retries on demand
+            log_event("summary_failed", level="error", session_id=job.session_id, error=str(e))
+
+    async def _embed(self, job: IngestionJob, agent: GeminiChatbotAgent, texts, done_fraction: float):
+        """Embed one page batch's chunks through the shared embedding scheduler.
+
+        Progress moves through the embedding range in proportion to the
+        pages processed, reaching ``done_fraction`` when this batch is embedded.
+        """
+        if job.stage != "embedding":
+            job.set_stage("embedding")
+        start, end = job.progress, STAGE_PROGRESS["embedding"] + int(
+            (STAGE_PROGRESS["indexing"] - STAGE_PROGRESS["embedding"]) * done_fraction
+        )
+
+        def on_progress(done):
+            job.progress = start + int((end - start) * done / len(texts))
+            job.updated_at = time.time()
+
+        return await embedding_scheduler.embed_documents(agent.embeddings, texts, on_progress)
+
+    def shutdown(self):
+        shutdown_pool()
+
+
+def _remove_upload(job: IngestionJob):
+    """Delete the per-upload PDF a job parsed; the session keeps document.pdf"""
+    try:
+        os.remove(job.pdf_path)
+    except FileNotFoundError:
+        pass
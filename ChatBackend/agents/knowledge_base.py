@@ -0,0 +1,140 @@
+# agents/knowledge_base.py
+"""Shared knowledge index built from the clinic's reference corpus.
+
+One FAISS index over the reference PDFs is built offline and loaded
+memory-mapped, so every session shares the same pages instead of holding
+its own copy. Sessions only keep a small overlay index for uploaded
+chunks that are not already in the base; ``lookup`` lets ingestion find
+those shared chunks by content hash.
+
+Build (or rebuild) the base index with:
+    python -m agents.knowledge_base
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from config.settings import KNOWLEDGE_BASE_FOLDER, KNOWLEDGE_BASE_PATH
+from utils.embedding_cache import content_key
+from yantra_common.instrumentation import log_event
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.jsonl"
+
+
+def chunk_hash(text: str) -> str:
+    """Content identity of a chunk, independent of the embedding model"""
+    return content_key("chunk", text)
+
+
+def read_index(index_path: str):
+    """Read a FAISS index memory-mapped and read-only.
+
+    ``IO_FLAG_MMAP`` only maps inverted lists and leaves flat indexes
+    fully resident; ``IO_FLAG_MMAP_IFC`` also maps the vectors of flat
+    (``IndexFlatCodes``) indexes, so every worker shares the page cache.
+    The result must never be added to.
+    """
+    try:
+        return faiss.read_index(index_path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # Index types without mmap support are read into memory
+        return faiss.read_index(index_path)
+
+
+class KnowledgeBase:
+    """Read-only, memory-mapped base index plus its chunk texts"""
+
+    def __init__(self, path: str = KNOWLEDGE_BASE_PATH):
+        self.path = path
+        self.index = read_index(os.path.join(path, INDEX_FILE))
+        self.chunks: List[Document] = []
+        with open(os.path.join(path, CHUNKS_FILE), encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                self.chunks.append(Document(page_content=record["page_content"], metadata=record["metadata"]))
+        self._ids_by_hash: Dict[str, int] = {chunk_hash(chunk.page_content): i for i, chunk in enumerate(self.chunks)}
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def lookup(self, text: str) -> Optional[int]:
+        """Base chunk id for identical text, if the base already holds it"""
+        return self._ids_by_hash.get(chunk_hash(text))
+
+    def lookup_hash(self, key: str) -> Optional[int]:
+        """Base chunk id for a ``chunk_hash`` recorded earlier"""
+        return self._ids_by_hash.get(key)
+
+    def search(self, query_embedding: List[float], k: int) -> List[Tuple[Document, float]]:
+        """Nearest base chunks with their L2 distances (lower is closer)"""
+        if not self.chunks:
+            return []
+        query = np.asarray([query_embedding], dtype=np.float32)
+        distances, ids = self.index.search(query, min(k, len(self.chunks)))
+        return [(self.chunks[i], float(d)) for d, i in zip(distances[0], ids[0]) if i >= 0]
+
+    @staticmethod
+    def build(embeddings, source_folder: str = KNOWLEDGE_BASE_FOLDER, path: str = KNOWLEDGE_BASE_PATH) -> int:
+        """Split and embed every PDF in ``source_folder`` into a base index at ``path``"""
+        from agents.chatbot_agent import split_pdf
+
+        chunks: List[Document] = []
+        seen = set()
+        for name in sorted(os.listdir(source_folder)):
+            if not name.lower().endswith(".pdf"):
+                continue
+            try:
+                for chunk in split_pdf(os.path.join(source_folder, name)):
+                    key = chunk_hash(chunk.page_content)
+                    if key not in seen:
+                        seen.add(key)
+                        chunks.append(chunk)
+            except Exception as e:
+                print(f"❌ Skipping {name}: {str(e)}")
+        if not chunks:
+            raise ValueError(f"No reference PDFs with text found in {source_folder}")
+
+        vectors = np.asarray(embeddings.embed_documents([chunk.page_content for chunk in chunks]), dtype=np.float32)
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+
+        os.makedirs(path, exist_ok=True)
+        faiss.write_index(index, os.path.join(path, INDEX_FILE))
+        with open(os.path.join(path, CHUNKS_FILE), "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(json.dumps({"page_content": chunk.page_content, "metadata": chunk.metadata}) + "\n")
+        print(f"✅ Built knowledge base with {len(chunks)} chunks at {path}")
+        return len(chunks)
+
+
+_knowledge_base: Optional[KnowledgeBase] = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def get_knowledge_base() -> Optional[KnowledgeBase]:
+    """Process-wide base index, or None when it has not been built"""
+    global _knowledge_base, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                if os.path.exists(os.path.join(KNOWLEDGE_BASE_PATH, INDEX_FILE)):
+                    try:
+                        _knowledge_base = KnowledgeBase(KNOWLEDGE_BASE_PATH)
+                        log_event("knowledge_base_loaded", sample_rate=1, chunks=len(_knowledge_base))
+                    except Exception as e:
+                        log_event("knowledge_base_load_failed", level="error", path=KNOWLEDGE_BASE_PATH, error=str(e))
+                _loaded = True
+    return _knowledge_base
+
+
+if __name__ == "__main__":
+    from utils import gemini_clients
+
+    KnowledgeBase.build(gemini_clients.get_cached_embeddings())
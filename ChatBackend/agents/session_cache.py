@@ -0,0 +1,138 @@
+# agents/session_cache.py
+"""Bounded in-memory cache of session agents.
+
+Agents are kept in LRU order and evicted when the cache holds more than
+``max_agents`` entries, when their estimated memory exceeds ``max_bytes``,
+or when they have been idle longer than ``idle_seconds``. Eviction only
+drops the in-memory agent: its vector store stays on disk, and the session
+manager rebuilds the agent from it on the session's next request.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config.settings import SESSION_CACHE_MAX_AGENTS, SESSION_CACHE_MAX_MB, SESSION_IDLE_SECONDS
+from yantra_common.instrumentation import log_event
+
+
+class AgentCache:
+    """Dict-like LRU of session id -> agent with size, memory and idle bounds"""
+
+    def __init__(self,
+                 max_agents: int = SESSION_CACHE_MAX_AGENTS,
+                 max_bytes: int = SESSION_CACHE_MAX_MB * 1024 * 1024,
+                 idle_seconds: float = SESSION_IDLE_SECONDS):
+        self.max_agents = max_agents
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._agents: "OrderedDict[str, object]" = OrderedDict()
+        self._last_used = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rehydrations = 0
+        self.evictions = {"capacity": 0, "memory": 0, "idle": 0}
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._agents
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+    def __getitem__(self, session_id: str):
+        agent = self.get(session_id)
+        if agent is None:
+            raise KeyError(session_id)
+        return agent
+
+    def __setitem__(self, session_id: str, agent):
+        self.put(session_id, agent)
+
+    def __delitem__(self, session_id: str):
+        if self.pop(session_id) is None:
+            raise KeyError(session_id)
+
+    def get(self, session_id: str, default=None):
+        """Agent for the session (marking it recently used), counting hits and misses"""
+        with self._lock:
+            self._evict_idle(time.time())
+            agent = self._agents.get(session_id)
+            if agent is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._agents.move_to_end(session_id)
+            self._last_used[session_id] = time.time()
+            self._enforce_limits(keep=session_id)
+        return agent
+
+    def peek(self, session_id: str):
+        """Agent for the session without touching LRU order or metrics"""
+        return self._agents.get(session_id)
+
+    def put(self, session_id: str, agent, rehydrated: bool = False):
+        with self._lock:
+            self._agents[session_id] = agent
+            self._agents.move_to_end(session_id)
+            self._last_used[session_id] = time.time()
+            if rehydrated:
+                self.rehydrations += 1
+            self._enforce_limits(keep=session_id)
+
+    def pop(self, session_id: str, default=None):
+        with self._lock:
+            self._last_used.pop(session_id, None)
+            return self._agents.pop(session_id, default)
+
+    def memory_bytes(self) -> int:
+        return sum(getattr(agent, "memory_bytes", 0) for agent in self._agents.values())
+
+    def _remove(self, session_id: str, reason: str):
+        self._agents.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        self.evictions[reason] += 1
+        log_event("session_evicted", session_id=session_id, reason=reason)
+
+    def _evict_idle(self, now: float):
+        # LRU order means the idle entries are at the front
+        for session_id in list(self._agents):
+            if now - self._last_used[session_id] <= self.idle_seconds:
+                break
+            self._remove(session_id, "idle")
+
+    def _enforce_limits(self, keep: Optional[str] = None):
+        """Drop least recently used agents until both bounds hold (never ``keep``)"""
+        while len(self._agents) > self.max_agents:
+            oldest = next(iter(self._agents))
+            if oldest == keep:
+                break
+            self._remove(oldest, "capacity")
+        # Agents grow as their vector stores load, so memory is re-measured here
+        total = self.memory_bytes()
+        for session_id in list(self._agents):
+            if total <= self.max_bytes or session_id == keep:
+                break
+            total -= getattr(self._agents[session_id], "memory_bytes", 0)
+            self._remove(session_id, "memory")
+
+    def sweep(self):
+        """Apply idle and memory bounds without waiting for the next request"""
+        with self._lock:
+            self._evict_idle(time.time())
+            self._enforce_limits()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            return {
+                "agents": len(self._agents),
+                "max_agents": self.max_agents,
+                "memory_bytes": self.memory_bytes(),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "rehydrations": self.rehydrations,
+                "evictions": dict(self.evictions),
+            }
@@ -0,0 +1,115 @@
+# agents/session_index.py
+"""Lightweight metadata index of chat sessions.
+
+One SQLite row per session holds everything the status and listing
+endpoints report (upload state, chunk count, persisted summary), so they
+never construct agents, load vector stores or call Gemini.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+COLUMNS = (
+    "session_id",
+    "created_at",
+    "updated_at",
+    "filename",
+    "document_uploaded",
+    "processed",
+    "document_chunks",
+    "document_hash",
+    "document_summary",
+)
+BOOLEAN_COLUMNS = ("document_uploaded", "processed")
+
+
+class SessionIndex:
+    """SQLite-backed session_id -> metadata map"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                filename TEXT,
+                document_uploaded INTEGER NOT NULL DEFAULT 0,
+                processed INTEGER NOT NULL DEFAULT 0,
+                document_chunks INTEGER NOT NULL DEFAULT 0,
+                document_hash TEXT,
+                document_summary TEXT
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_created_at ON sessions (created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_document_hash ON sessions (document_hash)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _row_to_dict(row) -> dict:
+        record = dict(zip(COLUMNS, row))
+        for column in BOOLEAN_COLUMNS:
+            record[column] = bool(record[column])
+        return record
+
+    def create(self, session_id: str, created_at: Optional[float] = None, **fields):
+        now = time.time()
+        record = {"session_id": session_id, "created_at": created_at or now, "updated_at": now, **fields}
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR IGNORE INTO sessions ({', '.join(record)}) VALUES ({', '.join('?' * len(record))})",
+                list(record.values()),
+            )
+            self._conn.commit()
+
+    def update(self, session_id: str, **fields):
+        """Set the given columns, creating the row if it does not exist yet"""
+        unknown = set(fields) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown session fields: {', '.join(sorted(unknown))}")
+        self.create(session_id)
+        fields["updated_at"] = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE sessions SET {', '.join(f'{column} = ?' for column in fields)} WHERE session_id = ?",
+                [*fields.values(), session_id],
+            )
+            self._conn.commit()
+
+    def get(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list(self, offset: int = 0, limit: int = 50) -> Tuple[List[dict], int]:
+        """One page of sessions, newest first, and the total session count"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM sessions ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+            total = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return [self._row_to_dict(row) for row in rows], total
+
+    def count_document(self, document_hash: str) -> int:
+        """How many sessions have this document indexed"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE document_hash = ?", (document_hash,)
+            ).fetchone()[0]
+
+    def session_ids(self) -> set:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT session_id FROM sessions")}
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
@@ -0,0 +1,368 @@
+# benchmarks/fake_gemini.py
+"""Local stand-in for the Gemini API, used by the load-test harness.
+
+Generation is served over gRPC (GenerateContent, StreamGenerateContent,
+CountTokens), the transport the google-generativeai SDK uses in
+production, with a self-signed TLS certificate; embeddings are served
+over REST (batchEmbedContents / embedContent), like the LangChain
+embeddings client calls them. Point the services at it with:
+
+    GEMINI_API_ENDPOINT=localhost:<grpc port>
+    GEMINI_EMBEDDING_ENDPOINT=http://127.0.0.1:<http port>
+    GRPC_DEFAULT_SSL_ROOTS_FILE_PATH=<certificate>  (trusts the stand-in)
+
+Replies are deterministic; their timing and failure rate follow a
+latency profile:
+
+- ``latency_ms`` (+ uniform ``jitter_ms``): time to the first token,
+- ``tokens_per_second``: generation speed after that (0 = instant),
+- ``completion_tokens``: length of each generated reply,
+- ``error_rate``: fraction of calls failing UNAVAILABLE (503),
+  ``rate_limit_rate``: RESOURCE_EXHAUSTED (429),
+- ``embed_latency_ms`` (+ ``embed_ms_per_text``): embedding call time.
+
+Requests for JSON with a response schema get an instance of that schema
+(enum fields vary with the prompt), so structured callers parse them as
+they would real output. Embeddings are hashed bags of words, so similar
+texts get similar vectors and retrieval behaves plausibly. Call counts
+are served at ``/stats`` on the HTTP port.
+
+Usage (from the ChatBackend directory):
+    python -m benchmarks.fake_gemini --profile typical
+    python -m benchmarks.fake_gemini --grpc-port 8766 --http-port 8765 --profile flaky --error-rate 0.1
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import ipaddress
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+
+import grpc
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from google.ai import generativelanguage_v1beta as glm
+
+PROFILES = {
+    "instant": {"latency_ms": 0, "jitter_ms": 0, "tokens_per_second": 0, "completion_tokens": 80,
+                "error_rate": 0.0, "rate_limit_rate": 0.0, "embed_latency_ms": 0, "embed_ms_per_text": 0},
+    "typical": {"latency_ms": 400, "jitter_ms": 200, "tokens_per_second": 150, "completion_tokens": 120,
+                "error_rate": 0.0, "rate_limit_rate": 0.0, "embed_latency_ms": 120, "embed_ms_per_text": 2},
+    "slow": {"latency_ms": 1500, "jitter_ms": 600, "tokens_per_second": 40, "completion_tokens": 200,
+             "error_rate": 0.0, "rate_limit_rate": 0.0, "embed_latency_ms": 400, "embed_ms_per_text": 5},
+    "flaky": {"latency_ms": 600, "jitter_ms": 400, "tokens_per_second": 100, "completion_tokens": 120,
+              "error_rate": 0.03, "rate_limit_rate": 0.05, "embed_latency_ms": 150, "embed_ms_per_text": 2},
+}
+GENERATIVE_SERVICE = "google.ai.generativelanguage.v1beta.GenerativeService"
+EMBEDDING_DIMENSIONS = 768
+STREAM_CHUNK_TOKENS = 12
+# Roughly what Gemini's tokenizer gives for English text
+CHARS_PER_TOKEN = 4
+
+FILLER_TEXT = (
+    "Keep the movement slow and controlled, breathe steadily and stop if the pain sharpens. "
+    "Warm up for five minutes first, keep your back neutral and your core gently engaged. "
+    "Increase repetitions gradually over the week and rest a day between harder sessions. "
+)
+
+
+class Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, name: str, amount: int = 1):
+        with self._lock:
+            self.values[name] = self.values.get(name, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.values)
+
+
+def schema_instance(schema: dict, seed: int, text: str):
+    """A value matching ``schema``; ``seed`` varies enum choices and list lengths."""
+    kind = str(schema.get("type_") or schema.get("type") or "STRING").upper()
+    if kind == "OBJECT":
+        return {name: schema_instance(sub, seed + i, text)
+                for i, (name, sub) in enumerate(schema.get("properties", {}).items())}
+    if kind == "ARRAY":
+        low = int(schema.get("min_items") or 1)
+        high = max(low, int(schema.get("max_items") or low))
+        count = low + seed % (high - low + 1)
+        return [schema_instance(schema.get("items", {}), seed + i * 7, text) for i in range(count)]
+    if kind in ("NUMBER", "INTEGER"):
+        return seed % 10
+    if kind == "BOOLEAN":
+        return bool(seed % 2)
+    if schema.get("enum"):
+        return schema["enum"][seed % len(schema["enum"])]
+    return text
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=4).digest(), "little")
+
+
+def _reply_text(tokens: int) -> str:
+    words = (FILLER_TEXT * (tokens * CHARS_PER_TOKEN // len(FILLER_TEXT) + 1)).split()
+    return " ".join(words[:max(1, int(tokens * 0.75))])
+
+
+def _token_count(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _prompt_text(request) -> str:
+    return " ".join(part.text for content in request.contents for part in content.parts)
+
+
+def embed_text(text: str) -> list:
+    """Unit vector of hashed word counts (deterministic, similarity-preserving)."""
+    vector = np.zeros(EMBEDDING_DIMENSIONS, dtype=np.float32)
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % EMBEDDING_DIMENSIONS
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = float(np.linalg.norm(vector))
+    if norm == 0:
+        vector[0], norm = 1.0, 1.0
+    return (vector / norm).tolist()
+
+
+def make_certificate(directory: str) -> tuple:
+    """Self-signed certificate for localhost/127.0.0.1; returns (cert_path, key_path)."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=30))
+        .add_extension(x509.SubjectAlternativeName([
+            x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+        ]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = os.path.join(directory, "fake_gemini.crt"), os.path.join(directory, "fake_gemini.key")
+    with open(cert_path, "wb") as f:
+        f.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+class FakeGemini:
+    """Profile-driven handlers for the generation RPCs and embedding routes."""
+
+    def __init__(self, profile: dict):
+        self.profile = profile
+        self.counters = Counters()
+
+    def failure(self):
+        """(grpc status, http status, message) for a failed call, per the profile's rates, or None."""
+        roll = random.random()
+        if roll < self.profile["rate_limit_rate"]:
+            self.counters.inc("rate_limited")
+            return grpc.StatusCode.RESOURCE_EXHAUSTED, 429, "Resource has been exhausted (fake)"
+        if roll < self.profile["rate_limit_rate"] + self.profile["error_rate"]:
+            self.counters.inc("errors")
+            return grpc.StatusCode.UNAVAILABLE, 503, "The model is overloaded (fake)"
+        return None
+
+    async def first_token_delay(self):
+        delay = self.profile["latency_ms"] + random.uniform(0, self.profile["jitter_ms"])
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+    async def generation_delay(self, tokens: int):
+        if self.profile["tokens_per_second"]:
+            await asyncio.sleep(tokens / self.profile["tokens_per_second"])
+
+    def completion(self, request):
+        """Reply text and usage metadata for a GenerateContentRequest."""
+        prompt = _prompt_text(request)
+        config = request.generation_config
+        if config.response_mime_type == "application/json" and "response_schema" in config:
+            schema = type(config.response_schema).to_dict(config.response_schema, use_integers_for_enums=False)
+            text = json.dumps(schema_instance(schema, _seed(prompt), _reply_text(12)))
+        else:
+            text = _reply_text(self.profile["completion_tokens"])
+        usage = glm.GenerateContentResponse.UsageMetadata(
+            prompt_token_count=_token_count(prompt),
+            candidates_token_count=_token_count(text),
+            total_token_count=_token_count(prompt) + _token_count(text),
+        )
+        self.counters.inc("completion_tokens", usage.candidates_token_count)
+        return text, usage
+
+    @staticmethod
+    def response(text: str, finished: bool, usage=None):
+        candidate = glm.Candidate(content=glm.Content(parts=[glm.Part(text=text)], role="model"), index=0)
+        if finished:
+            candidate.finish_reason = glm.Candidate.FinishReason.STOP
+        return glm.GenerateContentResponse(candidates=[candidate], usage_metadata=usage)
+
+    async def generate_content(self, request, context):
+        self.counters.inc("generate")
+        await self.first_token_delay()
+        failure = self.failure()
+        if failure is not None:
+            await context.abort(failure[0], failure[2])
+        text, usage = self.completion(request)
+        await self.generation_delay(usage.candidates_token_count)
+        return self.response(text, True, usage)
+
+    async def stream_generate_content(self, request, context):
+        self.counters.inc("stream")
+        await self.first_token_delay()
+        failure = self.failure()
+        if failure is not None:
+            await context.abort(failure[0], failure[2])
+        text, usage = self.completion(request)
+        words = text.split(" ")
+        step = max(1, int(STREAM_CHUNK_TOKENS * 0.75))
+        for start in range(0, len(words), step):
+            last = start + step >= len(words)
+            yield self.response(" ".join(words[start:start + step]) + ("" if last else " "), last,
+                                usage if last else None)
+            if not last:
+                await self.generation_delay(STREAM_CHUNK_TOKENS)
+
+    async def count_tokens(self, request, context):
+        self.counters.inc("count_tokens")
+        return glm.CountTokensResponse(total_tokens=_token_count(_prompt_text(request)))
+
+    def grpc_handler(self):
+        def unary(handler, request_type, response_type):
+            return grpc.unary_unary_rpc_method_handler(
+                handler, request_deserializer=request_type.deserialize, response_serializer=response_type.serialize)
+
+        return grpc.method_handlers_generic_handler(GENERATIVE_SERVICE, {
+            "GenerateContent": unary(self.generate_content, glm.GenerateContentRequest, glm.GenerateContentResponse),
+            "StreamGenerateContent": grpc.unary_stream_rpc_method_handler(
+                self.stream_generate_content,
+                request_deserializer=glm.GenerateContentRequest.deserialize,
+                response_serializer=glm.GenerateContentResponse.serialize,
+            ),
+            "CountTokens": unary(self.count_tokens, glm.CountTokensRequest, glm.CountTokensResponse),
+        })
+
+    async def embed(self, texts: list) -> list:
+        delay = self.profile["embed_latency_ms"] + self.profile["embed_ms_per_text"] * len(texts)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        self.counters.inc("embedded_texts", len(texts))
+        return [{"values": embed_text(text)} for text in texts]
+
+    def http_app(self) -> FastAPI:
+        app = FastAPI(title="Fake Gemini embeddings")
+
+        def error_response(failure):
+            _, status, message = failure
+            return JSONResponse({"error": {"code": status, "message": message}}, status_code=status)
+
+        def content_text(content: dict) -> str:
+            return " ".join(part.get("text", "") for part in content.get("parts", []))
+
+        @app.get("/stats")
+        async def stats():
+            return {"profile": self.profile, **self.counters.snapshot()}
+
+        @app.post("/{version}/models/{model}:batchEmbedContents")
+        async def batch_embed_contents(version: str, model: str, request: Request):
+            self.counters.inc("embed")
+            body = await request.json()
+            failure = self.failure()
+            if failure is not None:
+                return error_response(failure)
+            texts = [content_text(item.get("content", {})) for item in body.get("requests", [])]
+            return {"embeddings": await self.embed(texts)}
+
+        @app.post("/{version}/models/{model}:embedContent")
+        async def embed_content(version: str, model: str, request: Request):
+            self.counters.inc("embed")
+            body = await request.json()
+            failure = self.failure()
+            if failure is not None:
+                return error_response(failure)
+            return {"embedding": (await self.embed([content_text(body.get("content", {}))]))[0]}
+
+        return app
+
+
+async def serve(profile: dict, host: str, grpc_port: int, http_port: int, cert_path: str, key_path: str):
+    fake = FakeGemini(profile)
+    server = grpc.aio.server()
+    server.add_generic_rpc_handlers((fake.grpc_handler(),))
+    with open(cert_path, "rb") as f:
+        certificate = f.read()
+    with open(key_path, "rb") as f:
+        key = f.read()
+    server.add_secure_port(f"{host}:{grpc_port}", grpc.ssl_server_credentials([(key, certificate)]))
+    await server.start()
+    http = uvicorn.Server(uvicorn.Config(fake.http_app(), host=host, port=http_port, log_level="warning"))
+    try:
+        await http.serve()
+    finally:
+        await server.stop(grace=1)
+
+
+def profile_from_args(args) -> dict:
+    profile = dict(PROFILES[args.profile])
+    for name in profile:
+        value = getattr(args, name, None)
+        if value is not None:
+            profile[name] = value
+    return profile
+
+
+def add_profile_arguments(parser):
+    """Profile selection and per-setting overrides (shared with the load-test harness)."""
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="typical", help="latency profile")
+    for name, default in PROFILES["typical"].items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=None,
+                            help=f"override the profile's {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--grpc-port", type=int, default=8766, help="generation (gRPC) port")
+    parser.add_argument("--http-port", type=int, default=8765, help="embeddings and /stats (REST) port")
+    parser.add_argument("--cert", help="TLS certificate for the gRPC port (default: generate one)")
+    parser.add_argument("--key", help="private key for --cert")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    cert_path, key_path = args.cert, args.key
+    if not cert_path:
+        cert_path, key_path = make_certificate(tempfile.mkdtemp(prefix="fake_gemini_"))
+    profile = profile_from_args(args)
+    print(f"Fake Gemini ({args.profile}: {profile})")
+    print(f"  GEMINI_API_ENDPOINT=localhost:{args.grpc_port}")
+    print(f"  GEMINI_EMBEDDING_ENDPOINT=http://{args.host}:{args.http_port}")
+    print(f"  GRPC_DEFAULT_SSL_ROOTS_FILE_PATH={cert_path}")
+    asyncio.run(serve(profile, args.host, args.grpc_port, args.http_port, cert_path, key_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/knowledge_base_memory.py
+"""Check that loading the knowledge base index does not copy it into each worker.
+
+Writes a synthetic flat index of the given size, then loads it the way
+the server does in several worker processes and prints how much private
+(anonymous) and file-backed memory each worker gained after loading and
+after a round of searches. A memory-mapped index costs each worker
+almost no private memory; its pages live once in the page cache. Exits
+non-zero when a worker's private memory grows by more than
+``--max-private`` of the index size.
+
+Usage (from the ChatBackend directory):
+    python -m benchmarks.knowledge_base_memory
+    python -m benchmarks.knowledge_base_memory --vectors 200000 --dimension 768 --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import faiss
+import numpy as np
+
+from agents.knowledge_base import INDEX_FILE, read_index
+
+
+def memory() -> dict:
+    """Resident anonymous and file-backed bytes of this process"""
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("RssAnon", "RssFile"):
+                values[name] = int(rest.split()[0]) * 1024
+    return values
+
+
+def write_index(path: str, vectors: int, dimension: int, batch: int = 10000):
+    index = faiss.IndexFlatL2(dimension)
+    rng = np.random.default_rng(0)
+    for start in range(0, vectors, batch):
+        index.add(rng.random((min(batch, vectors - start), dimension), dtype=np.float32))
+    faiss.write_index(index, path)
+
+
+def worker(index_path: str, dimension: int, searches: int, results):
+    before = memory()
+    index = read_index(index_path)
+    loaded = memory()
+    queries = np.random.default_rng(os.getpid()).random((searches, dimension), dtype=np.float32)
+    index.search(queries, 5)
+    searched = memory()
+    results.put({
+        stage: {name: values[name] - before[name] for name in before}
+        for stage, values in (("load", loaded), ("search", searched))
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--searches", type=int, default=16, help="queries per worker after loading")
+    parser.add_argument("--max-private", type=float, default=0.05,
+                        help="allowed private memory growth per worker as a fraction of the index size")
+    args = parser.parse_args()
+
+    mb = 1024 * 1024
+    with tempfile.TemporaryDirectory() as workdir:
+        index_path = os.path.join(workdir, INDEX_FILE)
+        write_index(index_path, args.vectors, args.dimension)
+        size = os.path.getsize(index_path)
+        print(f"Index: {args.vectors} x {args.dimension} flat, {size / mb:.0f} MB on disk, {args.workers} workers")
+        print(f"{'worker':>7} {'stage':>7} {'private MB':>11} {'shared MB':>10}")
+
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(index_path, args.dimension, args.searches, results))
+                     for _ in range(args.workers)]
+        for process in processes:
+            process.start()
+        reports = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    worst = 0
+    for number, report in enumerate(reports, 1):
+        for stage, growth in report.items():
+            print(f"{number:>7} {stage:>7} {growth['RssAnon'] / mb:>11.1f} {growth['RssFile'] / mb:>10.1f}")
+            worst = max(worst, growth["RssAnon"])
+    limit = args.max_private * size
+    if worst > limit:
+        print(f"❌ A worker gained {worst / mb:.0f} MB of private memory (limit {limit / mb:.0f} MB); "
+              f"the index is not memory-mapped")
+        sys.exit(1)
+    print(f"✅ Largest private growth {worst / mb:.1f} MB (limit {limit / mb:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,656 @@
+# benchmarks/load_test.py
+"""Load-test the three services against a local Gemini stand-in.
+
+Starts benchmarks/fake_gemini.py with a latency profile, then
+backend/app.py (exercise suggestions), backend/feedback.py (live
+feedback) and ChatBackend/main.py (document chat) as separate processes
+pointed at it, and drives a mix of virtual users for a fixed time:
+
+- ``feedback``: a pose stream per user, one second of bicep-curl frames
+  per batch request (or single frames at the frontend's 3 s cadence
+  with ``--feedback-mode frame``),
+- ``chat``: uploads the PDF once, then sends bursts of concurrent
+  questions, half of them streamed,
+- ``upload``: uploads the PDF to a new session and waits for ingestion,
+  over and over,
+- ``suggest``: exercise suggestions for common and unusual conditions.
+
+Reports throughput and p50/p95/p99 latency per operation plus the peak
+resident memory of each service (Linux). Results can be saved as a named
+baseline and later runs compared against it; a run is flagged (exit
+status 1) when p95 latency, throughput or peak memory regress by more
+than ``--tolerance``.
+
+The services run from a fresh temporary directory, so every run starts
+with cold caches. ``uploads/physiotherapy.pdf`` is used when it is a
+real PDF; otherwise a generated physiotherapy handout is uploaded.
+
+Usage (from the ChatBackend directory):
+    python -m benchmarks.load_test --mix mixed --duration 60
+    python -m benchmarks.load_test --mix chat --users chat=20 --profile slow --save-baseline chat-slow
+    python -m benchmarks.load_test --mix chat --users chat=20 --profile slow --compare chat-slow
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.fake_gemini import add_profile_arguments, make_certificate, profile_from_args
+
+CHAT_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(os.path.dirname(CHAT_BACKEND_DIR), "backend")
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+BUNDLED_PDFS = ("uploads/physiotherapy.pdf", "uploads/(physiotherapy.pdf)")
+
+# Virtual users per scenario
+MIXES = {
+    "feedback": {"feedback": 20},
+    "chat": {"chat": 10},
+    "upload": {"upload": 4},
+    "suggest": {"suggest": 10},
+    "mixed": {"feedback": 10, "chat": 5, "upload": 2, "suggest": 5},
+}
+# Which services each scenario needs
+SCENARIO_SERVICES = {"feedback": "feedback", "chat": "chat", "upload": "chat", "suggest": "suggest"}
+
+CHAT_QUESTIONS = [
+    "What exercises help with lower back pain?",
+    "How often should I do hamstring stretches?",
+    "Is it safe to exercise with a knee sprain?",
+    "How long does a shoulder strain take to heal?",
+    "What are good exercises after ankle surgery?",
+    "How do I strengthen my core safely?",
+    "Which stretches help with neck stiffness?",
+    "What exercises help with lower back pain?",
+    "Should I use ice or heat for a pulled calf?",
+    "How many sets of bridges should I do?",
+    "How do I perform a bicep curl with good form?",
+    "What can I do for tendinitis in my elbow?",
+]
+CONDITIONS = [
+    {"injuryType": "knee pain", "duration": "2 weeks", "severity": "Mild", "message": ""},
+    {"injuryType": "lower back strain", "duration": "3 months", "severity": "Moderate", "message": ""},
+    {"injuryType": "ankle sprain", "duration": "5 days", "severity": "Severe", "message": ""},
+    {"injuryType": "shoulder stiffness", "duration": "8 weeks", "severity": "Mild", "message": ""},
+    {"injuryType": "neck pain", "duration": "1 year", "severity": "6", "message": "worse after long days at my desk"},
+    {"injuryType": "hip pain", "duration": "a few weeks", "severity": "Moderate",
+     "message": "started after running a half marathon and hurts when climbing stairs"},
+]
+
+HANDOUT_TOPICS = ["knee", "lower back", "shoulder", "ankle", "neck", "hip", "elbow", "wrist"]
+HANDOUT_SENTENCES = [
+    "For {topic} pain, begin with gentle range of motion work and progress to {exercise} as symptoms settle.",
+    "{exercise} strengthens the muscles around the {topic}; perform two sets of ten to fifteen repetitions.",
+    "Stop {exercise} if pain in the {topic} rises above four out of ten and resume at a lower intensity.",
+    "Patients recovering from {topic} surgery should wait for clearance before loading {exercise}.",
+    "Ice the {topic} for fifteen minutes after {exercise} during the first two weeks of rehabilitation.",
+    "A {topic} strain usually improves within six weeks when {exercise} is performed three times a week.",
+]
+HANDOUT_EXERCISES = ["bridges", "clamshells", "wall angels", "calf raises", "bird dogs", "hamstring stretches",
+                     "seated rows", "ankle circles", "side planks", "bicep curls"]
+
+NUM_LANDMARKS = 33
+# MediaPipe indices of the right shoulder, elbow, wrist and hip
+RIGHT_ARM = (12, 14, 16, 24)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _pdf_text(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_handout_pdf(path: str, pages: int = 24, lines_per_page: int = 44):
+    """A text PDF of physiotherapy advice (one Helvetica text block per page)."""
+    rng = random.Random(7)
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        topic = HANDOUT_TOPICS[page % len(HANDOUT_TOPICS)]
+        lines = [f"Section {page + 1}: rehabilitation of the {topic}"]
+        lines += [rng.choice(HANDOUT_SENTENCES).format(topic=topic, exercise=rng.choice(HANDOUT_EXERCISES))
+                  for _ in range(lines_per_page)]
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_text(line)}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {len(objects)} 0 R "
+                       "/Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def resolve_pdf(pdf_path: str, workdir: str) -> str:
+    if pdf_path:
+        return pdf_path
+    for candidate in BUNDLED_PDFS:
+        path = os.path.join(CHAT_BACKEND_DIR, candidate)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                if f.read(5) == b"%PDF-":
+                    return path
+    path = os.path.join(workdir, "physiotherapy.pdf")
+    write_handout_pdf(path)
+    print("No bundled PDF found (uploads/physiotherapy.pdf is a placeholder); uploading a generated handout")
+    return path
+
+
+def curl_frame(t: float, period: float, swing: float) -> list:
+    """MediaPipe-style landmarks for a right-arm bicep curl at time ``t``."""
+    # Elbow angle sweeps 35-160 degrees; swing moves the elbow forward (poor form)
+    angle = math.radians(97.5 + 62.5 * math.cos(2 * math.pi * t / period))
+    shoulder, hip = (0.50, 0.30), (0.50, 0.62)
+    elbow = (0.50 + swing * max(0.0, math.sin(2 * math.pi * t / period)), 0.46)
+    wrist = (elbow[0] + 0.15 * math.sin(angle), elbow[1] - 0.15 * math.cos(angle))
+    points = [{"x": 0.5, "y": 0.5, "z": 0.0, "visibility": 0.9} for _ in range(NUM_LANDMARKS)]
+    for index, (x, y) in zip(RIGHT_ARM, (shoulder, elbow, wrist, hip)):
+        jitter = random.gauss(0, 0.003)
+        points[index] = {"x": x + jitter, "y": y + jitter, "z": 0.0, "visibility": 0.98}
+    return points
+
+
+def packed_frames(frames: list) -> str:
+    values = np.array([[(p["x"], p["y"], p["z"], p["visibility"]) for p in frame] for frame in frames], dtype="<f4")
+    return base64.b64encode(values.tobytes()).decode()
+
+
+def process_tree_rss(pid: int) -> int:
+    """Resident bytes of ``pid`` and its descendants (e.g. ingestion workers); 0 where /proc is unavailable."""
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+class Service:
+    """A service process with its base URL, log file and memory samples."""
+
+    def __init__(self, name: str, command: list, cwd: str, env: dict, port: int, ready_path: str, log_dir: str):
+        self.name = name
+        self.command = command
+        self.cwd = cwd
+        self.env = env
+        self.port = port
+        self.ready_path = ready_path
+        self.url = f"http://127.0.0.1:{port}"
+        self.log_path = os.path.join(log_dir, f"{name}.log")
+        self.process = None
+        self.memory = []
+
+    def start(self):
+        log = open(self.log_path, "wb")
+        self.process = subprocess.Popen(self.command, cwd=self.cwd, env=self.env, stdout=log, stderr=subprocess.STDOUT,
+                                        start_new_session=True)
+        log.close()
+
+    async def wait_ready(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient(timeout=2) as client:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    break
+                try:
+                    if (await client.get(self.url + self.ready_path)).status_code == 200:
+                        return
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.25)
+        self.stop()
+        raise RuntimeError(f"{self.name} did not become ready; see {self.log_path}")
+
+    def sample_memory(self):
+        if self.process is not None and self.process.poll() is None:
+            self.memory.append(process_tree_rss(self.process.pid))
+
+    def memory_stats(self) -> dict:
+        samples = [sample for sample in self.memory if sample]
+        if not samples:
+            return {}
+        mb = 1024 * 1024
+        return {"start_mb": round(samples[0] / mb, 1), "peak_mb": round(max(samples) / mb, 1),
+                "end_mb": round(samples[-1] / mb, 1)}
+
+    def stop(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+class Recorder:
+    """Latency samples per operation; samples that start during warmup are dropped."""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.samples = {}
+        self.errors = {}
+        self.measured_until = None
+
+    def record(self, operation: str, started: float, seconds: float, ok: bool = True):
+        if started < self.measure_from:
+            return
+        if ok:
+            self.samples.setdefault(operation, []).append(seconds)
+        else:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        results = {}
+        for operation in sorted(set(self.samples) | set(self.errors)):
+            latencies = np.array(self.samples.get(operation, []), dtype=np.float64) * 1000
+            errors = self.errors.get(operation, 0)
+            row = {"count": int(latencies.size), "errors": errors,
+                   "error_rate": round(errors / (latencies.size + errors), 4),
+                   "throughput_per_s": round(latencies.size / elapsed, 2)}
+            if latencies.size:
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+                row.update({"p50_ms": round(float(p50), 1), "p95_ms": round(float(p95), 1),
+                            "p99_ms": round(float(p99), 1), "mean_ms": round(float(latencies.mean()), 1),
+                            "max_ms": round(float(latencies.max()), 1)})
+            results[operation] = row
+        return results
+
+
+class LoadTest:
+    def __init__(self, args, services: dict, pdf_path: str, recorder: Recorder, deadline: float):
+        self.args = args
+        self.services = services
+        self.recorder = recorder
+        self.deadline = deadline
+        with open(pdf_path, "rb") as f:
+            self.pdf = f.read()
+        self.pdf_name = "physiotherapy.pdf"
+        self.uploads = 0
+
+    def running(self) -> bool:
+        return time.monotonic() < self.deadline
+
+    async def timed(self, operation: str, request):
+        """Await ``request`` and record its latency; returns the response or None on failure."""
+        started = time.monotonic()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.recorder.record(operation, started, 0, ok=False)
+            return None
+        self.recorder.record(operation, started, time.monotonic() - started, ok=response.is_success)
+        return response if response.is_success else None
+
+    async def pace(self, started: float, interval: float):
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    # Live feedback
+
+    async def feedback_user(self, client: httpx.AsyncClient, user: int):
+        url = self.services["feedback"].url
+        session_id = f"bench-{user}"
+        period, swing = random.uniform(2.0, 3.5), random.choice([0.0, 0.0, 0.06])
+        clock, rep, fps = random.uniform(0, period), 0, 30
+        while self.running():
+            started = time.monotonic()
+            stage = "up" if math.cos(2 * math.pi * clock / period) < 0 else "down"
+            if self.args.feedback_mode == "batch":
+                frames = [curl_frame(clock + i / fps, period, swing) for i in range(fps)]
+                clock += 1
+                rep = int(clock / period)
+                await self.timed("feedback_batch", client.post(f"{url}/live-feedback/batch", json={
+                    "packed": packed_frames(frames), "channels": 4, "fps": fps,
+                    "rep": rep, "stage": stage, "sessionId": session_id,
+                }))
+                await self.pace(started, 1.0)
+            else:
+                clock += self.args.feedback_interval
+                rep = int(clock / period)
+                await self.timed("feedback_frame", client.post(f"{url}/live-feedback", json={
+                    "landmarks": curl_frame(clock, period, swing), "rep": rep, "stage": stage,
+                    "sessionId": session_id,
+                }))
+                await self.pace(started, self.args.feedback_interval)
+
+    # Document chat
+
+    def pdf_bytes(self) -> bytes:
+        self.uploads += 1
+        if not self.args.unique_uploads:
+            return self.pdf
+        # A trailing comment changes the file hash, so the index is rebuilt (chunk embeddings stay cached)
+        return self.pdf + f"\n% upload {self.uploads}\n".encode()
+
+    async def upload_document(self, client: httpx.AsyncClient) -> str:
+        """Upload the PDF to a new session and wait until it is searchable; returns the session id."""
+        url = self.services["chat"].url
+        response = await self.timed("create_session", client.post(f"{url}/api/sessions"))
+        if response is None:
+            return None
+        session_id = response.json()["session_id"]
+        started = time.monotonic()
+        response = await self.timed("upload", client.post(
+            f"{url}/api/sessions/{session_id}/upload",
+            files={"file": (self.pdf_name, self.pdf_bytes(), "application/pdf")},
+        ))
+        if response is None:
+            return None
+        job_id = response.json()["job_id"]
+        searchable_at = None
+        while True:
+            job = (await client.get(f"{url}/api/jobs/{job_id}")).json()
+            if job["searchable"] and searchable_at is None:
+                searchable_at = time.monotonic()
+                self.recorder.record("upload_to_searchable", started, searchable_at - started)
+            if job["stage"] in ("done", "failed"):
+                self.recorder.record("upload_to_indexed", started, time.monotonic() - started,
+                                     ok=job["stage"] == "done")
+                return session_id if job["stage"] == "done" else None
+            await asyncio.sleep(0.1)
+
+    async def ask(self, client: httpx.AsyncClient, session_id: str, question: str, stream: bool):
+        url = f"{self.services['chat'].url}/api/sessions/{session_id}/chat"
+        if not stream:
+            await self.timed("chat", client.post(url, json={"message": question}))
+            return
+        started = time.monotonic()
+        first_token, ok = None, False
+        try:
+            async with client.stream("POST", f"{url}/stream", json={"message": question}) as response:
+                ok = response.is_success
+                async for line in response.aiter_lines():
+                    if line.startswith("data:") and first_token is None:
+                        first_token = time.monotonic()
+                    elif line.startswith("event: error"):
+                        ok = False
+        except httpx.HTTPError:
+            ok = False
+        if first_token is not None and ok:
+            self.recorder.record("chat_stream_first_token", started, first_token - started)
+        self.recorder.record("chat_stream_total", started, time.monotonic() - started, ok=ok)
+
+    async def chat_user(self, client: httpx.AsyncClient, user: int):
+        session_id = await self.upload_document(client)
+        if session_id is None:
+            return
+        while self.running():
+            started = time.monotonic()
+            questions = random.sample(CHAT_QUESTIONS, self.args.chat_burst)
+            await asyncio.gather(*(self.ask(client, session_id, question, stream=i % 2 == 1)
+                                   for i, question in enumerate(questions)))
+            await self.pace(started, self.args.chat_think)
+
+    async def upload_user(self, client: httpx.AsyncClient, user: int):
+        while self.running():
+            await self.upload_document(client)
+
+    # Exercise suggestions
+
+    async def suggest_user(self, client: httpx.AsyncClient, user: int):
+        url = self.services["suggest"].url
+        while self.running():
+            started = time.monotonic()
+            await self.timed("suggest", client.post(f"{url}/api/suggest-exercises", json=random.choice(CONDITIONS)))
+            await self.pace(started, self.args.suggest_interval)
+
+    async def run(self, users: dict):
+        scenarios = {"feedback": self.feedback_user, "chat": self.chat_user, "upload": self.upload_user,
+                     "suggest": self.suggest_user}
+        total = sum(users.values())
+        limits = httpx.Limits(max_connections=total * max(1, self.args.chat_burst), max_keepalive_connections=total)
+        async with httpx.AsyncClient(timeout=self.args.request_timeout, limits=limits) as client:
+            await asyncio.gather(*(scenarios[scenario](client, user)
+                                   for scenario, count in users.items() for user in range(count)))
+
+
+def start_services(args, needed: set, workdir: str, cert_path: str, key_path: str) -> dict:
+    log_dir = os.path.join(workdir, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    grpc_port, http_port = free_port(), free_port()
+    profile_args = [f"--profile={args.profile}"] + [
+        f"--{name.replace('_', '-')}={value}" for name, value in profile_from_args(args).items()
+    ]
+    services = {"gemini": Service(
+        "fake_gemini",
+        [sys.executable, "-m", "benchmarks.fake_gemini", f"--grpc-port={grpc_port}", f"--http-port={http_port}",
+         f"--cert={cert_path}", f"--key={key_path}", *profile_args],
+        CHAT_BACKEND_DIR, dict(os.environ), http_port, "/stats", log_dir,
+    )}
+    env = {
+        **os.environ,
+        "GEMINI_API_ENDPOINT": f"localhost:{grpc_port}",
+        "GEMINI_EMBEDDING_ENDPOINT": f"http://127.0.0.1:{http_port}",
+        "GRPC_DEFAULT_SSL_ROOTS_FILE_PATH": cert_path,
+        "GEMINI_API_KEY": "fake-key",
+        "gemini_api_key1": "fake-key",
+        "LOG_SAMPLE_RATE": str(args.log_sample_rate),
+        "PYTHONPATH": CHAT_BACKEND_DIR,
+    }
+    if args.plan_table:
+        env["EXERCISE_PLAN_TABLE"] = os.path.abspath(args.plan_table)
+
+    def flask_app(module, port):
+        return [sys.executable, "-m", "flask", "--app", module, "run", "--host=127.0.0.1", f"--port={port}",
+                "--no-reload", "--no-debugger", "--with-threads"]
+
+    if "suggest" in needed:
+        port = free_port()
+        services["suggest"] = Service("app", flask_app("app", port), BACKEND_DIR, env, port, "/metrics", log_dir)
+    if "feedback" in needed:
+        port = free_port()
+        services["feedback"] = Service("feedback", flask_app("feedback", port), BACKEND_DIR, env, port, "/metrics",
+                                       log_dir)
+    if "chat" in needed:
+        port = free_port()
+        services["chat"] = Service(
+            "chat",
+            [sys.executable, "-m", "uvicorn", "main:app", f"--app-dir={CHAT_BACKEND_DIR}", "--host=127.0.0.1",
+             f"--port={port}", "--log-level=warning"],
+            workdir, env, port, "/health", log_dir,
+        )
+    return services
+
+
+async def run_benchmark(args, users: dict, workdir: str) -> dict:
+    cert_path, key_path = make_certificate(workdir)
+    pdf_path = resolve_pdf(args.pdf, workdir)
+    services = start_services(args, {SCENARIO_SERVICES[scenario] for scenario in users}, workdir, cert_path, key_path)
+    try:
+        services["gemini"].start()
+        await services["gemini"].wait_ready(args.startup_timeout)
+        for service in services.values():
+            if service.process is None:
+                service.start()
+        await asyncio.gather(*(service.wait_ready(args.startup_timeout) for service in services.values()))
+        print(f"Services ready: {', '.join(f'{s.name} {s.url}' for s in services.values())}")
+
+        started = time.monotonic()
+        recorder = Recorder(started + args.warmup)
+        load = LoadTest(args, services, pdf_path, recorder, started + args.warmup + args.duration)
+
+        async def sample_memory():
+            while True:
+                for service in services.values():
+                    service.sample_memory()
+                await asyncio.sleep(0.5)
+
+        sampler = asyncio.create_task(sample_memory())
+        await load.run(users)
+        # Requests still in flight at the deadline finish but do not extend the measured window
+        elapsed = min(time.monotonic(), load.deadline) - recorder.measure_from
+        sampler.cancel()
+        for service in services.values():
+            service.sample_memory()
+
+        async with httpx.AsyncClient(timeout=5) as client:
+            gemini_stats = (await client.get(services["gemini"].url + "/stats")).json()
+        return {
+            "meta": {
+                "mix": args.mix, "users": users, "profile": gemini_stats.pop("profile"), "profile_name": args.profile,
+                "duration_s": round(elapsed, 1), "warmup_s": args.warmup, "feedback_mode": args.feedback_mode,
+                "commit": git_commit(), "python": platform.python_version(), "cpus": os.cpu_count(),
+                "platform": platform.platform(), "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            },
+            "operations": recorder.summary(elapsed),
+            "memory": {service.name: service.memory_stats() for service in services.values()
+                       if service.name != "fake_gemini"},
+            "gemini_calls": gemini_stats,
+        }
+    finally:
+        for service in services.values():
+            service.stop()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=CHAT_BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict):
+    meta = results["meta"]
+    print(f"\n{meta['mix']} mix, {meta['users']}, profile {meta['profile_name']}, {meta['duration_s']}s measured")
+    print(f"{'operation':<26} {'count':>7} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for operation, row in results["operations"].items():
+        print(f"{operation:<26} {row['count']:>7} {row['errors']:>5} {row['throughput_per_s']:>8.2f} "
+              f"{row.get('p50_ms', float('nan')):>9.1f} {row.get('p95_ms', float('nan')):>9.1f} "
+              f"{row.get('p99_ms', float('nan')):>9.1f}")
+    print(f"\n{'service':<12} {'start MB':>9} {'peak MB':>9} {'end MB':>9}")
+    for name, memory in results["memory"].items():
+        if memory:
+            print(f"{name:<12} {memory['start_mb']:>9.1f} {memory['peak_mb']:>9.1f} {memory['end_mb']:>9.1f}")
+    print(f"\nGemini stand-in calls: {results['gemini_calls']}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Print changes against ``baseline``; returns the regressions beyond ``tolerance``."""
+    regressions = []
+
+    def check(label, current, previous, higher_is_worse):
+        if current is None or not previous:
+            return
+        change = (current - previous) / previous
+        worse = change > tolerance if higher_is_worse else change < -tolerance
+        marker = "  REGRESSION" if worse else ""
+        print(f"  {label:<42} {previous:>10.1f} -> {current:>10.1f} ({change:+.1%}){marker}")
+        if worse:
+            regressions.append(label)
+
+    print(f"\nCompared with baseline from {baseline['meta'].get('created_at')} (commit {baseline['meta'].get('commit')}):")
+    if baseline["meta"].get("users") != results["meta"]["users"] or baseline["meta"].get("profile") != results["meta"]["profile"]:
+        print("  warning: the baseline used a different user mix or latency profile")
+    for operation, row in results["operations"].items():
+        previous = baseline["operations"].get(operation, {})
+        check(f"{operation} p95 ms", row.get("p95_ms"), previous.get("p95_ms"), True)
+        check(f"{operation} req/s", row.get("throughput_per_s"), previous.get("throughput_per_s"), False)
+    for name, memory in results["memory"].items():
+        check(f"{name} peak MB", memory.get("peak_mb"), baseline["memory"].get(name, {}).get("peak_mb"), True)
+    return regressions
+
+
+def parse_users(mix: str, overrides: str) -> dict:
+    users = dict(MIXES[mix])
+    for item in filter(None, (overrides or "").split(",")):
+        scenario, _, count = item.partition("=")
+        if scenario not in SCENARIO_SERVICES:
+            raise SystemExit(f"Unknown scenario '{scenario}' (choose from {', '.join(SCENARIO_SERVICES)})")
+        users[scenario] = int(count)
+    return {scenario: count for scenario, count in users.items() if count > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--users", help="virtual users per scenario, e.g. feedback=30,chat=5 (overrides the mix)")
+    parser.add_argument("--duration", type=float, default=60, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=10, help="seconds of load before measuring")
+    add_profile_arguments(parser)
+    parser.add_argument("--feedback-mode", choices=("batch", "frame"), default="batch")
+    parser.add_argument("--feedback-interval", type=float, default=3.0, help="seconds between frames in frame mode")
+    parser.add_argument("--chat-burst", type=int, default=4, help="concurrent questions per chat burst")
+    parser.add_argument("--chat-think", type=float, default=5.0, help="seconds between a chat user's bursts")
+    parser.add_argument("--suggest-interval", type=float, default=2.0, help="seconds between a user's suggestions")
+    parser.add_argument("--pdf", help="PDF to upload (default: uploads/physiotherapy.pdf, or a generated handout)")
+    parser.add_argument("--unique-uploads", action="store_true",
+                        help="make every upload a distinct file so indexes are not shared between sessions")
+    parser.add_argument("--plan-table", help="exercise plan table for app.py (default: the app's own)")
+    parser.add_argument("--log-sample-rate", type=float, default=0.0, help="LOG_SAMPLE_RATE for the services")
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--startup-timeout", type=float, default=90)
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    parser.add_argument("--save-baseline", metavar="NAME", help=f"save the results as {BASELINE_DIR}/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="compare with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative change counted as a regression")
+    parser.add_argument("--keep-workdir", action="store_true", help="keep service data and logs after the run")
+    args = parser.parse_args()
+
+    users = parse_users(args.mix, args.users)
+    workdir = tempfile.mkdtemp(prefix="yantra_load_")
+    try:
+        results = asyncio.run(run_benchmark(args, users, workdir))
+    finally:
+        if args.keep_workdir:
+            print(f"Service data and logs kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save_baseline}.json")
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {path}")
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/pdf_extraction.py
+"""Benchmark parallel PDF extraction against the number of worker processes.
+
+Parses and splits every page of a PDF sequentially in this process, then
+sharded across process pools of increasing size, and prints wall time,
+pages per second and speedup over the sequential run. Large clinical
+manuals (hundreds of pages) show the effect best.
+
+Usage (from the ChatBackend directory):
+    python -m benchmarks.pdf_extraction path/to/manual.pdf
+    python -m benchmarks.pdf_extraction manual.pdf --workers 1,2,4,8 --pages-per-batch 8 --repeat 3
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.pdf_pipeline import iter_pdf_chunks, page_count
+
+
+def _warm(_):
+    return None
+
+
+def run(pdf_path: str, pages_per_batch: int, workers: int = 0) -> tuple:
+    """Seconds to parse and split the whole PDF and the number of chunks (0 workers = sequential)"""
+    if workers == 0:
+        started = time.perf_counter()
+        chunks = sum(len(batch) for batch in iter_pdf_chunks(pdf_path, pages_per_batch))
+        return time.perf_counter() - started, chunks
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Start every worker before timing so process spawn cost is excluded
+        list(pool.map(_warm, range(workers)))
+        started = time.perf_counter()
+        batches = iter_pdf_chunks(pdf_path, pages_per_batch, executor=pool, max_in_flight=workers)
+        chunks = sum(len(batch) for batch in batches)
+        return time.perf_counter() - started, chunks
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, *(2 ** i for i in range(1, cpus.bit_length()) if 2 ** i <= cpus), cpus})
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pdf", help="PDF to extract")
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)),
+                        help="comma-separated worker counts (default: powers of two up to the core count)")
+    parser.add_argument("--pages-per-batch", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per configuration; the best is reported")
+    args = parser.parse_args()
+
+    pages = page_count(args.pdf)
+    print(f"{args.pdf}: {pages} pages, {cpus} cores, {args.pages_per_batch} pages per shard")
+    print(f"{'workers':>10} {'seconds':>9} {'pages/s':>9} {'speedup':>8} {'chunks':>7}")
+
+    baseline = None
+    for workers in [0] + [int(w) for w in args.workers.split(",")]:
+        seconds, chunks = min(run(args.pdf, args.pages_per_batch, workers) for _ in range(args.repeat))
+        baseline = baseline or seconds
+        label = "sequential" if workers == 0 else str(workers)
+        print(f"{label:>10} {seconds:>9.3f} {pages / seconds:>9.1f} {baseline / seconds:>7.2f}x {chunks:>7}")
+
+
+if __name__ == "__main__":
+    main()
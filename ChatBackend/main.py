@@ -1,11 +1,24 @@
 # main.py - Gemini Optimized Version
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from agents.chatbot_agent import GeminiSessionManager
+from agents.ingestion import IngestionQueue
+from agents.knowledge_base import get_knowledge_base
+from utils import gemini_clients
+from utils.concurrency import run_blocking
+from utils.answer_cache import answer_cache
+from utils.keyword_index import retrieval_stats
+from utils.embedding_scheduler import embedding_scheduler
+from utils.single_flight import answer_flight, summary_flight
+from yantra_common.instrumentation import REGISTRY, STAGE_SECONDS, instrument_fastapi, log_event, set_log_sample_rate
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
+import json
 import os
-from config.settings import DEBUG, UPLOAD_FOLDER, ALLOWED_EXTENSIONS, GOOGLE_API_KEY, PHYSIOTHERAPY_PROMPT, BICEP_CURL_PROMPT
+import time
+from config.settings import DEBUG, UPLOAD_FOLDER, ALLOWED_EXTENSIONS, GOOGLE_API_KEY, PHYSIOTHERAPY_PROMPT, BICEP_CURL_PROMPT, SESSION_SWEEP_INTERVAL, LOG_SAMPLE_RATE
 
 # Validate Google API key at startup
 if not GOOGLE_API_KEY:
@@ -24,10 +37,46 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrument_fastapi(app)
+set_log_sample_rate(LOG_SAMPLE_RATE)
 
 # Initialize Gemini session manager
 session_manager = GeminiSessionManager()
 
+# Background document ingestion (parse, embed, index) for uploads
+ingestion_queue = IngestionQueue(session_manager)
+
+# Existing counters exported as /metrics gauges, read at scrape time
+REGISTRY.add_collector("embedding_cache", lambda: gemini_clients.get_cached_embeddings().stats())
+REGISTRY.add_collector("session_cache", session_manager.sessions.stats)
+REGISTRY.add_collector("answer_cache", answer_cache.stats)
+REGISTRY.add_collector("retrieval", lambda: dict(retrieval_stats))
+REGISTRY.add_collector("embedding_scheduler", embedding_scheduler.stats)
+REGISTRY.add_collector("answer_single_flight", answer_flight.stats)
+REGISTRY.add_collector("summary_single_flight", summary_flight.stats)
+
+@app.on_event("startup")
+async def warmup_gemini_clients():
+    """Build shared Gemini clients and open connections before the first request"""
+    await asyncio.to_thread(gemini_clients.warmup)
+    # Map the shared knowledge base once so the first session does not pay for it
+    await asyncio.to_thread(get_knowledge_base)
+
+async def sweep_idle_sessions():
+    """Evict idle session agents even when no requests arrive"""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        session_manager.sessions.sweep()
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    app.state.session_sweeper = asyncio.create_task(sweep_idle_sessions())
+
+@app.on_event("shutdown")
+async def shutdown_ingestion():
+    app.state.session_sweeper.cancel()
+    ingestion_queue.shutdown()
+
 # Pydantic models for request/response
 class ChatRequest(BaseModel):
     message: str
@@ -45,6 +94,8 @@ class UploadResponse(BaseModel):
     message: str
     session_id: str
     document_chunks: int = 0
+    job_id: Optional[str] = None
+    status: Optional[str] = None
 
 class SessionInfo(BaseModel):
     session_id: str
@@ -54,6 +105,9 @@ class SessionInfo(BaseModel):
     ready_for_chat: bool
     document_chunks: int
     document_summary: Optional[str] = None
+    filename: Optional[str] = None
+    created_at: Optional[float] = None
+    ingestion: Optional[dict] = None
 
 @app.get("/")
 async def root():
@@ -69,7 +123,16 @@ async def health_check():
     return {
         "status": "healthy",
         "gemini_configured": bool(GOOGLE_API_KEY),
-        "upload_folder": UPLOAD_FOLDER
+        "upload_folder": UPLOAD_FOLDER,
+        "embedding_cache": gemini_clients.get_cached_embeddings().stats(),
+        "session_cache": session_manager.sessions.stats(),
+        "answer_cache": answer_cache.stats(),
+        "retrieval": dict(retrieval_stats),
+        "embedding_scheduler": embedding_scheduler.stats(),
+        "single_flight": {
+            "answers": answer_flight.stats(),
+            "summaries": summary_flight.stats()
+        }
     }
 
 @app.post("/api/sessions", response_model=SessionResponse)
@@ -81,9 +144,9 @@ async def create_session():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating session: {str(e)}")
 
-@app.post("/api/sessions/{session_id}/upload", response_model=UploadResponse)
+@app.post("/api/sessions/{session_id}/upload", response_model=UploadResponse, status_code=202)
 async def upload_document(session_id: str, file: UploadFile = File(...)):
-    """Upload a PDF document for a specific session"""
+    """Upload a PDF document for a specific session; processing continues in the background"""
     
     # Validate file type
     if not file.filename.lower().endswith('.pdf'):
@@ -98,21 +161,16 @@ async def upload_document(session_id: str, file: UploadFile = File(...)):
         )
     
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Check file size (limit to 15MB for better processing)
-        if len(file_content) > 15 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="File too large. Maximum size is 15MB")
-        
-        # Upload and process document
-        agent = session_manager.upload_document(session_id, file_content, file.filename)
+        # Stream the document to disk (size limit enforced while copying) and queue it for processing
+        pdf_path = await session_manager.asave_upload(session_id, file, file.filename)
+        job = ingestion_queue.submit(session_id, pdf_path, file.filename)
         
         return UploadResponse(
             filename=file.filename,
-            message="Document uploaded and processed successfully with Gemini",
+            message="Document uploaded; processing started. Poll the status endpoint for progress.",
             session_id=session_id,
-            document_chunks=len(agent.document_chunks)
+            job_id=job.job_id,
+            status=job.stage
         )
         
     except HTTPException:
@@ -120,22 +178,34 @@ async def upload_document(session_id: str, file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading document: {str(e)}")
 
+async def get_chat_agent(session_id: str):
+    """Agent for a chat request, or the HTTP error explaining why the session cannot chat yet"""
+    job = ingestion_queue.job_for_session(session_id)
+    if job is not None and not job.finished and not job.searchable:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Document is still being processed ({job.stage}, {job.progress}%)"
+        )
+    
+    # Get agent for session
+    agent = await run_blocking(session_manager.get_agent, session_id)
+    
+    if agent is None:
+        raise HTTPException(
+            status_code=404, 
+            detail="Session not found or no document uploaded for this session"
+        )
+    return agent
+
 @app.post("/api/sessions/{session_id}/chat", response_model=ChatResponse)
 async def chat(session_id: str, request: ChatRequest):
     """Chat with the Gemini-powered assistant using the uploaded document"""
     
     try:
-        # Get agent for session
-        agent = session_manager.get_agent(session_id)
-        
-        if agent is None:
-            raise HTTPException(
-                status_code=404, 
-                detail="Session not found or no document uploaded for this session"
-            )
+        agent = await get_chat_agent(session_id)
         
         # Get answer from Gemini
-        answer = agent.get_answer(request.message)
+        answer = await agent.aget_answer(request.message)
         
         return ChatResponse(response=answer, session_id=session_id)
         
@@ -144,23 +214,90 @@ async def chat(session_id: str, request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+@app.post("/api/sessions/{session_id}/chat/stream")
+async def chat_stream(session_id: str, request: ChatRequest):
+    """Chat like /chat, but stream the answer as Server-Sent Events while Gemini generates it.
+
+    Each ``data`` event carries a ``delta`` text fragment; the stream ends
+    with a ``done`` event, or an ``error`` event if generation fails midway.
+    """
+    started = time.perf_counter()
+    agent = await get_chat_agent(session_id)
+    
+    async def events():
+        first_token_at = None
+        try:
+            async for text in agent.astream_answer(request.message):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                yield sse_event({"delta": text})
+            yield sse_event({"session_id": session_id}, event="done")
+        except HTTPException as e:
+            yield sse_event({"detail": e.detail}, event="error")
+        except Exception as e:
+            yield sse_event({"detail": f"Error processing chat: {str(e)}"}, event="error")
+        finally:
+            total = time.perf_counter() - started
+            STAGE_SECONDS.observe(total, stage="stream_total")
+            if first_token_at is not None:
+                STAGE_SECONDS.observe(first_token_at - started, stage="stream_first_token")
+            log_event("chat_streamed", session_id=session_id,
+                      ttfb_ms=round((first_token_at - started) * 1000) if first_token_at else None,
+                      total_ms=round(total * 1000))
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/api/sessions/{session_id}/status", response_model=SessionInfo)
 async def get_session_status(session_id: str):
     """Get detailed session status including document info"""
     
     try:
-        info = session_manager.get_session_info(session_id)
+        info = await session_manager.aget_session_info(session_id)
+        job = ingestion_queue.job_for_session(session_id)
+        if job is not None:
+            info["ingestion"] = job.to_dict()
+            if not job.finished:
+                # Chat works on the pages indexed so far
+                info["ready_for_chat"] = job.searchable
         return SessionInfo(**info)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error checking session status: {str(e)}")
 
+@app.get("/api/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    """Get the stage and progress of a document ingestion job"""
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.post("/api/jobs/{job_id}/retry", status_code=202)
+async def retry_ingestion_job(job_id: str):
+    """Re-run a failed ingestion job; chunks embedded before the failure are not embedded again"""
+    if ingestion_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        job = ingestion_queue.retry(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return job.to_dict()
+
 @app.get("/api/sessions/{session_id}/summary")
 async def get_document_summary(session_id: str):
     """Get a summary of the uploaded document"""
     
     try:
-        agent = session_manager.get_agent(session_id)
+        agent = await run_blocking(session_manager.get_agent, session_id)
         
         if agent is None:
             raise HTTPException(
@@ -168,7 +305,9 @@ async def get_document_summary(session_id: str):
                 detail="Session not found or no document uploaded"
             )
         
-        summary = agent.get_document_summary()
+        summary = await agent.aget_document_summary()
+        if await run_blocking(agent.load_summary) is not None:
+            await run_blocking(session_manager.set_summary, session_id, summary)
         
         return {
             "session_id": session_id,
@@ -186,16 +325,7 @@ async def delete_session(session_id: str):
     """Delete a session and all its data"""
     
     try:
-        import shutil
-        
-        session_dir = f"backend/sessions/{session_id}"
-        
-        if os.path.exists(session_dir):
-            shutil.rmtree(session_dir)
-        
-        # Remove from memory
-        if session_id in session_manager.sessions:
-            del session_manager.sessions[session_id]
+        await run_blocking(session_manager.delete_session, session_id)
         
         return {"message": f"Session {session_id} deleted successfully"}
         
@@ -203,22 +333,11 @@ async def delete_session(session_id: str):
         raise HTTPException(status_code=500, detail=f"Error deleting session: {str(e)}")
 
 @app.get("/api/sessions")
-async def list_sessions():
-    """List all active sessions"""
+async def list_sessions(offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
+    """List sessions, newest first, a page at a time"""
     
     try:
-        sessions_dir = "backend/sessions"
-        if not os.path.exists(sessions_dir):
-            return {"sessions": []}
-        
-        sessions = []
-        for session_id in os.listdir(sessions_dir):
-            session_path = os.path.join(sessions_dir, session_id)
-            if os.path.isdir(session_path):
-                info = session_manager.get_session_info(session_id)
-                sessions.append(info)
-        
-        return {"sessions": sessions}
+        return await run_blocking(session_manager.list_sessions, offset, limit)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing sessions: {str(e)}")
@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+
+from agents import chatbot_agent
+from agents.chatbot_agent import GeminiChatbotAgent
+from utils.answer_cache import SemanticAnswerCache, answer_cache
+from utils.keyword_index import KeywordIndex
+
+DOCS = [
+    Document(page_content="Bicep curl: keep the elbow pinned to your side and lower the weight slowly."),
+    Document(page_content="Hammer curl: hold the dumbbells with a neutral grip."),
+]
+
+
+class FakeEmbeddings:
+    """Nothing embedded yet; any remote embedding call is counted"""
+
+    def __init__(self):
+        self.remote_calls = 0
+
+    def cached_query_embedding(self, text):
+        return None
+
+    def embed_query(self, text):
+        self.remote_calls += 1
+        return [1.0, 0.0]
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, stream=False):
+        self.calls += 1
+        return SimpleNamespace(text="Keep your elbow still.", usage_metadata=None)
+
+
+def _agent(monkeypatch) -> GeminiChatbotAgent:
+    monkeypatch.setattr(chatbot_agent.gemini_clients, "get_cached_embeddings", FakeEmbeddings)
+    monkeypatch.setattr(chatbot_agent.gemini_clients, "get_chat_model", FakeModel)
+    agent = GeminiChatbotAgent("test-answer-cache", "/nonexistent/document.pdf")
+    agent.document_chunks = list(DOCS)
+    agent.keyword_index = KeywordIndex(DOCS)
+    agent._index_loaded = True
+    return agent
+
+
+def test_repeated_confident_query_is_served_from_cache(monkeypatch):
+    agent = _agent(monkeypatch)
+    answer_cache.invalidate(agent.cache_scope)
+    try:
+        assert agent._keyword_search("bicep curl elbow")[1], "query should be answered from keywords alone"
+        first = asyncio.run(agent.aget_answer("bicep curl elbow"))
+        second = asyncio.run(agent.aget_answer("  Bicep curl ELBOW "))
+        assert first == second == "Keep your elbow still."
+        assert agent.model.calls == 1
+        assert agent.embeddings.remote_calls == 0
+    finally:
+        answer_cache.invalidate(agent.cache_scope)
+
+
+def test_text_and_embedding_entries_share_scope_bounds():
+    cache = SemanticAnswerCache(threshold=0.9, ttl=60, max_entries=2)
+    cache.store("doc", "template", None, "text only", query="What is a curl?")
+    cache.store("doc", "template", [1.0, 0.0], "embedded", query="How do I curl?")
+    assert cache.lookup("doc", "template", None, query="what is a  curl?") == "text only"
+    assert cache.lookup("doc", "template", [0.99, 0.05]) == "embedded"
+    assert cache.lookup("doc", "template", None, query="how do i curl?") == "embedded"
+    assert cache.lookup("other", "template", None, query="What is a curl?") is None
+    cache.store("doc", "template", [0.0, 1.0], "third")
+    assert cache.lookup("doc", "template", None, query="What is a curl?") is None
+    assert cache.invalidate("doc") == 2
+
+
+def test_deleting_one_session_keeps_answers_for_others_on_the_same_document(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(chatbot_agent, "SESSION_INDEX_PATH", str(tmp_path / "sessions.sqlite"))
+    monkeypatch.setattr(chatbot_agent.gemini_clients, "get_cached_embeddings", FakeEmbeddings)
+    monkeypatch.setattr(chatbot_agent.gemini_clients, "get_chat_model", FakeModel)
+    manager = chatbot_agent.GeminiSessionManager()
+    sessions = [manager.create_session() for _ in range(2)]
+    for session_id in sessions:
+        session_dir = tmp_path / "backend" / "sessions" / session_id
+        (session_dir / "document.pdf").write_bytes(b"%PDF")
+        (session_dir / chatbot_agent.DOCUMENT_HASH_FILE).write_text("shared-hash")
+        manager.index.update(session_id, processed=True, document_hash="shared-hash")
+    answer_cache.store("shared-hash", "template", None, "answer", query="question")
+    try:
+        manager.delete_session(sessions[0])
+        assert answer_cache.lookup("shared-hash", "template", None, query="question") == "answer"
+        manager.delete_session(sessions[1])
+        assert answer_cache.lookup("shared-hash", "template", None, query="question") is None
+    finally:
+        answer_cache.invalidate("shared-hash")
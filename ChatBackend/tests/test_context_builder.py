@@ -0,0 +1,41 @@
+from langchain_core.documents import Document
+
+from utils.context_builder import build_context, estimate_tokens
+
+TEXT = " ".join(f"Sentence {i} explains how to keep the elbow still during the curl." for i in range(20))
+
+
+def _docs(*texts):
+    return [Document(page_content=text) for text in texts]
+
+
+def test_overlapping_chunks_are_stitched_together():
+    first, second = TEXT[:700], TEXT[400:]
+    assert build_context(_docs(first, second), token_budget=10_000) == [TEXT]
+    # Order of retrieval does not matter
+    assert build_context(_docs(second, first), token_budget=10_000) == [TEXT]
+
+
+def test_contained_chunks_are_dropped_or_replaced():
+    assert build_context(_docs(TEXT, TEXT[100:300]), token_budget=10_000) == [TEXT]
+    assert build_context(_docs(TEXT[100:300], TEXT), token_budget=10_000) == [TEXT]
+
+
+def test_near_duplicates_are_dropped():
+    reworded = TEXT.replace("Sentence 3 ", "Line 3 ").replace("Sentence 7 ", "Line 7 ")
+    other = "Hammer curls use a neutral grip and work the brachialis."
+    assert build_context(_docs(TEXT, reworded, other), token_budget=10_000) == [TEXT, other]
+
+
+def test_passages_are_packed_in_rank_order_within_the_budget():
+    best, large, small = "a" * 400, "b" * 800, "c" * 200
+    budget = estimate_tokens(best) + estimate_tokens(small)
+    assert build_context(_docs(best, large, small), token_budget=budget) == [best, small]
+
+
+def test_best_passage_is_cut_down_when_nothing_fits():
+    assert build_context(_docs("x" * 1000, "y" * 1000), token_budget=10) == ["x" * 40]
+
+
+def test_empty_chunks_are_ignored():
+    assert build_context(_docs("  ", ""), token_budget=100) == []
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from utils import embedding_scheduler as es
+from utils.embedding_cache import CachedEmbeddings, EmbeddingStore
+from utils.embedding_scheduler import EmbeddingScheduler, TokenBucket
+
+
+class FlakyEmbeddings:
+    """Fails the first ``failures`` calls with ``error``, then returns one-element vectors"""
+
+    def __init__(self, failures=0, error=None, fail_on=None):
+        self.failures = failures
+        self.error = error
+        self.fail_on = fail_on
+        self.batches = []
+
+    async def aembed_documents(self, texts):
+        self.batches.append(list(texts))
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        if self.fail_on is not None and self.fail_on in texts:
+            raise ValueError("bad request")
+        return [[float(len(text))] for text in texts]
+
+
+def _record_sleeps(monkeypatch):
+    delays, sleep = [], asyncio.sleep
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(es.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+def test_token_bucket_paces_requests_after_the_burst():
+    async def run():
+        bucket = TokenBucket(rate=20, capacity=2)
+        start = time.monotonic()
+        waits = [await bucket.acquire() for _ in range(4)]
+        return waits, time.monotonic() - start
+
+    waits, elapsed = asyncio.run(run())
+    assert waits[:2] == [0.0, 0.0]
+    assert all(wait > 0 for wait in waits[2:])
+    assert elapsed >= 0.09
+
+
+def test_quota_errors_are_retried_with_exponential_backoff(monkeypatch):
+    delays = _record_sleeps(monkeypatch)
+    monkeypatch.setattr(es.random, "uniform", lambda low, high: high)
+    scheduler = EmbeddingScheduler(batch_size=10, rate_per_minute=60_000, burst=100, max_retries=3,
+                                   backoff_seconds=1, backoff_max_seconds=3)
+    client = FlakyEmbeddings(failures=3, error=google_exceptions.ResourceExhausted("quota"))
+    assert asyncio.run(scheduler._call(client.aembed_documents, ["a"])) == [[1.0]]
+    assert delays == [1, 2, 3]
+    assert scheduler.stats()["requests"] == 4
+    assert scheduler.stats()["retries"] == 3
+
+
+def test_permanent_errors_and_exhausted_retries_are_raised(monkeypatch):
+    _record_sleeps(monkeypatch)
+    scheduler = EmbeddingScheduler(rate_per_minute=60_000, burst=100, max_retries=1, backoff_seconds=0)
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler._call(FlakyEmbeddings(failures=1, error=ValueError("bad")).aembed_documents, ["a"]))
+    with pytest.raises(Exception, match="429"):
+        asyncio.run(scheduler._call(FlakyEmbeddings(failures=2, error=RuntimeError("429 rate")).aembed_documents, ["a"]))
+    assert scheduler.stats()["failures"] == 2
+    assert scheduler.stats()["retries"] == 1
+
+
+def test_rerun_only_embeds_batches_that_did_not_finish(tmp_path):
+    texts = [f"chunk {i}" for i in range(6)]
+    store = EmbeddingStore(str(tmp_path / "embeddings.sqlite"))
+    scheduler = EmbeddingScheduler(batch_size=2, rate_per_minute=60_000, burst=100, max_retries=0)
+
+    failing = FlakyEmbeddings(fail_on="chunk 4")
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.embed_documents(CachedEmbeddings(failing, store, "model"), texts))
+
+    healthy = FlakyEmbeddings()
+    progress = []
+    vectors = asyncio.run(scheduler.embed_documents(CachedEmbeddings(healthy, store, "model"), texts, progress.append))
+    assert healthy.batches == [["chunk 4", "chunk 5"]]
+    assert vectors == [[7.0]] * 6
+    assert progress == [4, 6]
@@ -0,0 +1,109 @@
+import json
+import os
+
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from agents import index_store
+
+EMBEDDINGS = DeterministicFakeEmbedding(size=8)
+TEXTS = ["Keep the elbow pinned.", "Lower the weight slowly."]
+LAYOUT = [["base", 3], ["overlay", 0], ["overlay", 1]]
+
+
+def _store(texts=TEXTS) -> FAISS:
+    return FAISS.from_texts(texts, EMBEDDINGS, metadatas=[{"page": i} for i in range(len(texts))])
+
+
+def _versions(path) -> list:
+    return sorted(entry for entry in os.listdir(path) if entry.startswith("v"))
+
+
+def test_save_makes_a_complete_version_live(tmp_path):
+    path = str(tmp_path / "index")
+    version = index_store.save(path, _store(), LAYOUT)
+    assert index_store.current_version(path) == version
+    assert sorted(os.listdir(version)) == ["chunks.jsonl", "index.faiss", "layout.json", "manifest.json"]
+    assert not [entry for entry in os.listdir(path) if entry.startswith(".CURRENT")]
+
+    vector_store, layout = index_store.load(path, EMBEDDINGS)
+    assert layout == LAYOUT
+    assert [doc.page_content for doc in index_store.overlay_documents(vector_store)] == TEXTS
+    assert index_store.overlay_documents(vector_store)[1].metadata == {"page": 1}
+    assert index_store.read_layout(path) == LAYOUT
+
+
+def test_base_only_index_has_no_overlay(tmp_path):
+    path = str(tmp_path / "index")
+    index_store.save(path, None, [["base", 0]])
+    assert index_store.load(path, EMBEDDINGS) == (None, [["base", 0]])
+
+
+def test_replaced_and_unfinished_versions_are_removed(tmp_path):
+    path = str(tmp_path / "index")
+    first = index_store.save(path, _store(), LAYOUT)
+    os.makedirs(os.path.join(path, "v0-crashed"))  # a save that died before switching CURRENT
+    second = index_store.save(path, _store(TEXTS[:1]), LAYOUT[:2])
+    assert _versions(path) == [os.path.basename(second)]
+    assert not os.path.exists(first)
+    assert index_store.load(path, EMBEDDINGS)[1] == LAYOUT[:2]
+
+
+def test_newer_versions_survive_an_older_save(tmp_path):
+    path = str(tmp_path / "index")
+    index_store.save(path, None, LAYOUT)
+    newer = os.path.join(path, "v99999999999999-later")  # still being written by another save
+    os.makedirs(newer)
+    index_store.save(path, None, LAYOUT)
+    assert os.path.isdir(newer)
+
+
+def test_newer_format_is_refused(tmp_path):
+    path = str(tmp_path / "index")
+    version = index_store.save(path, None, LAYOUT)
+    manifest_path = os.path.join(version, index_store.MANIFEST_FILE)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    with open(manifest_path, "w") as f:
+        json.dump({**manifest, "format": index_store.FORMAT_VERSION + 1}, f)
+    with pytest.raises(ValueError):
+        index_store.load(path, EMBEDDINGS)
+
+
+def test_legacy_pickle_store_is_read_and_migrated(tmp_path):
+    path = str(tmp_path / "index")
+    _store().save_local(path)
+    with open(os.path.join(path, index_store.LAYOUT_FILE), "w") as f:
+        json.dump(LAYOUT, f)
+    assert index_store.is_legacy(path) and index_store.exists(path)
+
+    vector_store, layout = index_store.load(path, EMBEDDINGS)
+    assert layout == LAYOUT
+    index_store.save(path, vector_store, layout)
+
+    assert not index_store.is_legacy(path)
+    assert sorted(entry for entry in os.listdir(path) if not entry.startswith("v")) == ["CURRENT"]
+    vector_store, layout = index_store.load(path, EMBEDDINGS)
+    assert layout == LAYOUT
+    assert [doc.page_content for doc in index_store.overlay_documents(vector_store)] == TEXTS
+
+
+def test_missing_index_raises(tmp_path):
+    assert not index_store.exists(str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        index_store.load(str(tmp_path), EMBEDDINGS)
+
+
+def test_load_follows_a_swap_that_removed_its_version(tmp_path, monkeypatch):
+    path = str(tmp_path / "index")
+    index_store.save(path, None, LAYOUT)
+    load_version = index_store._load_version
+
+    def racing_load(version, embeddings):
+        monkeypatch.setattr(index_store, "_load_version", load_version)
+        index_store.save(path, None, LAYOUT[:1])  # another worker replaces the version mid-read
+        raise FileNotFoundError(version)
+
+    monkeypatch.setattr(index_store, "_load_version", racing_load)
+    assert index_store.load(path, EMBEDDINGS) == (None, LAYOUT[:1])
@@ -0,0 +1,63 @@
+import asyncio
+
+from agents import ingestion
+from agents.ingestion import IngestionQueue
+
+
+class FakeAgent:
+    """An agent whose document already has a shared index"""
+
+    def __init__(self, session_id, pdf_path):
+        self.pdf_path = pdf_path
+        self.document_chunks = ["chunk"]
+
+    def assign_document_hash(self):
+        return "hash"
+
+    def load_shared_index(self):
+        return True
+
+    async def asummarize(self):
+        return "summary"
+
+
+class FakeSessions(dict):
+    def peek(self, key):
+        return self.get(key)
+
+
+class FakeSessionManager:
+    def __init__(self):
+        self.sessions = FakeSessions()
+        self.processed = []
+
+    def forget_agent(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    def mark_processed(self, session_id, agent):
+        self.processed.append(agent.pdf_path)
+
+    def set_summary(self, session_id, summary):
+        pass
+
+
+def test_superseded_reuse_job_does_not_publish_its_agent(monkeypatch, tmp_path):
+    monkeypatch.setattr(ingestion, "GeminiChatbotAgent", FakeAgent)
+    first, second = tmp_path / "upload-1.pdf", tmp_path / "upload-2.pdf"
+    first.write_bytes(b"one")
+    second.write_bytes(b"two")
+    manager = FakeSessionManager()
+
+    async def run():
+        queue = IngestionQueue(manager)
+        old = queue.submit("session", str(first), "a.pdf")
+        new = queue.submit("session", str(second), "b.pdf")
+        await asyncio.gather(*queue._tasks)
+        return old, new
+
+    old, new = asyncio.run(run())
+    assert old.stage == "failed" and new.stage == "done"
+    assert manager.sessions["session"].pdf_path == str(second)
+    assert manager.processed == [str(second)]
+    # Both jobs are over, so neither per-upload file is kept
+    assert not first.exists() and not second.exists()
@@ -0,0 +1,20 @@
+from langchain_core.documents import Document
+
+from utils.keyword_index import KeywordIndex
+
+DOCS = [
+    Document(page_content="Bicep curl: keep the elbow pinned and lower the weight slowly."),
+    Document(page_content="Hammer curls use a neutral grip to work the forearm."),
+    Document(page_content="Shoulder press: brace the core and press overhead."),
+    Document(page_content="Rest the shoulder after a strain; ice reduces swelling."),
+]
+
+
+def test_adding_in_batches_matches_indexing_at_once():
+    batched = KeywordIndex()
+    batched.add(DOCS[:1])
+    batched.add(DOCS[1:3])
+    batched.add(DOCS[3:])
+    whole = KeywordIndex(DOCS)
+    for query in ("curl elbow", "shoulder strain", "grip forearm curls", "knee"):
+        assert batched.search(query, 3) == whole.search(query, 3)
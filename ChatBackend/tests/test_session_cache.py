@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+from agents import session_cache
+from agents.session_cache import AgentCache
+
+
+def _agent(memory_bytes=0):
+    return SimpleNamespace(memory_bytes=memory_bytes)
+
+
+def test_least_recently_used_agent_is_evicted_over_capacity():
+    cache = AgentCache(max_agents=2, max_bytes=10**9, idle_seconds=3600)
+    cache["a"], cache["b"] = _agent(), _agent()
+    assert cache.get("a") is not None
+    cache["c"] = _agent()
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.stats()["evictions"]["capacity"] == 1
+
+
+def test_agents_are_evicted_until_memory_fits():
+    cache = AgentCache(max_agents=10, max_bytes=100, idle_seconds=3600)
+    cache["a"], cache["b"] = _agent(40), _agent(40)
+    cache["c"] = _agent(50)
+    assert "a" not in cache
+    assert "b" in cache and "c" in cache
+    assert cache.memory_bytes() == 90
+
+    # An agent larger than the budget on its own is kept while in use
+    cache["big"] = _agent(500)
+    assert list(cache._agents) == ["big"]
+    assert cache.stats()["evictions"]["memory"] == 3
+
+
+def test_growing_agents_are_trimmed_on_sweep():
+    cache = AgentCache(max_agents=10, max_bytes=100, idle_seconds=3600)
+    first, second = _agent(40), _agent(40)
+    cache["a"], cache["b"] = first, second
+    first.memory_bytes = 90  # vector store loaded since it was cached
+    cache.sweep()
+    assert "a" not in cache and "b" in cache
+
+
+def test_idle_agents_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_cache.time, "time", lambda: now[0])
+    cache = AgentCache(max_agents=10, max_bytes=10**9, idle_seconds=60)
+    cache["a"] = _agent()
+    now[0] += 30
+    cache["b"] = _agent()
+    now[0] += 45
+    assert cache.get("b") is not None
+    assert "a" not in cache
+    now[0] += 61
+    cache.sweep()
+    assert len(cache) == 0
+    assert cache.stats()["evictions"]["idle"] == 2
+
+
+def test_hits_misses_and_rehydrations_are_counted():
+    cache = AgentCache(max_agents=2, max_bytes=10**9, idle_seconds=3600)
+    cache.put("a", _agent(), rehydrated=True)
+    cache.get("a")
+    cache.get("missing")
+    assert cache.peek("missing") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["rehydrations"]) == (1, 1, 1)
+    assert cache.pop("a") is not None and len(cache) == 0
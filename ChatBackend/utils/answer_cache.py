@@ -0,0 +1,166 @@
+# utils/answer_cache.py
+"""Semantic cache of chat answers.
+
+Answers are keyed on the query embedding within a scope made of the
+document identity and the prompt template. A new query whose embedding
+is within ``threshold`` cosine similarity of a cached one in the same
+scope gets the cached answer without retrieval or generation. Queries
+answered from keyword search alone have no embedding; they are matched
+on their normalized text instead, so repeats still skip generation. Entries
+expire after ``ttl`` seconds, the cache holds at most ``max_entries``
+answers (least recently used go first), and a document's answers can be
+dropped at once when no session uses it any more.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES
+
+
+def template_key(prompt_template: str) -> str:
+    return hashlib.sha256(prompt_template.encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a question for exact matching"""
+    return " ".join(query.lower().split())
+
+
+class _Entry:
+    __slots__ = ("scope", "vector", "text", "answer", "created_at")
+
+    def __init__(self, scope: tuple, vector: Optional[np.ndarray], text: Optional[str], answer: str):
+        self.scope = scope
+        self.vector = vector
+        self.text = text
+        self.answer = answer
+        self.created_at = time.time()
+
+
+class SemanticAnswerCache:
+    """In-memory nearest-neighbour answer cache with TTL and LRU bounds"""
+
+    def __init__(self,
+                 threshold: float = ANSWER_CACHE_THRESHOLD,
+                 ttl: float = ANSWER_CACHE_TTL,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._scopes: Dict[tuple, List[int]] = {}
+        self._texts: Dict[Tuple[tuple, str], int] = {}
+        # Ids and stacked vectors of a scope's embedded entries, rebuilt lazily after the scope changes
+        self._matrices: Dict[tuple, Tuple[List[int], Optional[np.ndarray]]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        if entry.text is not None and self._texts.get((entry.scope, entry.text)) == entry_id:
+            del self._texts[(entry.scope, entry.text)]
+        ids = self._scopes[entry.scope]
+        ids.remove(entry_id)
+        if not ids:
+            del self._scopes[entry.scope]
+        self._matrices.pop(entry.scope, None)
+
+    def lookup(self, document_id: str, prompt_template: str, embedding: Optional[List[float]],
+               query: Optional[str] = None) -> Optional[str]:
+        """Cached answer for the same or a near-duplicate question about the same document, if any.
+
+        ``query`` is matched exactly (after ``normalize_query``) first;
+        ``embedding`` may be None when the question was not embedded.
+        """
+        scope = (document_id, template_key(prompt_template))
+        now = time.time()
+        with self._lock:
+            for entry_id in [i for i in self._scopes.get(scope, ()) if now - self._entries[i].created_at > self.ttl]:
+                self._remove(entry_id)
+            entry_id = self._texts.get((scope, normalize_query(query))) if query is not None else None
+            if entry_id is not None:
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                return self._entries[entry_id].answer
+            if embedding is None or scope not in self._scopes:
+                self.misses += 1
+                return None
+            cached = self._matrices.get(scope)
+            if cached is None:
+                ids = [i for i in self._scopes[scope] if self._entries[i].vector is not None]
+                matrix = np.stack([self._entries[i].vector for i in ids]) if ids else None
+                cached = self._matrices[scope] = (ids, matrix)
+            ids, matrix = cached
+            if matrix is None:
+                self.misses += 1
+                return None
+            similarities = matrix @ self._normalize(embedding)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            entry_id = ids[best]
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return self._entries[entry_id].answer
+
+    def store(self, document_id: str, prompt_template: str, embedding: Optional[List[float]], answer: str,
+              query: Optional[str] = None):
+        """Cache an answer under its embedding and/or the question's normalized text"""
+        if embedding is None and query is None:
+            return
+        scope = (document_id, template_key(prompt_template))
+        text = normalize_query(query) if query is not None else None
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            vector = self._normalize(embedding) if embedding is not None else None
+            self._entries[entry_id] = _Entry(scope, vector, text, answer)
+            if text is not None:
+                previous = self._texts.get((scope, text))
+                if previous is not None:
+                    self._remove(previous)
+                self._texts[(scope, text)] = entry_id
+            self._scopes.setdefault(scope, []).append(entry_id)
+            self._matrices.pop(scope, None)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, document_id: str) -> int:
+        """Drop every cached answer for a document; returns how many were dropped"""
+        with self._lock:
+            entry_ids = [i for scope, ids in self._scopes.items() if scope[0] == document_id for i in ids]
+            for entry_id in entry_ids:
+                self._remove(entry_id)
+        return len(entry_ids)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, hits, misses, evictions = len(self._entries), self.hits, self.misses, self.evictions
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": evictions,
+        }
+
+
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,23 @@
+# utils/concurrency.py
+"""Helpers for keeping blocking work off the FastAPI event loop.
+
+Blocking calls (FAISS search, PDF parsing, file IO, sync SDK calls) run on
+a bounded thread pool, and Gemini generation/embedding calls are capped
+with semaphores so a burst of chats cannot exhaust quota or threads.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import LLM_CONCURRENCY, EMBEDDING_CONCURRENCY, BLOCKING_IO_WORKERS
+
+_executor = ThreadPoolExecutor(max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="blocking-io")
+
+llm_semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+embedding_semaphore = asyncio.Semaphore(EMBEDDING_CONCURRENCY)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable on the shared thread pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
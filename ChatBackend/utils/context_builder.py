@@ -0,0 +1,90 @@
+# utils/context_builder.py
+"""Token-budgeted prompt context from retrieved chunks.
+
+Chunks are split with a 300-character overlap, so neighbouring chunks
+retrieved together repeat text. ``build_context`` stitches overlapping
+chunks back into one passage, drops chunks that are contained in or
+nearly identical to a passage already selected, and packs passages in
+rank order until the token budget is used up.
+"""
+import re
+from typing import List, Sequence
+
+from langchain_core.documents import Document
+
+from config.settings import CONTEXT_TOKEN_BUDGET
+
+# Gemini averages about four characters per token for English text
+CHARS_PER_TOKEN = 4
+# Shortest shared prefix/suffix treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 50
+NEAR_DUPLICATE_SIMILARITY = 0.8
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = re.findall(r"\w+", text.lower())
+    return {tuple(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+def _merge_overlap(first: str, second: str):
+    """``first`` and ``second`` joined if the end of ``first`` is the start of ``second``"""
+    probe = second[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return None
+    pos = first.rfind(probe)
+    while pos != -1:
+        if second.startswith(first[pos:]):
+            return first[:pos] + second
+        pos = first.rfind(probe, 0, pos + len(probe) - 1)
+    return None
+
+
+def _absorb(passages: List[str], text: str) -> bool:
+    """Merge ``text`` into an overlapping or containing passage; False if it is new"""
+    for i, passage in enumerate(passages):
+        if text in passage:
+            return True
+        if passage in text:
+            passages[i] = text
+            return True
+        merged = _merge_overlap(passage, text) or _merge_overlap(text, passage)
+        if merged is not None:
+            passages[i] = merged
+            return True
+    return False
+
+
+def _is_near_duplicate(passages: List[str], text: str) -> bool:
+    shingles = _shingles(text)
+    for passage in passages:
+        other = _shingles(passage)
+        if len(shingles & other) / len(shingles | other) >= NEAR_DUPLICATE_SIMILARITY:
+            return True
+    return False
+
+
+def build_context(docs: Sequence[Document], token_budget: int = CONTEXT_TOKEN_BUDGET) -> List[str]:
+    """Deduplicated passages from ranked ``docs``, best first, within ``token_budget``"""
+    passages: List[str] = []
+    for doc in docs:
+        text = doc.page_content.strip()
+        if not text or _absorb(passages, text) or _is_near_duplicate(passages, text):
+            continue
+        passages.append(text)
+
+    packed: List[str] = []
+    remaining = token_budget
+    for passage in passages:
+        tokens = estimate_tokens(passage)
+        if tokens <= remaining:
+            packed.append(passage)
+            remaining -= tokens
+        elif not packed:
+            # Always keep some context: cut the best passage down to the budget
+            packed.append(passage[:remaining * CHARS_PER_TOKEN])
+            break
+    return packed
@@ -16,10 +16,8 @@ class DocumentProcessor:
         """Extract text from PDF file"""
         try:
             pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            return text
+            # join once instead of repeated += (quadratic for long documents)
+            return "".join(page.extract_text() or "" for page in pdf_reader.pages)
         except Exception as e:
             st.error(f"Error reading PDF: {str(e)}")
             return ""
@@ -0,0 +1,169 @@
+# utils/embedding_cache.py
+"""Content-addressed, persistent embedding cache.
+
+Vectors are stored in SQLite keyed by a hash of the embedding model,
+task type and chunk text, so the same chunk is never sent to the
+embedding API twice - across re-uploads, duplicate documents and
+process restarts.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils.concurrency import run_blocking
+
+
+def content_key(namespace: str, text: str) -> str:
+    """Stable cache key for ``text`` embedded under ``namespace``"""
+    return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+
+def file_sha256(path: str, block_size: int = 1024 * 1024) -> str:
+    """Hash a file's contents without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EmbeddingStore:
+    """SQLite-backed map of content key -> float32 vector"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> dict:
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items: dict):
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only calls the underlying client for unseen texts"""
+
+    def __init__(self, underlying: Embeddings, store: EmbeddingStore, namespace: str):
+        self.underlying = underlying
+        self.store = store
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, texts: List[str], namespace: Optional[str] = None):
+        namespace = namespace or self.namespace
+        keys = [content_key(namespace, text) for text in texts]
+        found = self.store.get_many(list(set(keys)))
+        missing = list(dict.fromkeys(text for text, key in zip(texts, keys) if key not in found))
+        self.hits += len(texts) - sum(1 for key in keys if key not in found)
+        self.misses += len(missing)
+        return keys, found, missing
+
+    def _merge(self, keys, found, missing, vectors):
+        new_items = {content_key(self.namespace, text): vector for text, vector in zip(missing, vectors)}
+        found.update(new_items)
+        return [found[key] for key in keys], new_items
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts)
+        vectors = self.underlying.embed_documents(missing) if missing else []
+        result, new_items = self._merge(keys, found, missing, vectors)
+        self.store.put_many(new_items)
+        return result
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = await run_blocking(self._lookup, texts)
+        vectors = await self.underlying.aembed_documents(missing) if missing else []
+        result, new_items = self._merge(keys, found, missing, vectors)
+        await run_blocking(self.store.put_many, new_items)
+        return result
+
+    @property
+    def query_namespace(self) -> str:
+        # Query embeddings may use a different task type than documents
+        return f"{self.namespace}:query"
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._lookup([text], self.query_namespace)
+        if missing:
+            vector = self.underlying.embed_query(text)
+            self.store.put_many({keys[0]: vector})
+            return vector
+        return found[keys[0]]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, missing = await run_blocking(self._lookup, [text], self.query_namespace)
+        if missing:
+            vector = await self.underlying.aembed_query(text)
+            await run_blocking(self.store.put_many, {keys[0]: vector})
+            return vector
+        return found[keys[0]]
+
+    def split_cached(self, texts: List[str]):
+        """Cached vectors by text, and the distinct texts that still need embedding"""
+        keys = [content_key(self.namespace, text) for text in texts]
+        found = self.store.get_many(list(set(keys)))
+        cached = {text: found[key] for text, key in zip(texts, keys) if key in found}
+        self.hits += sum(1 for key in keys if key in found)
+        missing = list(dict.fromkeys(text for text in texts if text not in cached))
+        return cached, missing
+
+    def cached_query_embedding(self, text: str) -> Optional[List[float]]:
+        """Query embedding if it is already stored; never calls the embedding API"""
+        key = content_key(self.query_namespace, text)
+        vector = self.store.get_many([key]).get(key)
+        if vector is not None:
+            self.hits += 1
+        return vector
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_store: Optional[EmbeddingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store(path: str) -> EmbeddingStore:
+    """Process-wide embedding store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EmbeddingStore(path)
+    return _store
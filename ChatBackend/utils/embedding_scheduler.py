@@ -0,0 +1,161 @@
+# utils/embedding_scheduler.py
+"""Process-wide scheduler for embedding API calls.
+
+Every session's embedding traffic goes through one scheduler:
+- texts already in the embedding cache are never sent,
+- the rest are split into request-sized batches,
+- at most EMBEDDING_CONCURRENCY requests run at once (``embedding_semaphore``),
+- every request takes a token from a global token bucket
+  (EMBEDDING_RATE_PER_MINUTE, bursts of EMBEDDING_RATE_BURST),
+- quota and transient errors are retried with exponential backoff and jitter.
+
+Each batch is written to the embedding cache as soon as it completes, so
+when a batch finally fails, re-running the ingestion only embeds the
+batches that did not finish.
+"""
+import asyncio
+import random
+import time
+from typing import Callable, List, Optional
+
+from google.api_core import exceptions as google_exceptions
+
+from config.settings import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_RATE_PER_MINUTE,
+    EMBEDDING_RATE_BURST,
+    EMBEDDING_MAX_RETRIES,
+    EMBEDDING_BACKOFF_SECONDS,
+    EMBEDDING_BACKOFF_MAX_SECONDS,
+)
+from utils.concurrency import run_blocking, embedding_semaphore
+from yantra_common.instrumentation import log_event
+
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    # Client wrappers (e.g. langchain) re-raise API errors with the status in the message
+    message = str(error).lower()
+    return any(marker in message for marker in ("429", "quota", "rate limit", "resource exhausted", "503", "unavailable"))
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, holding at most ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1) -> float:
+        """Wait until ``tokens`` are available and take them; returns seconds waited"""
+        waited = 0.0
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                delay = (tokens - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self._tokens -= tokens
+        return waited
+
+
+class EmbeddingScheduler:
+    """Batches, rate-limits and retries embedding requests for all sessions"""
+
+    def __init__(self,
+                 batch_size: int = EMBEDDING_BATCH_SIZE,
+                 rate_per_minute: float = EMBEDDING_RATE_PER_MINUTE,
+                 burst: float = EMBEDDING_RATE_BURST,
+                 max_retries: int = EMBEDDING_MAX_RETRIES,
+                 backoff_seconds: float = EMBEDDING_BACKOFF_SECONDS,
+                 backoff_max_seconds: float = EMBEDDING_BACKOFF_MAX_SECONDS):
+        self.batch_size = batch_size
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled_seconds = 0.0
+
+    async def _call(self, func, *args):
+        """One embedding request, rate-limited and retried on quota or transient errors"""
+        for attempt in range(self.max_retries + 1):
+            self.throttled_seconds += await self.bucket.acquire()
+            try:
+                async with embedding_semaphore:
+                    self.requests += 1
+                    return await func(*args)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    self.failures += 1
+                    raise
+                delay = min(self.backoff_max_seconds, self.backoff_seconds * 2 ** attempt)
+                delay *= random.uniform(0.5, 1.0)  # jitter so throttled batches do not retry in lockstep
+                self.retries += 1
+                log_event("embedding_retry", level="warning", attempt=attempt + 1, max_retries=self.max_retries,
+                          delay=round(delay, 1), error=str(e))
+                await asyncio.sleep(delay)
+
+    async def embed_documents(self, embeddings, texts: List[str],
+                              on_progress: Optional[Callable[[int], None]] = None) -> List[List[float]]:
+        """Vectors for ``texts`` in order; ``on_progress`` receives the number of texts finished so far"""
+        found, missing = await run_blocking(embeddings.split_cached, texts)
+        done = len(texts) - len(missing)
+        if on_progress and done:
+            on_progress(done)
+
+        async def embed_batch(batch):
+            nonlocal done
+            vectors = await self._call(embeddings.aembed_documents, batch)
+            found.update(zip(batch, vectors))
+            done += len(batch)
+            if on_progress:
+                on_progress(done)
+
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        # Let every batch settle before raising, so finished batches still reach the cache
+        results = await asyncio.gather(*(embed_batch(batch) for batch in batches), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return [found[text] for text in texts]
+
+    async def embed_query(self, embeddings, text: str) -> List[float]:
+        vector = await run_blocking(embeddings.cached_query_embedding, text)
+        if vector is not None:
+            return vector
+        return await self._call(embeddings.aembed_query, text)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+        }
+
+
+embedding_scheduler = EmbeddingScheduler()
@@ -0,0 +1,145 @@
+# utils/gemini_clients.py
+"""Process-wide registry of Gemini generation and embedding clients.
+
+``genai.configure`` runs once and each model/embeddings client is built
+once and shared by every session agent, so all requests reuse the same
+pooled gRPC channels instead of creating new clients per agent.
+
+GEMINI_API_ENDPOINT / GEMINI_EMBEDDING_ENDPOINT send generation and
+embeddings to a stand-in server instead (see benchmarks/fake_gemini.py).
+"""
+import threading
+from typing import Dict, Optional
+
+import google.generativeai as genai
+from google.api_core import retry
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+from config.settings import (
+    GOOGLE_API_KEY, EMBEDDING_CACHE_PATH, GEMINI_API_ENDPOINT, GEMINI_EMBEDDING_ENDPOINT,
+    GEMINI_WARMUP, GEMINI_WARMUP_TIMEOUT, GEMINI_WARMUP_EMBED,
+)
+from utils.embedding_cache import CachedEmbeddings, get_store
+from yantra_common.instrumentation import log_event
+
+CHAT_MODEL = "gemini-2.0-flash"
+EMBEDDING_MODEL = "models/embedding-001"
+
+CHAT_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.8,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
+
+_lock = threading.Lock()
+_models: Dict[tuple, genai.GenerativeModel] = {}
+_embeddings: Dict[tuple, GoogleGenerativeAIEmbeddings] = {}
+_cached_embeddings: Dict[tuple, CachedEmbeddings] = {}
+_configured = False
+
+
+def _ensure_configured():
+    global _configured
+    if not _configured:
+        with _lock:
+            if not _configured:
+                if GEMINI_API_ENDPOINT:
+                    genai.configure(api_key=GOOGLE_API_KEY, client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+                else:
+                    genai.configure(api_key=GOOGLE_API_KEY)
+                _configured = True
+
+
+def get_model(name: str = CHAT_MODEL, generation_config: Optional[dict] = None) -> genai.GenerativeModel:
+    """Shared GenerativeModel for ``name`` and ``generation_config``."""
+    _ensure_configured()
+    key = (name, tuple(sorted((generation_config or {}).items())))
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(
+                    name,
+                    generation_config=genai.GenerationConfig(**generation_config) if generation_config else None,
+                )
+                _models[key] = model
+    return model
+
+
+def get_chat_model() -> genai.GenerativeModel:
+    """The model used for document Q&A and summaries."""
+    return get_model(CHAT_MODEL, CHAT_GENERATION_CONFIG)
+
+
+def get_embeddings(model: str = EMBEDDING_MODEL, task_type: Optional[str] = "retrieval_document") -> GoogleGenerativeAIEmbeddings:
+    """Shared embeddings client for ``model`` and ``task_type``."""
+    key = (model, task_type)
+    embeddings = _embeddings.get(key)
+    if embeddings is None:
+        endpoint = {"base_url": GEMINI_EMBEDDING_ENDPOINT} if GEMINI_EMBEDDING_ENDPOINT else {}
+        with _lock:
+            embeddings = _embeddings.get(key)
+            if embeddings is None:
+                try:
+                    embeddings = GoogleGenerativeAIEmbeddings(
+                        model=model,
+                        google_api_key=GOOGLE_API_KEY,
+                        task_type=task_type,  # Optimized for document retrieval
+                        **endpoint,
+                    )
+                except Exception:
+                    # Fallback for older versions
+                    embeddings = GoogleGenerativeAIEmbeddings(
+                        model=model,
+                        google_api_key=GOOGLE_API_KEY,
+                        **endpoint,
+                    )
+                _embeddings[key] = embeddings
+    return embeddings
+
+
+def get_cached_embeddings(model: str = EMBEDDING_MODEL, task_type: Optional[str] = "retrieval_document") -> CachedEmbeddings:
+    """Shared embeddings client backed by the persistent content-addressed cache"""
+    key = (model, task_type)
+    cached = _cached_embeddings.get(key)
+    if cached is None:
+        underlying = get_embeddings(model, task_type)
+        with _lock:
+            cached = _cached_embeddings.get(key)
+            if cached is None:
+                cached = CachedEmbeddings(underlying, get_store(EMBEDDING_CACHE_PATH), f"{model}:{task_type}")
+                _cached_embeddings[key] = cached
+    return cached
+
+
+def warmup():
+    """Build the shared clients and open their connections before traffic.
+
+    ``count_tokens`` is not billed and opens the generation channel; the
+    embeddings client is only built, since probing it costs an embedding
+    request per process start (set GEMINI_WARMUP_EMBED=True to probe it too).
+    Calls are bounded by GEMINI_WARMUP_TIMEOUT and failures are logged and
+    ignored so startup never blocks on them; GEMINI_WARMUP=0 skips warmup.
+    """
+    if not GEMINI_WARMUP:
+        return
+    try:
+        get_chat_model().count_tokens("warmup", request_options={"timeout": GEMINI_WARMUP_TIMEOUT, "retry": retry.Retry(timeout=GEMINI_WARMUP_TIMEOUT)})
+        embeddings = get_embeddings()
+        if GEMINI_WARMUP_EMBED:
+            embeddings.embed_query("warmup")
+        log_event("gemini_warmed_up", sample_rate=1, model=CHAT_MODEL)
+    except Exception as e:
+        log_event("gemini_warmup_failed", level="warning", model=CHAT_MODEL, error=str(e))
+
+
+def reset():
+    """Drop all cached clients (e.g. in a freshly forked worker)."""
+    global _configured
+    with _lock:
+        _models.clear()
+        _embeddings.clear()
+        _cached_embeddings.clear()
+        _configured = False
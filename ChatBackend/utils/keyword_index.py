@@ -0,0 +1,111 @@
+# utils/keyword_index.py
+"""Local BM25 keyword index over a document's chunks.
+
+Physiotherapy questions are often keyword-heavy (exercise names, body
+parts), and BM25 answers them without the remote query-embedding round
+trip. ``search`` also reports how much of the query the best chunk
+covers, which the agent uses to decide whether keyword results alone are
+good enough or should be fused with vector results.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+STOPWORDS = frozenset("""
+a about after again all also am an and any are as at be been before being between both but by can could
+did do does doing during each few for from had has have having he her here how i if in into is it its
+just many me more most much my no nor not now of off on once only or other our out over own same she should so
+some such than that the their them then there these they this those through to too under until up very
+was we were what when where which while who why will with would you your
+""".split())
+
+# Retrieval decisions since startup, for /health
+retrieval_stats = {"keyword": 0, "hybrid": 0}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, with plural 's' stripped (curls -> curl)"""
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class KeywordIndex:
+    """Okapi BM25 over a growing list of chunks.
+
+    ``add`` only touches the new chunks' postings and IDF is computed per
+    query term at search time, so indexing a document batch by batch costs
+    the same as indexing it at once. Searches may run while chunks are
+    added: a chunk becomes visible once its postings are in.
+    """
+
+    def __init__(self, docs: Sequence[Document] = (), k1: float = 1.5, b: float = 0.75):
+        self.docs: List[Document] = []
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths: List[int] = []
+        self.doc_terms: List[set] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.total_length = 0
+        self.add(docs)
+
+    @property
+    def avg_length(self) -> float:
+        return self.total_length / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    def add(self, docs: Sequence[Document]):
+        """Index more chunks after the ones already added"""
+        for doc in docs:
+            counts = Counter(tokenize(doc.page_content))
+            i = len(self.docs)
+            # Everything a posting points at exists before the posting does
+            self.docs.append(doc)
+            self.doc_lengths.append(sum(counts.values()))
+            self.doc_terms.append(set(counts))
+            self.total_length += self.doc_lengths[i]
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((i, tf))
+
+    def idf(self, term: str) -> float:
+        matches = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.docs) - matches + 0.5) / (matches + 0.5))
+
+    def search(self, query: str, k: int) -> Tuple[List[Tuple[Document, float]], float]:
+        """Top ``k`` chunks by BM25 score, and the fraction of query terms the best chunk contains"""
+        terms = set(tokenize(query))
+        if not terms or not self.docs:
+            return [], 0.0
+
+        scores: Dict[int, float] = {}
+        avg_length = self.avg_length or 1.0
+        for term in terms:
+            idf = self.idf(term)
+            for i, tf in self.postings.get(term, ()):
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[i] / avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        if not scores:
+            return [], 0.0
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        coverage = len(terms & self.doc_terms[ranked[0][0]]) / len(terms)
+        return [(self.docs[i], score) for i, score in ranked], coverage
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], k: int, constant: int = 60) -> List[Document]:
+    """Merge ranked document lists by reciprocal rank, deduplicating by text"""
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            scores[doc.page_content] = scores.get(doc.page_content, 0.0) + 1.0 / (constant + rank + 1)
+            docs.setdefault(doc.page_content, doc)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [docs[text] for text in best]
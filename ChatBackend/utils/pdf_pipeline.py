@@ -0,0 +1,128 @@
+# utils/pdf_pipeline.py
+"""Page-by-page PDF parsing and splitting.
+
+Pages are read lazily with pypdf and split in small batches (shards), so
+only a few batches of page text are held at a time however large the PDF
+is, and callers can embed and index the first chunks before later pages
+are parsed. Shards can be parsed in parallel across a process pool and
+are always reassembled in page order. A page that fails to extract is
+logged and skipped rather than aborting the document.
+
+Chunks never span pages (the splitter works per page), so the output
+matches splitting the fully loaded document.
+"""
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+
+from config.settings import PDF_PAGES_PER_BATCH, INGESTION_PROCESS_WORKERS
+from yantra_common.instrumentation import log_event
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Process-wide pool for PDF parsing, created on first use.
+
+    Workers are spawned rather than forked: by the time the first upload
+    arrives the server already runs gRPC channels, SQLite connections and
+    executor threads, which a forked child would inherit mid-use.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=INGESTION_PROCESS_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def text_splitter() -> RecursiveCharacterTextSplitter:
+    # Optimize text splitting for Gemini's context window
+    return RecursiveCharacterTextSplitter(
+        chunk_size=1500,  # Larger chunks work better with Gemini
+        chunk_overlap=300,  # More overlap for better context
+        separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]
+    )
+
+
+def page_count(pdf_path: str) -> int:
+    return len(PdfReader(pdf_path).pages)
+
+
+def _split_pages(reader: PdfReader, pdf_path: str, start: int, end: int) -> Tuple[List[Document], List[int]]:
+    pages, failed = [], []
+    for i in range(start, min(end, len(reader.pages))):
+        try:
+            text = reader.pages[i].extract_text() or ""
+        except Exception as e:
+            log_event("pdf_page_skipped", level="warning", path=pdf_path, page=i + 1, error=str(e))
+            failed.append(i)
+            continue
+        pages.append(Document(page_content=text, metadata={"source": pdf_path, "page": i}))
+    return text_splitter().split_documents(pages), failed
+
+
+def split_pages(pdf_path: str, start: int, end: int) -> Tuple[List[Document], List[int]]:
+    """Chunks for pages ``start`` to ``end - 1`` and the pages that failed to extract.
+
+    Module-level so worker processes can run it.
+    """
+    return _split_pages(PdfReader(pdf_path), pdf_path, start, end)
+
+
+def shard_starts(pages: int, pages_per_batch: int = PDF_PAGES_PER_BATCH) -> range:
+    return range(0, pages, pages_per_batch)
+
+
+def iter_pdf_chunks(pdf_path: str,
+                    pages_per_batch: int = PDF_PAGES_PER_BATCH,
+                    executor: Optional[Executor] = None,
+                    max_in_flight: int = 1) -> Iterator[List[Document]]:
+    """Yield the document's chunks one batch of pages at a time, in page order.
+
+    With an ``executor``, up to ``max_in_flight`` batches are parsed in
+    parallel ahead of the consumer; a batch whose worker fails is skipped.
+    """
+    if executor is None:
+        reader = PdfReader(pdf_path)
+        for start in shard_starts(len(reader.pages), pages_per_batch):
+            chunks, _ = _split_pages(reader, pdf_path, start, start + pages_per_batch)
+            if chunks:
+                yield chunks
+        return
+
+    pending = deque()
+    starts = iter(shard_starts(page_count(pdf_path), pages_per_batch))
+    while True:
+        for start in starts:
+            pending.append((start, executor.submit(split_pages, pdf_path, start, start + pages_per_batch)))
+            if len(pending) >= max_in_flight:
+                break
+        if not pending:
+            return
+        start, future = pending.popleft()
+        try:
+            chunks, _ = future.result()
+        except Exception as e:
+            log_event("pdf_pages_skipped", level="warning", path=pdf_path, first_page=start + 1,
+                      last_page=start + pages_per_batch, error=str(e))
+            continue
+        if chunks:
+            yield chunks
@@ -0,0 +1,8 @@
+# utils/single_flight.py
+"""Process-wide single-flight groups for the chat service (see yantra_common.single_flight)."""
+from yantra_common.single_flight import AsyncSingleFlight
+
+# Chat answers keyed on the full prompt (document context + question + template)
+answer_flight = AsyncSingleFlight()
+# Document summaries keyed on the shared index they summarize
+summary_flight = AsyncSingleFlight()
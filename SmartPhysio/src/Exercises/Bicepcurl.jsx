@@ -54,6 +54,8 @@ const ExercisePose = ({ showChatApp, sessionCode }) => {
   const [speakingText, setSpeakingText] = useState("");
   const lastFeedbackSent = useRef(Date.now());
   const latestPoseData = useRef(null);
+  // Identifies this camera session to the live feedback backend
+  const feedbackSessionId = useRef(crypto.randomUUID());
 
   useEffect(() => {
     stageRef.current = stage;
@@ -126,6 +128,7 @@ const ExercisePose = ({ showChatApp, sessionCode }) => {
                 stage,
                 landmarks: results.poseLandmarks,
                 timestamp: Date.now(),
+                sessionId: feedbackSessionId.current,
               };
             } else {
               setFeedback("No person detected");
@@ -527,6 +530,7 @@ const ExercisePose = ({ showChatApp, sessionCode }) => {
     setFeedback("Get ready to start!");
     setShowReport(false);
     latestPoseData.current = null;
+    feedbackSessionId.current = crypto.randomUUID();
     setSpeakingText("");
   };
 
@@ -0,0 +1,75 @@
+"""The backend services (app.py, feedback.py, feedback_stream.py) as one ASGI application.
+
+Requests under ``/api/`` go to the exercise-suggestion app, requests
+under ``/live-feedback`` to the feedback app, and WebSockets under
+``/ws/`` plus ``/health``, ``/cache-stats`` and ``/coalescing-stats`` to
+the streaming feedback app; ``/metrics`` covers all three (they share
+the process's metrics registry). The Flask apps are served
+through a2wsgi, which runs their blocking handlers on a pool of
+WSGI_THREADS threads per app while the event loop only reads requests
+and writes responses.
+
+A process can only use one Gemini key, so GEMINI_API_KEY and
+gemini_api_key1 must both be set to the same key; the import fails
+otherwise (see gemini_clients.configure). Run the apps separately to
+bill them to different keys.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 4000
+    gunicorn -c gunicorn.conf.py -k uvicorn_worker.UvicornWorker asgi:app
+"""
+import asyncio
+import os
+
+from a2wsgi import WSGIMiddleware
+
+import gemini_clients
+from app import app as suggestions_app
+from feedback import app as feedback_app
+from feedback_stream import app as stream_app
+
+WSGI_THREADS = int(os.getenv("WSGI_THREADS", "32"))
+
+suggestions = WSGIMiddleware(suggestions_app, workers=WSGI_THREADS)
+feedback = WSGIMiddleware(feedback_app, workers=WSGI_THREADS)
+# Path prefix -> app; anything else (including /metrics) is answered by the suggestion app
+ROUTES = (
+    ("/api/", suggestions),
+    ("/live-feedback", feedback),
+    ("/ws/", stream_app),
+    ("/health", stream_app),
+    ("/cache-stats", stream_app),
+    ("/coalescing-stats", stream_app),
+)
+
+
+async def _lifespan(receive, send):
+    await receive()  # lifespan.startup
+    started = False
+    try:
+        # Runs the stream app's startup (feedback model warmup) and shutdown handlers
+        async with stream_app.router.lifespan_context(stream_app):
+            await asyncio.to_thread(gemini_clients.warmup, gemini_clients.SUGGESTION_MODEL)
+            await send({"type": "lifespan.startup.complete"})
+            started = True
+            await receive()  # lifespan.shutdown
+    except Exception as e:
+        stage = "shutdown" if started else "startup"
+        await send({"type": f"lifespan.{stage}.failed", "message": str(e)})
+        return
+    for wsgi_app in (suggestions, feedback):
+        # Let in-flight Flask requests finish without blocking the event loop
+        await asyncio.to_thread(wsgi_app.executor.shutdown, True)
+    await send({"type": "lifespan.shutdown.complete"})
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    path = scope["path"]
+    for prefix, target in ROUTES:
+        if path.startswith(prefix):
+            await target(scope, receive, send)
+            return
+    await suggestions(scope, receive, send)
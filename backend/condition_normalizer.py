@@ -0,0 +1,156 @@
+"""Maps free-text exercise requests onto canonical condition keys.
+
+The suggest-exercises input space is effectively injury term x body part
+x severity x duration band. ``normalize`` reduces a request's injuryType,
+message, severity and duration to one such key, or returns None when the
+description is genuinely unusual: several conditions or body parts,
+words it does not recognise, or a severity/duration it cannot place.
+Those requests still get a live Gemini plan; everything else can be
+served from the precomputed plan table (see plan_table.py).
+"""
+import re
+from itertools import product
+from typing import Iterator, NamedTuple, Optional
+
+from exercise_catalog import VALID_BODY_PARTS, VALID_INJURY_TERMS
+
+# Inflections and everyday words for each canonical injury term
+INJURY_ALIASES = {
+    "sprained": "sprain", "sprains": "sprain",
+    "strained": "strain", "strains": "strain", "pulled": "strain",
+    "pains": "pain", "painful": "pain", "ache": "pain", "aches": "pain", "aching": "pain",
+    "sore": "pain", "soreness": "pain", "hurt": "pain", "hurts": "pain", "hurting": "pain",
+    "stiff": "stiffness",
+    "injured": "injury", "injuries": "injury",
+    "torn": "tear", "tears": "tear",
+    "dislocated": "dislocation",
+    "arthritic": "arthritis", "osteoarthritis": "arthritis",
+    "tendonitis": "tendinitis",
+    "operation": "surgery",
+    "fractured": "fracture", "broken": "fracture",
+    "bruised": "bruise", "bruising": "bruise",
+    "spasms": "spasm",
+    "inflamed": "inflammation",
+}
+BODY_PART_ALIASES = {
+    "shoulders": "shoulder", "elbows": "elbow", "wrists": "wrist", "hips": "hip", "knees": "knee",
+    "ankles": "ankle", "legs": "leg", "arms": "arm", "feet": "foot", "hands": "hand",
+    "calves": "calf", "thighs": "thigh", "lumbar": "back", "cervical": "neck",
+}
+# Terms that a more specific one overrides ("sprained ankle pain" is a sprain)
+GENERIC_INJURY_TERMS = {"pain", "injury"}
+# Words that carry no clinical information for plan selection
+FILLER_WORDS = frozenset("""
+a an and the my in on of at to for with from have has had i im i'm it its is was been am are
+left right both side sides lower upper bit little lot very really quite slight slightly some
+since about around approximately feel feels feeling getting got
+""".split())
+
+SEVERITY_LEVELS = ("mild", "moderate", "severe")
+# Upper bound (weeks) of each duration band; acute < 6 weeks, subacute 6-12, chronic beyond
+DURATION_BANDS = (("acute", 6), ("subacute", 12), ("chronic", float("inf")))
+DURATION_DESCRIPTIONS = {
+    "acute": "less than 6 weeks",
+    "subacute": "6 to 12 weeks",
+    "chronic": "more than 12 weeks",
+}
+WEEKS_PER_UNIT = {"day": 1 / 7, "week": 1, "month": 4.35, "year": 52}
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "couple": 2, "few": 3, "several": 4,
+}
+# Words allowed around a duration ("for about 3 weeks", "over the past year")
+DURATION_FILLER = frozenset("a an and the for about around over almost nearly past last since ago".split())
+DURATION_WORDS = {"today": "acute", "yesterday": "acute", "recent": "acute", "recently": "acute",
+                  "acute": "acute", "subacute": "subacute", "chronic": "chronic"}
+
+_DURATION_PATTERN = re.compile(
+    r"(?:(\d+(?:\.\d+)?|" + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True)) + r")\s*(?:of\s+)?)?\b(day|week|month|year)(s)?\b"
+)
+_CANONICAL_INJURIES = {term: INJURY_ALIASES.get(term, term) for term in VALID_INJURY_TERMS}
+
+
+class ConditionKey(NamedTuple):
+    injury: str
+    body_part: str
+    severity: str
+    duration: str
+
+    @property
+    def key(self) -> str:
+        return "|".join(self)
+
+
+def _severity_level(severity) -> Optional[str]:
+    text = str(severity or "").strip().lower()
+    if text in SEVERITY_LEVELS:
+        return text
+    # Pain scales: "7", "7/10"
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*(?:/\s*10)?", text)
+    if match and float(match.group(1)) <= 10:
+        score = float(match.group(1))
+        return "mild" if score <= 3 else "moderate" if score <= 6 else "severe"
+    return None
+
+
+def _duration_band(duration) -> Optional[str]:
+    text = str(duration or "").strip().lower()
+    if not text:
+        return None
+    if text in DURATION_WORDS:
+        return DURATION_WORDS[text]
+    matches = _DURATION_PATTERN.findall(text)
+    if not matches or not set(re.findall(r"[a-z]+", _DURATION_PATTERN.sub(" ", text))) <= DURATION_FILLER:
+        return None
+    weeks = 0.0
+    for count, unit, plural in matches:
+        if count:
+            amount = float(count) if count[0].isdigit() else NUMBER_WORDS[count]
+        else:
+            amount = 2 if plural else 1  # "for months", "a week"
+        weeks += amount * WEEKS_PER_UNIT[unit]
+    for band, upper in DURATION_BANDS:
+        if weeks < upper:
+            return band
+    return DURATION_BANDS[-1][0]
+
+
+def normalize(injury_type, user_message, severity, duration) -> Optional[ConditionKey]:
+    """Canonical key for a request, or None if it needs a live, individual plan."""
+    severity_level = _severity_level(severity)
+    duration_band = _duration_band(duration)
+    if severity_level is None or duration_band is None:
+        return None
+
+    injuries, body_parts = set(), set()
+    for word in re.findall(r"[a-z']+|\d+", f"{injury_type or ''} {user_message or ''}".lower()):
+        if word in _CANONICAL_INJURIES or word in INJURY_ALIASES:
+            injuries.add(_CANONICAL_INJURIES.get(word) or INJURY_ALIASES[word])
+        elif word in VALID_BODY_PARTS or word in BODY_PART_ALIASES:
+            body_parts.add(BODY_PART_ALIASES.get(word, word))
+        elif word not in FILLER_WORDS:
+            return None
+
+    if len(injuries) > 1:
+        injuries -= GENERIC_INJURY_TERMS
+    if len(injuries) != 1 or len(body_parts) != 1:
+        return None
+    return ConditionKey(injuries.pop(), body_parts.pop(), severity_level, duration_band)
+
+
+def grid() -> Iterator[ConditionKey]:
+    """Every canonical key, in a stable order."""
+    injuries = sorted(set(_CANONICAL_INJURIES.values()))
+    bands = [band for band, _ in DURATION_BANDS]
+    for injury, body_part, severity, duration in product(injuries, VALID_BODY_PARTS, SEVERITY_LEVELS, bands):
+        yield ConditionKey(injury, body_part, severity, duration)
+
+
+def describe(condition: ConditionKey) -> dict:
+    """Canonical request fields for generating ``condition``'s plan."""
+    return {
+        "injury_type": f"{condition.body_part} {condition.injury}",
+        "duration": DURATION_DESCRIPTIONS[condition.duration],
+        "severity": condition.severity.capitalize(),
+        "user_message": "",
+    }
@@ -0,0 +1,271 @@
+"""Exercise catalog, validation vocabulary and the suggestion prompt.
+
+Shared by the suggest-exercises endpoint (app.py) and the offline plan
+table build (plan_table.py), so live and precomputed plans come
+from the same prompt and are parsed the same way.
+
+Suggestions are generated as JSON constrained by ``EXERCISE_PLAN_SCHEMA``
+(exercise names limited to the catalog). ``parse_plan`` still checks
+every reply and repairs what it can locally (truncated JSON, code
+fences, near-miss names, legacy ``Name: ... | Frequency: ... |
+Duration: ...`` lines) so format drift does not cost a second
+generation; ``PlanParseStats`` counts how often that was needed.
+"""
+import difflib
+import json
+import re
+import threading
+
+from yantra_common.instrumentation import log_event
+
+# List of full-body physiotherapy exercises and their descriptions
+exercise_details = {
+    'Push-ups': 'An exercise to strengthen the upper body, particularly the chest and triceps.',
+    'Squats': 'A lower body exercise that targets the thighs, hips, and buttocks.',
+    'Lunges': 'An exercise focusing on the legs, enhancing strength and balance.',
+    'Plank': 'A core-strengthening exercise that also works the shoulders and back.',
+    'Bridges': 'Targets the glutes and lower back while improving core stability.',
+    'Clamshells': 'Strengthens the hip muscles and improves hip stability.',
+    'Bird Dogs': 'Enhances balance and coordination while working on core stability.',
+    'Dead Bugs': 'Strengthens the core while focusing on coordination between limbs.',
+    'Shoulder Press': 'An exercise to build shoulder and upper arm strength.',
+    'Bicep Curls': 'Strengthens the biceps and improves arm aesthetics.',
+    'Tricep Dips': 'Targets the triceps, helping to tone and strengthen the arms.',
+    'Calf Raises': 'Focuses on strengthening the calf muscles.',
+    'Seated Row': 'Targets the back muscles, improving posture and strength.',
+    'Wall Angels': 'Improves shoulder mobility and posture.',
+    'Chest Stretch': 'A flexibility exercise for the chest and shoulders.',
+    'Hamstring Stretch': 'Stretches the hamstring muscles to enhance flexibility.',
+    'Quadriceps Stretch': 'Stretches the quadriceps for improved flexibility.',
+    'Hip Flexor Stretch': 'Stretches the hip flexors to improve range of motion.',
+    'Spinal Twist': 'Enhances spinal mobility and flexibility.',
+    'Side Lunges': 'Strengthens the inner thighs and improves balance.',
+    'Glute Bridges': 'Focuses on the glutes and lower back for better stability.',
+    'Mountain Climbers': 'A full-body exercise that increases heart rate and builds endurance.',
+    'Leg Raises': 'Strengthens the lower abdominal muscles.',
+    'Standing Balance': 'Improves balance and stability through weight shifting.',
+    'Side Plank': 'Strengthens the oblique muscles and stabilizes the core.',
+    'Torso Rotation': 'Enhances core flexibility and stability.',
+    'Wrist Flexor Stretch': 'Stretches the wrist and forearm muscles.',
+    'Ankle Circles': 'Improves ankle mobility and flexibility.',
+    'T-Pose Exercise': 'Strengthens the upper back and shoulders.',
+    'Knee to Chest Stretch': 'Stretches the lower back and glutes.',
+    'Pigeon Pose': 'A yoga pose that stretches the hips and glutes.'
+}
+
+# Validation lists
+VALID_INJURY_TERMS = ["sprain", "strain", "pain", "stiffness", "injury", "tear", "dislocation", "arthritis", "sciatica", "tendinitis", "surgery", "replacement", "fracture", "bruise", "spasm", "inflammation", "bursitis", "tendonitis"]
+VALID_BODY_PARTS = ["back", "neck", "shoulder", "elbow", "wrist", "hip", "knee", "ankle", "leg", "arm", "chest", "foot", "hand", "spine", "calf", "thigh", "groin"]
+
+
+# Plans are only stored in the precomputed table when they pass these checks
+MIN_PLAN_EXERCISES = 2
+MAX_PLAN_EXERCISES = 4
+
+_CATALOG_NAMES = {name.lower(): name for name in exercise_details}
+# Similarity needed to map a misspelled name ("Glute Bridge") onto the catalog
+NAME_MATCH_CUTOFF = 0.8
+PLAN_FIELDS = ("name", "description", "frequency", "duration")
+
+# Response schema for constrained generation; names can only come from the catalog
+EXERCISE_PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "exercises": {
+            "type": "array",
+            "min_items": MIN_PLAN_EXERCISES,
+            "max_items": MAX_PLAN_EXERCISES,
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "format": "enum", "enum": list(exercise_details)},
+                    "description": {"type": "string"},
+                    "frequency": {"type": "string", "description": "e.g. 3-4 times a week"},
+                    "duration": {"type": "string", "description": "duration or sets/reps, e.g. 2 sets of 15 reps"},
+                },
+                "required": list(PLAN_FIELDS),
+            },
+        },
+    },
+    "required": ["exercises"],
+}
+SUGGESTION_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": EXERCISE_PLAN_SCHEMA,
+}
+
+
+def suggestion_prompt(injury_type, duration, severity, user_message):
+    # The response schema carries the allowed names and the output format
+    return (
+        f"A user is seeking physiotherapy advice. Their reported condition is: '{injury_type}'. "
+        f"They have had it for: '{duration}'. The severity is: '{severity}'. "
+        f"Additional details: '{user_message}'. "
+        "Based on this, recommend 2 to 4 suitable physiotherapy exercises from the allowed exercise names. "
+        "For each exercise, provide a description, a recommended frequency, and duration/reps."
+    )
+
+
+def parse_exercises(text):
+    """Exercises from a reply in the legacy ``Name: description | Frequency: ... | Duration: ...`` line format."""
+    recommended_exercises = []
+    for line in text.splitlines():
+        if ':' in line and '|' in line:
+            try:
+                # Split the line into major parts by the pipe character
+                parts = line.split('|')
+
+                # The first part contains the name and description
+                name_desc_part = parts[0]
+                name, _, description = name_desc_part.partition(':')
+
+                # The second part should be frequency
+                freq_part = parts[1]
+                _, _, frequency = freq_part.partition(':')
+
+                # The third part should be duration/reps
+                dur_part = parts[2]
+                _, _, duration_reps = dur_part.partition(':')
+
+                recommended_exercises.append({
+                    "name": name.strip().strip("'\""),
+                    "description": description.strip(),
+                    "frequency": frequency.strip(),
+                    "duration": duration_reps.strip()
+                })
+            except (IndexError, ValueError) as e:
+                log_event("exercise_line_unparsed", line=line, error=str(e))
+                continue
+    return recommended_exercises
+
+
+def validate_plan(exercises):
+    """Plan with catalog names restored, or None if it is not fit to store.
+
+    A valid plan has 2-4 distinct catalog exercises, each with a
+    description, frequency and duration.
+    """
+    if not MIN_PLAN_EXERCISES <= len(exercises) <= MAX_PLAN_EXERCISES:
+        return None
+    plan, seen = [], set()
+    for exercise in exercises:
+        name = _CATALOG_NAMES.get(exercise["name"].lower())
+        if name is None or name in seen:
+            return None
+        if not (exercise["description"] and exercise["frequency"] and exercise["duration"]):
+            return None
+        seen.add(name)
+        plan.append({**exercise, "name": name})
+    return plan
+
+
+class PlanParseStats:
+    """How often replies were valid as generated, repaired locally, or unusable."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"valid": 0, "repaired": 0, "failed": 0}
+        self.repairs = {}
+
+    def record(self, status, repairs=()):
+        with self._lock:
+            self.counts[status] += 1
+            for repair in repairs:
+                self.repairs[repair] = self.repairs.get(repair, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = sum(self.counts.values())
+            return {
+                **self.counts,
+                "total": total,
+                "failure_rate": round(self.counts["failed"] / total, 4) if total else 0.0,
+                "repair_rate": round(self.counts["repaired"] / total, 4) if total else 0.0,
+                "repairs": dict(self.repairs),
+            }
+
+
+def _json_items(text):
+    """Exercise objects from a JSON reply, salvaging complete items from truncated output.
+
+    Returns (items, repairs) or (None, repairs) if no JSON could be read.
+    """
+    repairs = []
+    stripped = text.strip()
+    if stripped.startswith("```"):
+        stripped = re.sub(r"^```[a-zA-Z]*\s*|\s*```$", "", stripped)
+        repairs.append("code_fence")
+    try:
+        data = json.loads(stripped)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        data = data.get("exercises")
+    if isinstance(data, list):
+        return data, repairs
+
+    # Truncated or wrapped output: decode the array's complete objects one by one
+    start = stripped.find("[")
+    if start == -1:
+        return None, repairs
+    decoder, items, pos = json.JSONDecoder(), [], start + 1
+    while True:
+        while pos < len(stripped) and stripped[pos] in " \t\r\n,":
+            pos += 1
+        try:
+            item, pos = decoder.raw_decode(stripped, pos)
+        except ValueError:
+            break
+        items.append(item)
+    if not items:
+        return None, repairs
+    return items, repairs + ["truncated_json"]
+
+
+def _catalog_name(name):
+    name = str(name).strip().strip("'\"")
+    exact = _CATALOG_NAMES.get(name.lower())
+    if exact is not None:
+        return exact, False
+    close = difflib.get_close_matches(name.lower(), list(_CATALOG_NAMES), n=1, cutoff=NAME_MATCH_CUTOFF)
+    return (_CATALOG_NAMES[close[0]], True) if close else (None, False)
+
+
+def parse_plan(text):
+    """Validated exercises from a structured reply, repaired where possible.
+
+    Returns (exercises, status, repairs); status is "valid", "repaired"
+    (usable after local fixes) or "failed" (nothing usable). Names are
+    mapped onto the catalog, unknown or duplicate exercises and entries
+    missing a field are dropped, and at most MAX_PLAN_EXERCISES are kept.
+    """
+    items, repairs = _json_items(text or "")
+    if items is None:
+        items = parse_exercises(text or "")
+        if items:
+            repairs.append("legacy_format")
+
+    exercises, seen = [], set()
+    for item in items:
+        if not isinstance(item, dict):
+            repairs.append("dropped_invalid")
+            continue
+        name, renamed = _catalog_name(item.get("name", ""))
+        fields = {field: str(item.get(field) or "").strip() for field in PLAN_FIELDS[1:]}
+        if name is None or not all(fields.values()):
+            repairs.append("dropped_invalid")
+            continue
+        if name in seen:
+            repairs.append("dropped_duplicate")
+            continue
+        if renamed:
+            repairs.append("renamed")
+        seen.add(name)
+        exercises.append({"name": name, **fields})
+    if len(exercises) > MAX_PLAN_EXERCISES:
+        exercises = exercises[:MAX_PLAN_EXERCISES]
+        repairs.append("trimmed")
+
+    if not exercises:
+        return [], "failed", repairs
+    return exercises, "repaired" if repairs else "valid", repairs
@@ -1,25 +1,79 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import google.generativeai as genai
+import math
 import os
 from dotenv import load_dotenv
+# Before the local imports below: they read their settings from the environment
+load_dotenv()
+import gemini_clients
+from yantra_common.instrumentation import REGISTRY, instrument_flask, log_event, record_cache, record_usage, timed
+from yantra_common.single_flight import SingleFlight
+from form_analysis import FormAnalyzer, build_prompt, truncate_feedback
+from feedback_cache import FeedbackCache, make_key
+import landmarks as lm
 
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
-load_dotenv()
+instrument_flask(app)
 
 # Configure Gemini API
 gemini_api_key = os.getenv("gemini_api_key1")
 if not gemini_api_key:
     raise ValueError("GEMINI_API_KEY environment variable is not set.")
-genai.configure(api_key=gemini_api_key)
+gemini_clients.configure(gemini_api_key)
+
+# Local rule engine; only ambiguous frames and periodic encouragement reach Gemini
+form_analyzer = FormAnalyzer()
+# Tips for quantized pose states, so jittered repeats skip Gemini
+feedback_cache = FeedbackCache()
+# Concurrent misses for the same pose state share one Gemini call
+feedback_flight = SingleFlight()
+REGISTRY.add_collector("feedback_cache", feedback_cache.stats)
+REGISTRY.add_collector("feedback_single_flight", feedback_flight.stats)
+
+
+def _generate_feedback(prompt):
+    model = gemini_clients.get_model(gemini_clients.FEEDBACK_MODEL)
+    with timed("llm"):
+        response = model.generate_content(prompt)
+    record_usage(response, gemini_clients.FEEDBACK_MODEL)
+    feedback = truncate_feedback(response.text)
+    log_event("feedback_generated", prompt=prompt, response=feedback)
+    return feedback
+
+
+def _llm_feedback(client_id, rep_count, stage, result, **prompt_kwargs):
+    """Cached or freshly generated tip for a frame the rules handed off.
+
+    Returns (feedback, source); falls back to the rule engine's answer if
+    Gemini is unavailable.
+    """
+    key = make_key(stage, rep_count, result.metrics, result.issue)
+    cached = feedback_cache.get(key)
+    record_cache("feedback", cached is not None)
+    if cached is not None:
+        form_analyzer.mark_llm_used(client_id, rep_count)
+        return cached, "cache"
+
+    with timed("prompt_build"):
+        prompt = build_prompt(rep_count, stage, result.metrics, **prompt_kwargs)
+    try:
+        feedback = feedback_flight.do(key, lambda: _generate_feedback(prompt))
+    except Exception as e:
+        log_event("feedback_llm_failed", level="warning", error=str(e))
+        return result.feedback, "rules"
+    form_analyzer.mark_llm_used(client_id, rep_count)
+    feedback_cache.set(key, feedback)
+    return feedback, "llm"
+
 
 @app.route("/live-feedback", methods=["POST"])
 def live_feedback():
     try:
-        data = request.json
+        with timed("request_parse"):
+            data = request.json
         rep_count = data.get('rep')
         stage = data.get('stage')
         landmarks = data.get('landmarks') # This will be the raw landmark data
@@ -27,40 +81,112 @@ def live_feedback():
         if not landmarks:
             return jsonify({"feedback": "No landmark data provided."}), 400
 
-        # Constructing the prompt with raw landmark data
-        # You'll need to decide which specific landmarks are most relevant
-        # for the AI to provide feedback on bicep curls.
-        # For a bicep curl, key landmarks would be wrist, elbow, and shoulder.
-        # Let's assume right arm for now (indices 16, 14, 12 for wrist, elbow, shoulder)
-        right_wrist = landmarks[16] if len(landmarks) > 16 else None
-        right_elbow = landmarks[14] if len(landmarks) > 14 else None
-        right_shoulder = landmarks[12] if len(landmarks) > 12 else None
-
-        prompt = (
-            f"You are a physiotherapist observing a user doing bicep curls in real time.\n"
-            f"Current rep: {rep_count}\n"
-            f"Current stage: {stage}\n"
-        )
-        if right_wrist and right_elbow and right_shoulder:
-            prompt += (
-                f"Right wrist position (x,y,z): ({right_wrist['x']:.2f}, {right_wrist['y']:.2f}, {right_wrist['z']:.2f})\n"
-                f"Right elbow position (x,y,z): ({right_elbow['x']:.2f}, {right_elbow['y']:.2f}, {right_elbow['z']:.2f})\n"
-                f"Right shoulder position (x,y,z): ({right_shoulder['x']:.2f}, {right_shoulder['y']:.2f}, {right_shoulder['z']:.2f})\n"
-            )
-        prompt += "Provide a brief, actionable, real-time tip or encouragement (max 100 characters)."
-        
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        
-        # Ensure the feedback is max 100 characters
-        feedback = response.text
-        if len(feedback) > 100:
-            feedback = feedback[:97] + "..." # Truncate and add ellipsis
+        # Form state is per exercise session; clients behind one address (NAT, proxies) must not share it
+        if not data.get('sessionId'):
+            return jsonify({"feedback": "No sessionId provided."}), 400
+        client_id = str(data['sessionId'])
+        with timed("analysis"):
+            result = form_analyzer.analyze(client_id, rep_count, stage, landmarks)
+        if not result.needs_llm:
+            with timed("serialize"):
+                return jsonify({
+                    "feedback": result.feedback,
+                    "source": "rules",
+                    "issue": result.issue,
+                    "metrics": result.metrics,
+                })
 
-        return jsonify({"feedback": feedback})
+        feedback, source = _llm_feedback(client_id, rep_count, stage, result, landmarks=landmarks)
+        with timed("serialize"):
+            return jsonify({"feedback": feedback, "source": source, "issue": result.issue, "metrics": result.metrics})
     except Exception as e:
-        print("Error in live-feedback:", e)
+        log_event("live_feedback_failed", level="error", error=str(e))
         return jsonify({"feedback": "Error contacting Gemini API."}), 500
 
+@app.route("/live-feedback/batch", methods=["POST"])
+def live_feedback_batch():
+    """Feedback for a buffered batch of frames (e.g. one second at 30 fps).
+
+    Accepts either JSON ``{"frames": [{"landmarks": [...], "timestamp": ...}, ...]}``,
+    JSON ``{"packed": "<base64 float32 N x 33 x channels>", "channels": 4}``,
+    or a raw ``application/octet-stream`` body of the same packed layout
+    with ``rep``/``stage``/``channels``/``fps`` passed as query parameters.
+    Every form needs a ``sessionId`` naming the client's exercise session.
+    """
+    try:
+        with timed("request_parse"):
+            if request.mimetype == "application/octet-stream":
+                data = request.args
+                coords, visibility = lm.unpack_frames(request.get_data(), int(data.get('channels', 4)))
+                rep_count = data.get('rep', type=int)
+                timestamps = None
+            else:
+                data = request.get_json(silent=True) or {}
+                frames = data.get('frames')
+                if frames:
+                    coords, visibility = lm.frames_to_array(frames)
+                    timestamps = [f.get('timestamp') for f in frames if isinstance(f, dict)]
+                    if len(timestamps) != len(frames) or None in timestamps:
+                        timestamps = None
+                elif data.get('packed'):
+                    coords, visibility = lm.unpack_frames(data['packed'], int(data.get('channels', 4)))
+                    timestamps = data.get('timestamps')
+                else:
+                    return jsonify({"feedback": "No landmark data provided."}), 400
+                rep_count = data.get('rep')
+                if rep_count is None and frames:
+                    rep_count = frames[-1].get('rep') if isinstance(frames[-1], dict) else None
+            stage = data.get('stage')
+            arm = data.get('arm', 'right')
+            if arm not in lm.ARMS:
+                return jsonify({"feedback": f"Unknown arm '{arm}'."}), 400
+            if not data.get('sessionId'):
+                return jsonify({"feedback": "No sessionId provided."}), 400
+            fps = float(data.get('fps', lm.DEFAULT_FPS))
+            if not math.isfinite(fps) or fps <= 0:
+                raise ValueError("fps must be a positive number")
+    except (ValueError, TypeError) as e:
+        return jsonify({"feedback": f"Invalid landmark batch: {e}"}), 400
+
+    try:
+        with timed("landmark_metrics"):
+            times = lm.frame_timestamps(len(coords), timestamps, fps)
+            metrics = lm.arm_metrics(coords, visibility, times)
+            summary = lm.summarize(metrics)
+
+        client_id = str(data['sessionId'])
+        with timed("analysis"):
+            result = form_analyzer.analyze_batch(client_id, rep_count, stage, lm.select_arm(metrics, arm))
+        body = {
+            "feedback": result.feedback,
+            "source": "rules",
+            "issue": result.issue,
+            "metrics": result.metrics,
+            "arms": summary,
+            "frames": len(coords),
+        }
+        if not result.needs_llm:
+            with timed("serialize"):
+                return jsonify(body)
+
+        body["feedback"], body["source"] = _llm_feedback(client_id, rep_count, stage, result, summary=summary)
+        with timed("serialize"):
+            return jsonify(body)
+    except Exception as e:
+        log_event("live_feedback_batch_failed", level="error", error=str(e))
+        return jsonify({"feedback": "Error processing landmark batch."}), 500
+
+@app.route("/live-feedback/cache-stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss counters for tuning the feedback cache buckets."""
+    return jsonify(feedback_cache.stats())
+
+@app.route("/live-feedback/coalescing-stats", methods=["GET"])
+def coalescing_stats():
+    """How many cache misses shared an in-flight Gemini call."""
+    return jsonify(feedback_flight.stats())
+
+# Development server; in production run `gunicorn -c gunicorn.conf.py feedback:app` (or asgi.py for every service)
 if __name__ == '__main__':
+    gemini_clients.warmup(gemini_clients.FEEDBACK_MODEL)
     app.run(host="0.0.0.0", port=8888, debug=True)
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""Cache of Gemini live-feedback tips keyed on a quantized pose state.
+
+Frames that differ only by landmark jitter map to the same key (stage,
+rep-phase bucket, binned elbow angle, shoulder-drift bucket), so a tip
+generated once is reused for repeated postural situations. Entries live
+in an in-process TTL/LRU map; when REDIS_URL is set and the ``redis``
+package is installed, they are also shared across processes.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from yantra_common.instrumentation import log_event
+
+try:
+    import redis
+except ImportError:  # optional shared backing
+    redis = None
+
+# Bucket sizes, tunable from the environment against hit rate
+ANGLE_BIN_DEGREES = float(os.getenv("FEEDBACK_CACHE_ANGLE_BIN", 15))
+DRIFT_BIN = float(os.getenv("FEEDBACK_CACHE_DRIFT_BIN", 0.02))
+REP_PHASE_BUCKET = int(os.getenv("FEEDBACK_CACHE_REP_BUCKET", 5))
+MAX_REP_PHASE = 3
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("FEEDBACK_CACHE_MAX_ENTRIES", 4096))
+DEFAULT_TTL = float(os.getenv("FEEDBACK_CACHE_TTL", 600))  # seconds
+KEY_PREFIX = "live-feedback:"
+
+
+def _bucket(value, size):
+    if value is None:
+        return "-"
+    return str(int(value // size))
+
+
+def make_key(stage, rep_count, metrics: dict, issue: Optional[str] = None) -> str:
+    """Quantized feature key for a frame or batch."""
+    rep = int(rep_count) if isinstance(rep_count, (int, float)) else 0
+    rep_phase = min(rep // REP_PHASE_BUCKET, MAX_REP_PHASE)
+    return "|".join((
+        str(stage or "-"),
+        str(rep_phase),
+        _bucket(metrics.get("elbow_angle"), ANGLE_BIN_DEGREES),
+        _bucket(metrics.get("shoulder_drift"), DRIFT_BIN),
+        issue or "-",
+    ))
+
+
+class FeedbackCache:
+    """TTL/LRU cache with hit/miss counters and optional Redis backing."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL,
+                 redis_url: Optional[str] = None):
+        redis_url = redis_url or os.getenv("REDIS_URL")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.evictions = 0
+        self._redis = None
+        if redis_url and redis is not None:
+            try:
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.05)
+            except Exception as e:
+                log_event("feedback_cache_redis_unavailable", level="warning", error=str(e), detail="using memory only")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                feedback, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return feedback
+                del self._entries[key]
+
+        if self._redis is not None:
+            try:
+                value = self._redis.get(KEY_PREFIX + key)
+            except Exception:
+                value = None
+            if value is not None:
+                feedback = value.decode("utf-8")
+                with self._lock:
+                    self.hits += 1
+                    self.shared_hits += 1
+                    self._store(key, feedback, now)
+                return feedback
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, feedback: str):
+        with self._lock:
+            self._store(key, feedback, time.monotonic())
+        if self._redis is not None:
+            try:
+                self._redis.setex(KEY_PREFIX + key, int(self.ttl), feedback)
+            except Exception:
+                pass
+
+    def _store(self, key: str, feedback: str, now: float):
+        self._entries[key] = (feedback, now + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_hits": self.shared_hits,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "shared_backend": "redis" if self._redis is not None else None,
+                "buckets": {
+                    "angle_degrees": ANGLE_BIN_DEGREES,
+                    "shoulder_drift": DRIFT_BIN,
+                    "rep_phase": REP_PHASE_BUCKET,
+                },
+            }
@@ -0,0 +1,224 @@
+"""Streaming live feedback over a WebSocket.
+
+ASGI counterpart of feedback.py: each client keeps one connection open,
+streams landmark frames over it and only receives a message when the
+feedback changes. Rep/stage state lives on the server per user, so there
+is no per-frame HTTP request setup, CORS handling or JSON re-parse of a
+whole request.
+
+Run with: uvicorn feedback_stream:app --host 0.0.0.0 --port 8889
+"""
+import asyncio
+import json
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.middleware.cors import CORSMiddleware
+
+# Before the local imports below: they read their settings from the environment
+load_dotenv()
+
+import gemini_clients
+from yantra_common.instrumentation import IN_FLIGHT, REGISTRY, instrument_fastapi, log_event, record_cache, record_usage, timed
+from yantra_common.single_flight import AsyncSingleFlight
+import landmarks as lm
+from feedback_cache import FeedbackCache, make_key
+from form_analysis import FormAnalyzer, FormResult, build_prompt, truncate_feedback
+
+# Configure Gemini API
+gemini_api_key = os.getenv("gemini_api_key1")
+if not gemini_api_key:
+    raise ValueError("GEMINI_API_KEY environment variable is not set.")
+gemini_clients.configure(gemini_api_key)
+
+app = FastAPI(title="Live Feedback Stream")
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+instrument_fastapi(app)
+
+form_analyzer = FormAnalyzer()
+feedback_cache = FeedbackCache()
+# Streams in the same pose state share one in-flight Gemini call
+feedback_flight = AsyncSingleFlight()
+# Distinct prefixes from feedback.py, which may share this process's registry (asgi.py)
+REGISTRY.add_collector("feedback_stream_cache", feedback_cache.stats)
+REGISTRY.add_collector("feedback_stream_single_flight", feedback_flight.stats)
+
+
+@app.on_event("startup")
+async def warmup_clients():
+    await asyncio.to_thread(gemini_clients.warmup, gemini_clients.FEEDBACK_MODEL)
+
+
+class StreamSession:
+    """State for one open feedback stream."""
+
+    def __init__(self, websocket: WebSocket, client_id: str):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.rep = 0
+        self.stage = None
+        self.channels = 4
+        self.fps = lm.DEFAULT_FPS
+        self.last_sent: Optional[str] = None
+        self.llm_task: Optional[asyncio.Task] = None
+        self._send_lock = asyncio.Lock()
+
+    def update_state(self, data: dict):
+        """Pick up rep/stage/format settings sent alongside (or instead of) frames."""
+        if data.get("rep") is not None:
+            self.rep = data["rep"]
+        if data.get("stage") is not None:
+            self.stage = data["stage"]
+        if data.get("channels") is not None:
+            self.channels = int(data["channels"])
+        if data.get("fps") is not None:
+            self.fps = float(data["fps"])
+
+    async def send(self, feedback: str, source: str, result: FormResult):
+        # Only push when the message actually changes
+        if feedback == self.last_sent:
+            return
+        self.last_sent = feedback
+        async with self._send_lock:
+            await self.websocket.send_json({
+                "feedback": feedback,
+                "source": source,
+                "issue": result.issue,
+                "metrics": result.metrics,
+                "rep": self.rep,
+            })
+
+    async def handle(self, result: FormResult, prompt_kwargs: dict):
+        if not result.needs_llm:
+            await self.send(result.feedback, "rules", result)
+            return
+        key = make_key(self.stage, self.rep, result.metrics, result.issue)
+        cached = feedback_cache.get(key)
+        record_cache("feedback", cached is not None)
+        if cached is not None:
+            form_analyzer.mark_llm_used(self.client_id, self.rep)
+            await self.send(cached, "cache", result)
+            return
+        # At most one Gemini call in flight per stream; later frames keep flowing meanwhile
+        if self.llm_task is None or self.llm_task.done():
+            form_analyzer.mark_llm_used(self.client_id, self.rep)
+            prompt = build_prompt(self.rep, self.stage, result.metrics, **prompt_kwargs)
+            self.llm_task = asyncio.create_task(self._llm_feedback(prompt, key, result))
+
+    async def _llm_feedback(self, prompt: str, key: str, result: FormResult):
+        try:
+            feedback = await feedback_flight.do(key, lambda: _generate_feedback(prompt, key))
+            await self.send(feedback, "llm", result)
+        except Exception as e:
+            log_event("feedback_llm_failed", level="warning", error=str(e))
+            await self.send(result.feedback, "rules", result)
+
+    def close(self):
+        if self.llm_task is not None and not self.llm_task.done():
+            self.llm_task.cancel()
+
+
+async def _generate_feedback(prompt: str, key: str) -> str:
+    model = gemini_clients.get_model(gemini_clients.FEEDBACK_MODEL)
+    with timed("llm"):
+        response = await model.generate_content_async(prompt)
+    record_usage(response, gemini_clients.FEEDBACK_MODEL)
+    feedback = truncate_feedback(response.text)
+    feedback_cache.set(key, feedback)
+    log_event("feedback_generated", prompt=prompt, response=feedback)
+    return feedback
+
+
+def _analyze_text(session: StreamSession, data: dict):
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    session.update_state(data)
+    if data.get("frames"):
+        frames = data["frames"]
+        coords, visibility = lm.frames_to_array(frames)
+        timestamps = [f.get("timestamp") for f in frames if isinstance(f, dict)]
+        if len(timestamps) != len(frames) or None in timestamps:
+            timestamps = None
+        times = lm.frame_timestamps(len(coords), timestamps, session.fps)
+        metrics = lm.arm_metrics(coords, visibility, times)
+        summary = lm.summarize(metrics)
+        result = form_analyzer.analyze_batch(
+            session.client_id, session.rep, session.stage, lm.select_arm(metrics, data.get("arm", "right"))
+        )
+        return result, {"summary": summary}
+    if data.get("landmarks"):
+        result = form_analyzer.analyze(session.client_id, session.rep, session.stage, data["landmarks"])
+        return result, {"landmarks": data["landmarks"]}
+    return None, None
+
+
+def _analyze_bytes(session: StreamSession, payload: bytes):
+    coords, visibility = lm.unpack_frames(payload, session.channels)
+    metrics = lm.arm_metrics(coords, visibility, lm.frame_timestamps(len(coords), fps=session.fps))
+    summary = lm.summarize(metrics)
+    result = form_analyzer.analyze_batch(session.client_id, session.rep, session.stage, lm.select_arm(metrics, "right"))
+    return result, {"summary": summary}
+
+
+@app.websocket("/ws/live-feedback")
+async def live_feedback_stream(websocket: WebSocket, userId: Optional[str] = None):
+    """Continuous landmark stream in, feedback changes out.
+
+    Text messages are JSON: a single frame ``{"rep", "stage", "landmarks"}``,
+    a batch ``{"rep", "stage", "frames": [...]}`` or a state-only update.
+    Binary messages are packed float32 frames (see ``landmarks.unpack_frames``)
+    using the rep/stage/channels from the latest JSON message.
+    """
+    await websocket.accept()
+    client_id = userId or f"{websocket.client.host}:{websocket.client.port}"
+    session = StreamSession(websocket, client_id)
+    IN_FLIGHT.inc(route="/ws/live-feedback")
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                with timed("analysis"):
+                    if message.get("bytes") is not None:
+                        result, prompt_kwargs = _analyze_bytes(session, message["bytes"])
+                    else:
+                        result, prompt_kwargs = _analyze_text(session, json.loads(message["text"]))
+            except (ValueError, TypeError, KeyError) as e:
+                await websocket.send_json({"error": f"Invalid frame: {e}"})
+                continue
+            if result is not None:
+                await session.handle(result, prompt_kwargs)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        IN_FLIGHT.dec(route="/ws/live-feedback")
+        session.close()
+
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy"}
+
+
+@app.get("/cache-stats")
+async def cache_stats():
+    return feedback_cache.stats()
+
+
+@app.get("/coalescing-stats")
+async def coalescing_stats():
+    return feedback_flight.stats()
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8889)
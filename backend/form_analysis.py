@@ -0,0 +1,319 @@
+"""Rule-based form analysis for the bicep curl live feedback endpoint.
+
+Computes elbow angle, range of motion, tempo and shoulder drift from
+MediaPipe pose landmarks so the common form problems can be answered
+in-process. Only ambiguous frames and periodic encouragement are sent
+on to Gemini.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+# MediaPipe pose landmark indices (right side of the body)
+RIGHT_SHOULDER = 12
+RIGHT_ELBOW = 14
+RIGHT_WRIST = 16
+RIGHT_HIP = 24
+
+# Thresholds (angles in degrees, distances in normalized image units)
+MIN_VISIBILITY = 0.5
+FULL_FLEXION_ANGLE = 60        # elbow angle expected at the top of a curl
+FULL_EXTENSION_ANGLE = 150     # elbow angle expected at the bottom of a curl
+MAX_UPPER_ARM_SWING = 25       # upper arm vs torso angle before it counts as swinging
+MAX_SHOULDER_DRIFT = 0.06      # shoulder movement relative to the hip
+MAX_ANGULAR_VELOCITY = 360     # degrees per second
+MIN_REP_SECONDS = 1.5
+MIN_ROM_SECONDS = 1.0          # how long a rep must have been watched before judging its range
+AMBIGUITY_MARGIN = 0.1         # fraction of a threshold treated as borderline
+
+# How often the LLM is asked for encouragement when form is fine
+ENCOURAGEMENT_EVERY_REPS = 5
+ENCOURAGEMENT_INTERVAL = 20    # seconds
+
+MAX_TRACKED_SESSIONS = 10000
+
+FEEDBACK_MESSAGES = {
+    "not_visible": "Keep your right arm fully in view of the camera.",
+    "swinging": "Keep your elbow pinned to your side - don't swing the arm.",
+    "shoulder_drift": "Keep your shoulder still and avoid leaning or shrugging.",
+    "too_fast": "Slow down - lift and lower with control.",
+    "partial_top": "Curl all the way up and squeeze at the top.",
+    "partial_bottom": "Lower the weight until your arm is fully extended.",
+    "good_form": "Good form - keep it steady!",
+}
+
+
+def _point(landmarks, index):
+    point = landmarks[index] if isinstance(landmarks, list) and len(landmarks) > index else None
+    return point if isinstance(point, dict) and point else None
+
+
+def _angle(a, b, c) -> float:
+    """Angle at b (degrees) formed by points a-b-c in the image plane."""
+    radians = math.atan2(c['y'] - b['y'], c['x'] - b['x']) - math.atan2(a['y'] - b['y'], a['x'] - b['x'])
+    angle = abs(math.degrees(radians))
+    return 360 - angle if angle > 180 else angle
+
+
+def build_prompt(rep_count, stage, metrics, landmarks=None, summary=None) -> str:
+    """Gemini prompt for a frame (raw landmarks) or a batch (per-arm summary)."""
+    prompt = (
+        f"You are a physiotherapist observing a user doing bicep curls in real time.\n"
+        f"Current rep: {rep_count}\n"
+        f"Current stage: {stage}\n"
+    )
+    # For a bicep curl, key landmarks are wrist, elbow, and shoulder (right arm)
+    wrist = _point(landmarks, RIGHT_WRIST)
+    elbow = _point(landmarks, RIGHT_ELBOW)
+    shoulder = _point(landmarks, RIGHT_SHOULDER)
+    if wrist and elbow and shoulder:
+        prompt += (
+            f"Right wrist position (x,y,z): ({wrist['x']:.2f}, {wrist['y']:.2f}, {wrist['z']:.2f})\n"
+            f"Right elbow position (x,y,z): ({elbow['x']:.2f}, {elbow['y']:.2f}, {elbow['z']:.2f})\n"
+            f"Right shoulder position (x,y,z): ({shoulder['x']:.2f}, {shoulder['y']:.2f}, {shoulder['z']:.2f})\n"
+        )
+    if summary:
+        prompt += f"Per-arm summary of the recent frames: {summary}\n"
+    if metrics:
+        prompt += "Measured form metrics: " + ", ".join(f"{k}={v}" for k, v in metrics.items()) + "\n"
+    prompt += "Provide a brief, actionable, real-time tip or encouragement (max 100 characters)."
+    return prompt
+
+
+def truncate_feedback(feedback: str) -> str:
+    """Ensure the feedback is max 100 characters."""
+    if len(feedback) > 100:
+        feedback = feedback[:97] + "..." # Truncate and add ellipsis
+    return feedback
+
+
+def _near(value: float, threshold: float) -> bool:
+    return abs(value - threshold) <= abs(threshold) * AMBIGUITY_MARGIN
+
+
+@dataclass
+class CurlState:
+    """Per-client state carried between frames."""
+    last_rep: Optional[int] = None
+    last_rep_at: Optional[float] = None
+    last_rep_seconds: Optional[float] = None
+    rep_min_angle: float = 180.0
+    rep_max_angle: float = 0.0
+    pending_issue: Optional[str] = None
+    shoulder_baseline: Optional[float] = None
+    prev_angle: Optional[float] = None
+    prev_time: Optional[float] = None
+    last_llm_at: Optional[float] = None  # set at the client's first frame
+    last_llm_rep: int = 0
+
+
+@dataclass
+class FormResult:
+    """Outcome of analyzing one frame.
+
+    ``needs_llm`` is set when the rules could not settle the frame or when
+    it is time for an encouragement message; ``feedback`` then holds the
+    local fallback to use if the LLM call fails.
+    """
+    feedback: str
+    issue: Optional[str]
+    needs_llm: bool
+    metrics: dict = field(default_factory=dict)
+
+
+class FormAnalyzer:
+    """Deterministic bicep curl form analyzer with per-client state."""
+
+    def __init__(self, max_sessions: int = MAX_TRACKED_SESSIONS):
+        self.max_sessions = max_sessions
+        self._states: "OrderedDict[str, CurlState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, client_id: str) -> CurlState:
+        state = self._states.get(client_id)
+        if state is None:
+            state = CurlState()
+            self._states[client_id] = state
+            if len(self._states) > self.max_sessions:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(client_id)
+        return state
+
+    def reset(self, client_id: str):
+        with self._lock:
+            self._states.pop(client_id, None)
+
+    def mark_llm_used(self, client_id: str, rep_count=None, now: Optional[float] = None):
+        """Record that the LLM answered for this client (resets the encouragement timer)."""
+        with self._lock:
+            state = self._state(client_id)
+            state.last_llm_at = now if now is not None else time.monotonic()
+            if isinstance(rep_count, (int, float)):
+                state.last_llm_rep = int(rep_count)
+
+    def analyze(self, client_id: str, rep_count, stage, landmarks, now: Optional[float] = None) -> FormResult:
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            return self._analyze(self._state(client_id), rep_count, stage, landmarks, now)
+
+    def analyze_batch(self, client_id: str, rep_count, stage, frame_metrics: dict, now: Optional[float] = None) -> FormResult:
+        """Judge a buffered batch of frames for one arm.
+
+        ``frame_metrics`` holds per-frame arrays produced by
+        ``landmarks.arm_metrics`` (already sliced to a single arm), so the
+        rules only run once per batch instead of once per frame.
+        """
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            state = self._state(client_id)
+            valid = frame_metrics["valid"]
+            if not valid.any():
+                return FormResult(FEEDBACK_MESSAGES["not_visible"], "not_visible", needs_llm=False)
+
+            angles = frame_metrics["elbow_angle"][valid]
+            velocity = frame_metrics["angular_velocity"][valid]
+            velocity = velocity[np.isfinite(velocity)]
+            swing = frame_metrics["upper_arm_swing"][valid]
+            torso = frame_metrics["torso_length"][valid]
+            swing = swing[~np.isnan(swing)]
+            torso = torso[~np.isnan(torso)]
+
+            shoulder_drift = None
+            if torso.size:
+                if state.shoulder_baseline is None:
+                    state.shoulder_baseline = float(torso[0])
+                shoulder_drift = float(np.abs(torso - state.shoulder_baseline).max())
+                state.shoulder_baseline += (1 - 0.95 ** torso.size) * (float(torso.mean()) - state.shoulder_baseline)
+
+            state.prev_angle, state.prev_time = float(angles[-1]), now
+            return self._judge(
+                state, rep_count, stage, now,
+                angle_min=float(angles.min()),
+                angle_max=float(angles.max()),
+                last_angle=float(angles[-1]),
+                angular_velocity=float(velocity.max()) if velocity.size else None,
+                upper_arm_swing=float(swing.max()) if swing.size else None,
+                shoulder_drift=shoulder_drift,
+            )
+
+    def _analyze(self, state: CurlState, rep_count, stage, landmarks, now: float) -> FormResult:
+        shoulder = _point(landmarks, RIGHT_SHOULDER)
+        elbow = _point(landmarks, RIGHT_ELBOW)
+        wrist = _point(landmarks, RIGHT_WRIST)
+        hip = _point(landmarks, RIGHT_HIP)
+
+        if not (shoulder and elbow and wrist) or any(
+            p.get('visibility', 1.0) < MIN_VISIBILITY for p in (shoulder, elbow, wrist)
+        ):
+            return FormResult(FEEDBACK_MESSAGES["not_visible"], "not_visible", needs_llm=False)
+
+        elbow_angle = _angle(shoulder, elbow, wrist)
+
+        # Angular velocity between consecutive frames
+        angular_velocity = None
+        if state.prev_angle is not None and now > state.prev_time:
+            angular_velocity = abs(elbow_angle - state.prev_angle) / (now - state.prev_time)
+        state.prev_angle, state.prev_time = elbow_angle, now
+
+        # Upper arm swing: angle between torso (shoulder->hip) and upper arm (shoulder->elbow)
+        upper_arm_swing = None
+        shoulder_drift = None
+        if hip and hip.get('visibility', 1.0) >= MIN_VISIBILITY:
+            upper_arm_swing = _angle(hip, shoulder, elbow)
+
+            # Shoulder drift: vertical shoulder-to-hip distance against a slow baseline
+            torso = hip['y'] - shoulder['y']
+            if state.shoulder_baseline is None:
+                state.shoulder_baseline = torso
+            shoulder_drift = abs(torso - state.shoulder_baseline)
+            state.shoulder_baseline += 0.05 * (torso - state.shoulder_baseline)
+
+        return self._judge(
+            state, rep_count, stage, now,
+            angle_min=elbow_angle,
+            angle_max=elbow_angle,
+            last_angle=elbow_angle,
+            angular_velocity=angular_velocity,
+            upper_arm_swing=upper_arm_swing,
+            shoulder_drift=shoulder_drift,
+        )
+
+    def _judge(self, state: CurlState, rep_count, stage, now: float, *, angle_min: float, angle_max: float,
+               last_angle: float, angular_velocity: Optional[float],
+               upper_arm_swing: Optional[float], shoulder_drift: Optional[float]) -> FormResult:
+        """Apply the form rules to one frame's (or one batch's) measurements."""
+        rep = int(rep_count) if isinstance(rep_count, (int, float)) else 0
+        metrics = {"elbow_angle": round(last_angle, 1)}
+
+        # The frames seen so far belong to the rep that may be finishing now
+        state.rep_min_angle = min(state.rep_min_angle, angle_min)
+        state.rep_max_angle = max(state.rep_max_angle, angle_max)
+
+        # Rep boundaries: tempo and range of motion of the finished rep
+        if state.last_rep is None:
+            # First frame: encouragement is counted from here, not from process start
+            state.last_rep, state.last_rep_at = rep, now
+            if state.last_llm_at is None:
+                state.last_llm_at, state.last_llm_rep = now, rep
+        elif rep > state.last_rep:
+            state.last_rep_seconds = (now - state.last_rep_at) / (rep - state.last_rep)
+            # Judge the range from whatever frames arrived, as long as the rep was watched long enough
+            if now - state.last_rep_at >= MIN_ROM_SECONDS:
+                if state.rep_min_angle > FULL_FLEXION_ANGLE:
+                    state.pending_issue = "partial_top"
+                elif state.rep_max_angle < FULL_EXTENSION_ANGLE:
+                    state.pending_issue = "partial_bottom"
+            state.last_rep, state.last_rep_at = rep, now
+            state.rep_min_angle, state.rep_max_angle = last_angle, last_angle
+        elif rep < state.last_rep:
+            # Counter was reset on the client; start over
+            state.last_rep, state.last_rep_at, state.last_llm_rep = rep, now, rep
+
+        if angular_velocity is not None:
+            metrics["angular_velocity"] = round(angular_velocity, 1)
+        if state.last_rep_seconds is not None:
+            metrics["rep_seconds"] = round(state.last_rep_seconds, 2)
+        if upper_arm_swing is not None:
+            metrics["upper_arm_swing"] = round(upper_arm_swing, 1)
+        if shoulder_drift is not None:
+            metrics["shoulder_drift"] = round(shoulder_drift, 3)
+        if stage:
+            metrics["stage"] = stage
+
+        issue = None
+        if upper_arm_swing is not None and upper_arm_swing > MAX_UPPER_ARM_SWING:
+            issue = "swinging"
+        elif shoulder_drift is not None and shoulder_drift > MAX_SHOULDER_DRIFT:
+            issue = "shoulder_drift"
+        elif (angular_velocity is not None and angular_velocity > MAX_ANGULAR_VELOCITY) or (
+            state.last_rep_seconds is not None and state.last_rep_seconds < MIN_REP_SECONDS
+        ):
+            issue = "too_fast"
+        elif state.pending_issue:
+            issue = state.pending_issue
+        state.pending_issue = None
+
+        if issue:
+            return FormResult(FEEDBACK_MESSAGES[issue], issue, needs_llm=False, metrics=metrics)
+
+        ambiguous = (
+            (upper_arm_swing is not None and _near(upper_arm_swing, MAX_UPPER_ARM_SWING))
+            or (shoulder_drift is not None and _near(shoulder_drift, MAX_SHOULDER_DRIFT))
+            or (angular_velocity is not None and _near(angular_velocity, MAX_ANGULAR_VELOCITY))
+        )
+        encouragement_due = (
+            rep - state.last_llm_rep >= ENCOURAGEMENT_EVERY_REPS
+            or now - state.last_llm_at >= ENCOURAGEMENT_INTERVAL
+        )
+        return FormResult(
+            FEEDBACK_MESSAGES["good_form"],
+            None,
+            needs_llm=ambiguous or encouragement_due,
+            metrics=metrics,
+        )
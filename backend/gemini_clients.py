@@ -0,0 +1,104 @@
+"""Process-wide registry of Gemini model clients.
+
+``genai.configure`` runs once per process and each GenerativeModel is
+built once and reused, so every request shares the same underlying
+gRPC channel instead of paying client construction per call. ``warmup``
+opens the connection (DNS, TLS, channel setup) at startup so the first
+real request does not pay for it.
+
+``genai.configure`` is process-wide and the SDK has no public way to
+give one model a different key, so a process uses one key. Apps sharing
+a process (see asgi.py) must be given the same key: configuring a
+different one raises instead of silently billing the first.
+
+Forked workers must call ``after_fork`` before their first request (see
+gunicorn.conf.py): gRPC channels opened before a fork cannot be used in
+the child.
+
+``GEMINI_API_ENDPOINT`` (host:port) points the SDK at another server
+speaking the Gemini gRPC API, e.g. the benchmark stand-in in
+ChatBackend/benchmarks/fake_gemini.py.
+"""
+import json
+import os
+import threading
+
+import google.generativeai as genai
+from google.api_core import retry
+
+from yantra_common.instrumentation import log_event
+
+FEEDBACK_MODEL = 'gemini-2.0-flash'
+SUGGESTION_MODEL = 'gemini-1.5-flash-latest'
+API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+WARMUP_TIMEOUT = float(os.getenv("GEMINI_WARMUP_TIMEOUT", "5"))  # seconds per model
+
+_lock = threading.Lock()
+_models = {}
+_api_key = None
+
+
+def configure(api_key: str):
+    """Configure the Gemini SDK once for this process; later calls must pass the same key."""
+    global _api_key
+    with _lock:
+        if _api_key is not None:
+            if api_key != _api_key:
+                raise ValueError("Gemini is already configured with another API key in this process; "
+                                 "give every app in it the same key (GEMINI_API_KEY and gemini_api_key1)")
+            return
+        if API_ENDPOINT:
+            genai.configure(api_key=api_key, client_options={"api_endpoint": API_ENDPOINT})
+        else:
+            genai.configure(api_key=api_key)
+        _api_key = api_key
+
+
+def get_model(name: str, generation_config: dict = None) -> genai.GenerativeModel:
+    """Shared GenerativeModel for ``name`` and ``generation_config``."""
+    # JSON key so nested settings (e.g. a response schema) can be part of it
+    key = (name, json.dumps(generation_config or {}, sort_keys=True))
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(
+                    name,
+                    generation_config=genai.GenerationConfig(**generation_config) if generation_config else None,
+                )
+                _models[key] = model
+    return model
+
+
+def warmup(*names: str):
+    """Build the named models and open their connections ahead of traffic.
+
+    ``count_tokens`` is a cheap round trip that forces channel and TLS
+    setup. It is bounded by GEMINI_WARMUP_TIMEOUT and failures are logged
+    and ignored, so startup never blocks on it; GEMINI_WARMUP=0 skips it.
+    """
+    if os.getenv("GEMINI_WARMUP", "1") != "1":
+        return
+    for name in names:
+        try:
+            get_model(name).count_tokens("warmup", request_options={"timeout": WARMUP_TIMEOUT, "retry": retry.Retry(timeout=WARMUP_TIMEOUT)})
+            log_event("gemini_warmed_up", sample_rate=1, model=name)
+        except Exception as e:
+            log_event("gemini_warmup_failed", level="warning", model=name, error=str(e))
+
+
+def reset():
+    """Drop all cached clients and the configured key."""
+    global _api_key
+    with _lock:
+        _models.clear()
+        _api_key = None
+
+
+def after_fork():
+    """Rebuild the SDK's clients in a freshly forked worker, keeping the default key."""
+    api_key = _api_key
+    reset()
+    if api_key is not None:
+        configure(api_key)
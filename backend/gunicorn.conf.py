@@ -0,0 +1,59 @@
+"""Production server settings for the Flask services.
+
+Each app on its own (threaded workers):
+    PORT=4000 gunicorn -c gunicorn.conf.py app:app
+    PORT=8888 gunicorn -c gunicorn.conf.py feedback:app
+Every service, including the WebSocket stream, in one ASGI process per worker (see asgi.py):
+    PORT=4000 gunicorn -c gunicorn.conf.py -k uvicorn_worker.UvicornWorker asgi:app
+
+The app is imported once in the master before workers fork
+(``preload_app``), so the exercise catalog, plan table, response schema,
+compiled normalizer patterns and caches are built once and shared by the
+workers copy-on-write; ``gc.freeze`` keeps the garbage collector from
+touching (and so copying) those pages in the workers. Gemini clients are
+rebuilt in each worker after the fork. Each worker serves its own
+``/metrics``.
+
+Reload gracefully with ``kill -HUP <master pid>``: new workers start and
+old ones finish their in-flight requests (up to GUNICORN_GRACEFUL_TIMEOUT)
+before exiting. Because the app is preloaded, HUP reuses the loaded
+code; to deploy new code without dropping requests send USR2 (start a new
+master) and then QUIT to the old one.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '4000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+# Requests handled at once per gthread worker; Gemini calls mostly wait on the network
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# Recycle workers after this many requests (0 = never) to bound slow memory growth
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")
+errorlog = "-"
+
+
+def pre_fork(server, worker):
+    # Everything allocated so far is shared with the workers; keep it out of GC passes
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import gemini_clients
+
+    gemini_clients.after_fork()
+
+
+def post_worker_init(worker):
+    # ASGI workers warm up in the app's lifespan startup instead (asgi.py)
+    if worker.cfg.worker_class_str == "gthread":
+        import gemini_clients
+
+        gemini_clients.warmup(gemini_clients.SUGGESTION_MODEL, gemini_clients.FEEDBACK_MODEL)
@@ -0,0 +1,180 @@
+"""Vectorized MediaPipe landmark processing.
+
+Turns buffered pose frames into an (N, 33, 3) NumPy array and computes
+joint angles, angular velocities and smoothing for every frame and both
+arms at once.
+"""
+import base64
+
+import numpy as np
+
+NUM_LANDMARKS = 33
+DEFAULT_FPS = 30
+SMOOTHING_WINDOW = 5
+MIN_VISIBILITY = 0.5
+
+# (shoulder, elbow, wrist, hip) landmark indices per arm
+ARMS = {
+    "right": (12, 14, 16, 24),
+    "left": (11, 13, 15, 23),
+}
+ARM_NAMES = tuple(ARMS)
+_SHOULDERS, _ELBOWS, _WRISTS, _HIPS = (np.array(idx) for idx in zip(*ARMS.values()))
+
+
+def frames_to_array(frames):
+    """Convert a list of JSON frames into (coords, visibility).
+
+    Each frame is either a dict with a ``landmarks`` list or the landmark
+    list itself. Returns coords of shape (N, 33, 3) and visibility of
+    shape (N, 33); missing landmarks get NaN coordinates and 0 visibility.
+    Raises ValueError when a landmark that is present lacks x, y or z.
+    """
+    coords = np.full((len(frames), NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+    visibility = np.zeros((len(frames), NUM_LANDMARKS), dtype=np.float32)
+    for i, frame in enumerate(frames):
+        points = frame.get("landmarks") if isinstance(frame, dict) else frame
+        if not points:
+            continue
+        points = points[:NUM_LANDMARKS]
+        try:
+            coords[i, :len(points)] = [(p["x"], p["y"], p["z"]) for p in points]
+            visibility[i, :len(points)] = [p.get("visibility", 1.0) for p in points]
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"frame {i}: every landmark needs numeric x, y and z") from e
+    return coords, visibility
+
+
+def unpack_frames(payload, channels: int = 4):
+    """Decode a packed little-endian float32 buffer into (coords, visibility).
+
+    ``payload`` is raw bytes or a base64 string laid out as N x 33 x channels,
+    where channels is 3 (x, y, z) or 4 (x, y, z, visibility).
+    """
+    if channels not in (3, 4):
+        raise ValueError("channels must be 3 or 4")
+    if isinstance(payload, str):
+        payload = base64.b64decode(payload)
+    values = np.frombuffer(payload, dtype="<f4")
+    frame_size = NUM_LANDMARKS * channels
+    if values.size == 0 or values.size % frame_size:
+        raise ValueError(f"Packed buffer length must be a multiple of {frame_size} float32 values")
+    values = values.reshape(-1, NUM_LANDMARKS, channels)
+    coords = values[..., :3].astype(np.float32)
+    if channels == 4:
+        visibility = values[..., 3].astype(np.float32)
+    else:
+        visibility = np.ones(values.shape[:2], dtype=np.float32)
+    return coords, visibility
+
+
+def frame_timestamps(count: int, timestamps=None, fps: float = DEFAULT_FPS):
+    """Frame times in seconds; falls back to a fixed frame rate.
+
+    Client timestamps are only used when they strictly increase, since
+    repeated or out-of-order times would divide by zero in
+    ``angular_velocity``.
+    """
+    if timestamps is not None and len(timestamps) == count:
+        # Clients send Date.now() milliseconds
+        try:
+            times = np.asarray(timestamps, dtype=np.float64)
+        except (TypeError, ValueError):
+            times = None
+        if times is not None and times.ndim == 1 and np.isfinite(times).all() and (np.diff(times) > 0).all():
+            return (times - times[0]) / 1000.0
+    return np.arange(count, dtype=np.float64) / fps
+
+
+def joint_angles(coords, a, b, c):
+    """Angle at joint b (degrees) in the image plane for every frame.
+
+    ``a``, ``b`` and ``c`` are landmark indices or equal-length index arrays;
+    the result has shape (N,) or (N, len(a)) respectively.
+    """
+    ba = coords[:, a, :2] - coords[:, b, :2]
+    bc = coords[:, c, :2] - coords[:, b, :2]
+    angle = np.abs(np.degrees(
+        np.arctan2(bc[..., 1], bc[..., 0]) - np.arctan2(ba[..., 1], ba[..., 0])
+    ))
+    return np.where(angle > 180, 360 - angle, angle)
+
+
+def smooth(values, window: int = SMOOTHING_WINDOW):
+    """Trailing moving average along the frame axis (causal, same shape).
+
+    NaN frames (landmark not visible) are left out of the average rather
+    than counted as 0; a window with no valid frame stays NaN.
+    """
+    if window <= 1 or len(values) == 0:
+        return values
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def angular_velocity(angles, times):
+    """Absolute angular velocity (degrees/second) along the frame axis."""
+    if len(angles) < 2:
+        return np.zeros_like(angles)
+    return np.abs(np.gradient(angles, times, axis=0))
+
+
+def arm_metrics(coords, visibility, times, window: int = SMOOTHING_WINDOW):
+    """Per-frame metrics for both arms.
+
+    Returns a dict of arrays shaped (N, 2) with columns ordered as
+    ``ARM_NAMES``: raw and smoothed elbow angle, angular velocity of the
+    smoothed angle, upper arm swing against the torso, shoulder-to-hip
+    length and a validity mask based on landmark visibility.
+    """
+    elbow_angle = joint_angles(coords, _SHOULDERS, _ELBOWS, _WRISTS)
+    arm_visible = (
+        (visibility[:, _SHOULDERS] >= MIN_VISIBILITY)
+        & (visibility[:, _ELBOWS] >= MIN_VISIBILITY)
+        & (visibility[:, _WRISTS] >= MIN_VISIBILITY)
+        & ~np.isnan(elbow_angle)
+    )
+    # Frames where the arm is not visible are left out of the average
+    smoothed = smooth(np.where(arm_visible, elbow_angle, np.nan), window)
+    hip_visible = visibility[:, _HIPS] >= MIN_VISIBILITY
+    upper_arm_swing = np.where(hip_visible, joint_angles(coords, _HIPS, _SHOULDERS, _ELBOWS), np.nan)
+    torso_length = np.where(hip_visible, coords[:, _HIPS, 1] - coords[:, _SHOULDERS, 1], np.nan)
+    return {
+        "elbow_angle": elbow_angle,
+        "smoothed_angle": smoothed,
+        "angular_velocity": angular_velocity(smoothed, times),
+        "upper_arm_swing": upper_arm_swing,
+        "torso_length": torso_length,
+        "valid": arm_visible,
+    }
+
+
+def select_arm(metrics: dict, arm: str) -> dict:
+    """Slice the (N, 2) metric arrays down to one arm."""
+    column = ARM_NAMES.index(arm)
+    return {name: values[:, column] for name, values in metrics.items()}
+
+
+def summarize(metrics: dict) -> dict:
+    """Compact per-arm summary of a batch for the JSON response."""
+    summary = {}
+    for column, arm in enumerate(ARM_NAMES):
+        valid = metrics["valid"][:, column]
+        if not valid.any():
+            summary[arm] = None
+            continue
+        angles = metrics["smoothed_angle"][valid, column]
+        velocity = metrics["angular_velocity"][valid, column]
+        velocity = velocity[np.isfinite(velocity)]
+        summary[arm] = {
+            "frames": int(valid.sum()),
+            "min_angle": round(float(angles.min()), 1),
+            "max_angle": round(float(angles.max()), 1),
+            "range_of_motion": round(float(angles.max() - angles.min()), 1),
+            "peak_velocity": round(float(velocity.max()), 1) if velocity.size else None,
+        }
+    return summary
@@ -0,0 +1,154 @@
+"""Precomputed exercise plans for every canonical condition.
+
+An offline batch job walks the condition grid (see condition_normalizer),
+asks Gemini for each plan with the same prompt the endpoint uses, keeps
+only plans that pass ``validate_plan`` and writes them to a JSON table.
+suggest-exercises loads the table once and answers normalizable requests
+from memory; unusual descriptions still get a live plan.
+
+Build (or resume an interrupted build) with:
+    python plan_table.py --workers 4
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+import gemini_clients
+from condition_normalizer import ConditionKey, describe, grid
+from exercise_catalog import SUGGESTION_GENERATION_CONFIG, parse_plan, suggestion_prompt, validate_plan
+from yantra_common.instrumentation import log_event
+
+PLAN_TABLE_PATH = os.getenv("EXERCISE_PLAN_TABLE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "exercise_plans.json"))
+TABLE_VERSION = 1
+CHECKPOINT_EVERY = 50
+
+
+class PlanTable:
+    """Read-only in-memory table of validated plans with lookup counters."""
+
+    def __init__(self, plans: dict = None, meta: dict = None):
+        self.plans = plans or {}
+        self.meta = meta or {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.unusual = 0
+
+    @classmethod
+    def load(cls, path: str = PLAN_TABLE_PATH) -> "PlanTable":
+        if not os.path.exists(path):
+            log_event("plan_table_missing", level="warning", path=path, detail="every request is generated live")
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != TABLE_VERSION:
+            log_event("plan_table_version_mismatch", level="warning", path=path, version=data.get("version"))
+            return cls()
+        plans = data.get("plans", {})
+        log_event("plan_table_loaded", sample_rate=1, path=path, plans=len(plans))
+        return cls(plans, {key: value for key, value in data.items() if key != "plans"})
+
+    def get(self, condition: Optional[ConditionKey]):
+        """Stored plan for ``condition``; None for unusual requests or missing plans."""
+        plan = self.plans.get(condition.key) if condition is not None else None
+        with self._lock:
+            if condition is None:
+                self.unusual += 1
+            elif plan is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return plan
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.unusual
+            return {
+                "plans": len(self.plans),
+                "hits": self.hits,
+                "misses": self.misses,
+                "unusual": self.unusual,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "generated_at": self.meta.get("generated_at"),
+                "model": self.meta.get("model"),
+            }
+
+
+def _save(path: str, plans: dict, model_name: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": TABLE_VERSION,
+            "model": model_name,
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "plans": dict(sorted(plans.items())),
+        }, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def generate_plan(model, condition: ConditionKey, attempts: int = 2):
+    """Validated plan for ``condition``, or None if Gemini never produced one."""
+    prompt = suggestion_prompt(**describe(condition))
+    for _ in range(attempts):
+        plan = validate_plan(parse_plan(model.generate_content(prompt).text)[0])
+        if plan is not None:
+            return plan
+    return None
+
+
+def build(model_name: str, path: str = PLAN_TABLE_PATH, workers: int = 4, limit: int = None, attempts: int = 2) -> dict:
+    """Generate plans for every grid condition not already in the table at ``path``."""
+    plans = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            plans = json.load(f).get("plans", {})
+    todo = [condition for condition in grid() if condition.key not in plans][:limit]
+    print(f"{len(plans)} plans already stored, generating {len(todo)}")
+
+    # Deterministic output so a rebuilt table only changes when the model does
+    model = gemini_clients.get_model(model_name, {**SUGGESTION_GENERATION_CONFIG, "temperature": 0})
+    rejected, failed = [], []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(generate_plan, model, condition, attempts): condition for condition in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            condition = futures[future]
+            try:
+                plan = future.result()
+            except Exception as e:
+                print(f"Failed {condition.key}: {e}")
+                failed.append(condition.key)
+                continue
+            if plan is None:
+                rejected.append(condition.key)
+            else:
+                plans[condition.key] = plan
+            if done % CHECKPOINT_EVERY == 0:
+                _save(path, plans, model_name)
+                print(f"{done}/{len(todo)} generated")
+    _save(path, plans, model_name)
+    print(f"Stored {len(plans)} plans at {path}; {len(rejected)} failed validation, {len(failed)} errored "
+          "(rerun to retry them)")
+    return {"plans": len(plans), "rejected": rejected, "failed": failed}
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Precompute exercise plans for every canonical condition")
+    parser.add_argument("--path", default=PLAN_TABLE_PATH)
+    parser.add_argument("--model", default=gemini_clients.SUGGESTION_MODEL)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=None, help="generate at most this many new plans")
+    parser.add_argument("--attempts", type=int, default=2, help="tries per condition before giving up")
+    args = parser.parse_args()
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable is not set.")
+    gemini_clients.configure(api_key)
+    build(args.model, args.path, args.workers, args.limit, args.attempts)
@@ -0,0 +1,26 @@
+import importlib
+
+import pytest
+from starlette.testclient import TestClient
+
+import gemini_clients
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setenv("gemini_api_key1", "test-key")
+    asgi = importlib.import_module("asgi")
+    # No lifespan: startup would warm up real Gemini clients
+    return TestClient(asgi.app)
+
+
+@pytest.mark.parametrize("path", ["/health", "/cache-stats", "/coalescing-stats",
+                                  "/live-feedback/cache-stats", "/api/coalescing-stats"])
+def test_every_app_is_reachable(client, path):
+    assert client.get(path).status_code == 200
+
+
+def test_second_key_in_one_process_fails_fast(client):
+    with pytest.raises(ValueError):
+        gemini_clients.configure("another-key")
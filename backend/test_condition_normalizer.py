@@ -0,0 +1,37 @@
+from condition_normalizer import ConditionKey, describe, grid, normalize
+
+
+def test_everyday_wording_maps_to_one_key():
+    condition = normalize("Sprained ankle", "my left ankle hurts", "6", "about 3 weeks")
+    assert condition == ConditionKey("sprain", "ankle", "moderate", "acute")
+    assert condition.key == "sprain|ankle|moderate|acute"
+
+
+def test_severity_scores_and_duration_bands():
+    assert normalize("knee pain", "", "2/10", "two months").severity == "mild"
+    assert normalize("knee pain", "", "8", "two months").duration == "subacute"
+    assert normalize("knee pain", "", "Severe", "over a year").duration == "chronic"
+    assert normalize("knee pain", "", "mild", "yesterday").duration == "acute"
+
+
+def test_specific_injury_overrides_generic_terms():
+    assert normalize("torn knee", "it hurts", "mild", "a week").injury == "tear"
+
+
+def test_unusual_requests_fall_back_to_live_generation():
+    # Durations with unrecognized words are not guessed at
+    assert normalize("sprained ankle", "", "mild", "less than a week") is None
+    assert normalize("sprained ankle", "", "unbearable", "a week") is None
+    assert normalize("sprained ankle", "", "11", "a week") is None
+    assert normalize("sprained ankle", "after playing football", "mild", "a week") is None
+    assert normalize("sprained ankle and wrist", "", "mild", "a week") is None
+    assert normalize("ankle", "", "mild", "a week") is None
+
+
+def test_grid_covers_each_key_once():
+    keys = [condition.key for condition in grid()]
+    assert len(keys) == len(set(keys))
+    assert "sprain|ankle|moderate|acute" in keys
+    assert describe(ConditionKey("sprain", "ankle", "moderate", "chronic")) == {
+        "injury_type": "ankle sprain", "duration": "more than 12 weeks", "severity": "Moderate", "user_message": "",
+    }
@@ -0,0 +1,90 @@
+import json
+
+import exercise_catalog as ec
+
+
+def _item(name, description="Slow and controlled", frequency="Daily", duration="3 sets of 10"):
+    return {"name": name, "description": description, "frequency": frequency, "duration": duration}
+
+
+PLAN = [_item("Squats"), _item("Plank"), _item("Bridges")]
+
+
+def test_well_formed_reply_is_valid():
+    exercises, status, repairs = ec.parse_plan(json.dumps(PLAN))
+    assert status == "valid"
+    assert repairs == []
+    assert [exercise["name"] for exercise in exercises] == ["Squats", "Plank", "Bridges"]
+
+
+def test_exercises_wrapper_is_accepted():
+    exercises, status, _ = ec.parse_plan(json.dumps({"exercises": PLAN}))
+    assert status == "valid"
+    assert len(exercises) == 3
+
+
+def test_fenced_json_is_unwrapped():
+    exercises, status, repairs = ec.parse_plan(f"```json\n{json.dumps(PLAN)}\n```")
+    assert status == "repaired"
+    assert repairs == ["code_fence"]
+    assert len(exercises) == 3
+
+
+def test_truncated_json_keeps_complete_items():
+    text = json.dumps(PLAN)[:-30]
+    exercises, status, repairs = ec.parse_plan(text)
+    assert status == "repaired"
+    assert "truncated_json" in repairs
+    assert [exercise["name"] for exercise in exercises] == ["Squats", "Plank"]
+
+
+def test_near_miss_names_are_mapped_onto_the_catalog():
+    exercises, _, repairs = ec.parse_plan(json.dumps([_item("squat"), _item("Calf Raise")]))
+    assert [exercise["name"] for exercise in exercises] == ["Squats", "Calf Raises"]
+    assert repairs.count("renamed") == 2
+
+
+def test_unknown_names_and_empty_fields_are_dropped():
+    items = [_item("Squats"), _item("Juggling"), _item("Plank", frequency=""), "Lunges"]
+    exercises, status, repairs = ec.parse_plan(json.dumps(items))
+    assert status == "repaired"
+    assert [exercise["name"] for exercise in exercises] == ["Squats"]
+    assert repairs.count("dropped_invalid") == 3
+
+
+def test_legacy_line_format_is_parsed():
+    text = (
+        "Here is your plan:\n"
+        "Squats: Lower body strength | Frequency: Daily | Duration: 3 sets of 10\n"
+        "'Plank': Core stability | Frequency: 3 times a week | Duration: 30 seconds\n"
+    )
+    exercises, status, repairs = ec.parse_plan(text)
+    assert status == "repaired"
+    assert repairs == ["legacy_format"]
+    assert exercises[1] == {"name": "Plank", "description": "Core stability",
+                            "frequency": "3 times a week", "duration": "30 seconds"}
+
+
+def test_duplicates_are_dropped():
+    exercises, _, repairs = ec.parse_plan(json.dumps([_item("Squats"), _item("squats"), _item("Plank")]))
+    assert [exercise["name"] for exercise in exercises] == ["Squats", "Plank"]
+    assert repairs == ["dropped_duplicate"]
+
+
+def test_long_plans_are_trimmed():
+    names = ["Squats", "Plank", "Bridges", "Lunges", "Push-ups", "Clamshells"]
+    exercises, status, repairs = ec.parse_plan(json.dumps([_item(name) for name in names]))
+    assert status == "repaired"
+    assert repairs == ["trimmed"]
+    assert [exercise["name"] for exercise in exercises] == names[:ec.MAX_PLAN_EXERCISES]
+
+
+def test_unusable_reply_fails():
+    assert ec.parse_plan("I can't help with that.") == ([], "failed", [])
+    assert ec.parse_plan(None)[1] == "failed"
+
+
+def test_validate_plan_needs_two_to_four_distinct_exercises():
+    assert ec.validate_plan([_item("Squats")]) is None
+    assert ec.validate_plan([_item("Squats"), _item("Squats")]) is None
+    assert ec.validate_plan([_item("squats"), _item("Plank")])[0]["name"] == "Squats"
@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import feedback_cache as fc
+from feedback_cache import FeedbackCache, make_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    def __init__(self, values=None, broken=False):
+        self.values = dict(values or {})
+        self.broken = broken
+
+    def get(self, key):
+        if self.broken:
+            raise ConnectionError("redis down")
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        if self.broken:
+            raise ConnectionError("redis down")
+        self.values[key] = value.encode("utf-8")
+
+
+def test_key_ignores_jitter_within_a_bucket():
+    base = make_key("up", 3, {"elbow_angle": 91.0, "shoulder_drift": 0.011})
+    assert make_key("up", 4, {"elbow_angle": 99.0, "shoulder_drift": 0.019}) == base
+    assert make_key("up", 3, {"elbow_angle": 106.0, "shoulder_drift": 0.011}) != base
+    assert make_key("down", 3, {"elbow_angle": 91.0, "shoulder_drift": 0.011}) != base
+    assert make_key("up", 3, {"elbow_angle": 91.0, "shoulder_drift": 0.011}, "swinging") != base
+    # Late reps share one phase bucket; missing values get a placeholder
+    assert make_key(None, 50, {}) == make_key(None, 500, {}) == "-|3|-|-|-"
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fc.time, "monotonic", clock)
+    cache = FeedbackCache(ttl=10)
+    cache.set("key", "Keep going")
+    clock.now += 9
+    assert cache.get("key") == "Keep going"
+    clock.now += 2
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = FeedbackCache(max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    cache.get("a")
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_shared_hits_come_from_redis():
+    cache = FeedbackCache()
+    cache._redis = FakeRedis({fc.KEY_PREFIX + "key": b"From another worker"})
+    assert cache.get("key") == "From another worker"
+    cache._redis = None
+    # Copied into the local map on the shared hit
+    assert cache.get("key") == "From another worker"
+    assert cache.stats()["shared_hits"] == 1
+
+
+def test_unreachable_redis_falls_back_to_memory(monkeypatch):
+    def unavailable(url, **kwargs):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(fc, "redis", SimpleNamespace(Redis=SimpleNamespace(from_url=unavailable)))
+    cache = FeedbackCache(redis_url="redis://localhost:1")
+    assert cache.stats()["shared_backend"] is None
+
+    cache = FeedbackCache()
+    cache._redis = FakeRedis(broken=True)
+    cache.set("key", "Local")
+    assert cache.get("key") == "Local"
+    assert cache.get("other") is None
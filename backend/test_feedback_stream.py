@@ -0,0 +1,21 @@
+import importlib
+
+import pytest
+from starlette.testclient import TestClient
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("gemini_api_key1", "test-key")
+    feedback_stream = importlib.import_module("feedback_stream")
+    # No lifespan: the app's startup would warm up a real Gemini client
+    return TestClient(feedback_stream.app)
+
+
+@pytest.mark.parametrize("payload", ["[1, 2]", '"x"', "3", "null", "not json"])
+def test_invalid_text_frames_are_rejected_without_closing_the_stream(client, payload):
+    with client.websocket_connect("/ws/live-feedback?userId=test") as websocket:
+        websocket.send_text(payload)
+        assert "error" in websocket.receive_json()
+        websocket.send_text('{"landmarks": [1, 2, 3]}')
+        assert websocket.receive_json()["issue"] == "not_visible"
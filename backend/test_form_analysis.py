@@ -0,0 +1,59 @@
+import importlib
+
+import form_analysis as fa
+
+
+def _landmarks(wrist_x: float, wrist_y: float) -> list:
+    points = [{"x": 0.5, "y": 0.5, "z": 0.0, "visibility": 1.0} for _ in range(33)]
+    points[fa.RIGHT_SHOULDER] = {"x": 0.5, "y": 0.3, "z": 0.0, "visibility": 1.0}
+    points[fa.RIGHT_ELBOW] = {"x": 0.5, "y": 0.5, "z": 0.0, "visibility": 1.0}
+    points[fa.RIGHT_WRIST] = {"x": wrist_x, "y": wrist_y, "z": 0.0, "visibility": 1.0}
+    points[fa.RIGHT_HIP] = {"x": 0.5, "y": 0.7, "z": 0.0, "visibility": 1.0}
+    return points
+
+
+EXTENDED = _landmarks(0.5, 0.7)  # elbow angle 180
+HALF_CURL = _landmarks(0.7, 0.5)  # elbow angle 90
+
+
+def test_first_frame_is_answered_by_the_rules():
+    analyzer = fa.FormAnalyzer()
+    assert not analyzer.analyze("a", 0, "down", EXTENDED, now=1000.0).needs_llm
+    assert not analyzer.analyze("a", 0, "down", EXTENDED, now=1003.0).needs_llm
+    assert analyzer.analyze("a", 0, "down", EXTENDED, now=1000.0 + fa.ENCOURAGEMENT_INTERVAL).needs_llm
+
+
+def test_range_is_judged_at_single_frame_cadence():
+    analyzer = fa.FormAnalyzer()
+    analyzer.analyze("a", 0, "up", HALF_CURL, now=0.0)
+    result = analyzer.analyze("a", 1, "down", EXTENDED, now=3.0)
+    assert result.issue == "partial_top"
+
+
+def test_feedback_requires_session_id(monkeypatch):
+    monkeypatch.setenv("gemini_api_key1", "test-key")
+    feedback = importlib.import_module("feedback")
+    client = feedback.app.test_client()
+    response = client.post("/live-feedback", json={"landmarks": EXTENDED, "rep": 0, "stage": "down"})
+    assert response.status_code == 400
+    response = client.post("/live-feedback/batch", json={"frames": [{"landmarks": EXTENDED}], "rep": 0})
+    assert response.status_code == 400
+
+
+def test_least_recently_seen_session_is_evicted():
+    analyzer = fa.FormAnalyzer(max_sessions=2)
+    analyzer.analyze("a", 0, "up", HALF_CURL, now=0.0)
+    analyzer.analyze("b", 0, "up", HALF_CURL, now=1.0)
+    analyzer.analyze("a", 0, "up", HALF_CURL, now=2.0)
+    analyzer.analyze("c", 0, "up", HALF_CURL, now=3.0)
+    assert list(analyzer._states) == ["a", "c"]
+    # "a" kept its rep state: its rep is judged, "b" starts over
+    assert analyzer.analyze("a", 1, "down", EXTENDED, now=4.0).issue == "partial_top"
+    assert analyzer.analyze("b", 1, "down", EXTENDED, now=4.0).issue is None
+
+
+def test_reset_forgets_a_session():
+    analyzer = fa.FormAnalyzer()
+    analyzer.analyze("a", 0, "up", HALF_CURL, now=0.0)
+    analyzer.reset("a")
+    assert analyzer.analyze("a", 1, "down", EXTENDED, now=3.0).issue is None
@@ -0,0 +1,20 @@
+import gemini_clients
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def count_tokens(self, contents, request_options=None):
+        self.calls.append(request_options["timeout"])
+
+
+def test_warmup_is_bounded_and_can_be_disabled(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(gemini_clients, "get_model", lambda name: model)
+    gemini_clients.warmup(gemini_clients.FEEDBACK_MODEL)
+    assert model.calls == [gemini_clients.WARMUP_TIMEOUT]
+
+    monkeypatch.setenv("GEMINI_WARMUP", "0")
+    gemini_clients.warmup(gemini_clients.FEEDBACK_MODEL)
+    assert len(model.calls) == 1
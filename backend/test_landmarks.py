@@ -0,0 +1,83 @@
+import importlib
+import json
+
+import numpy as np
+import pytest
+
+import landmarks as lm
+
+
+def _frame(wrist_y: float, timestamp: float) -> dict:
+    points = [{"x": 0.5, "y": 0.5, "z": 0.0, "visibility": 1.0} for _ in range(lm.NUM_LANDMARKS)]
+    points[12] = {"x": 0.5, "y": 0.3, "z": 0.0, "visibility": 1.0}      # right shoulder
+    points[14] = {"x": 0.5, "y": 0.5, "z": 0.0, "visibility": 1.0}      # right elbow
+    points[16] = {"x": 0.6, "y": wrist_y, "z": 0.0, "visibility": 1.0}  # right wrist
+    points[24] = {"x": 0.5, "y": 0.7, "z": 0.0, "visibility": 1.0}      # right hip
+    return {"landmarks": points, "timestamp": timestamp}
+
+
+def test_repeated_timestamps_fall_back_to_fps():
+    times = lm.frame_timestamps(3, [1000, 1000, 1000], fps=10)
+    assert np.allclose(times, [0.0, 0.1, 0.2])
+    times = lm.frame_timestamps(3, [1000, 1100, 1050], fps=10)
+    assert np.allclose(times, [0.0, 0.1, 0.2])
+    times = lm.frame_timestamps(3, [1000, 1050, 1200], fps=10)
+    assert np.allclose(times, [0.0, 0.05, 0.2])
+
+
+def test_summary_is_finite_with_repeated_timestamps():
+    coords, visibility = lm.frames_to_array([_frame(y, 1000) for y in (0.7, 0.6, 0.5)])
+    times = lm.frame_timestamps(len(coords), [1000, 1000, 1000])
+    summary = lm.summarize(lm.arm_metrics(coords, visibility, times))
+    assert np.isfinite(summary["right"]["peak_velocity"])
+    json.dumps(summary, allow_nan=False)
+
+
+def test_smoothing_skips_missing_frames():
+    angles = np.array([[90.0], [90.0], [np.nan], [90.0], [90.0]])
+    assert np.allclose(lm.smooth(angles, window=3), 90.0)
+    assert np.isnan(lm.smooth(np.array([[np.nan], [np.nan]]), window=3)).all()
+
+
+def test_hidden_arm_frame_does_not_pull_smoothed_angle_down():
+    frames = [_frame(0.7, 0) for _ in range(5)]
+    frames[2] = {"landmarks": []}
+    coords, visibility = lm.frames_to_array(frames)
+    metrics = lm.arm_metrics(coords, visibility, lm.frame_timestamps(len(coords)))
+    smoothed = lm.select_arm(metrics, "right")["smoothed_angle"]
+    assert np.allclose(smoothed, smoothed[0])
+
+
+def test_batch_endpoint_returns_valid_json_for_repeated_timestamps(monkeypatch):
+    monkeypatch.setenv("gemini_api_key1", "test-key")
+    feedback = importlib.import_module("feedback")
+
+    def unavailable(prompt):
+        raise RuntimeError("Gemini unavailable in tests")
+
+    monkeypatch.setattr(feedback, "_generate_feedback", unavailable)
+    frames = [_frame(y, 1000) for y in (0.7, 0.6, 0.5)]
+    response = feedback.app.test_client().post(
+        "/live-feedback/batch", json={"frames": frames, "rep": 1, "stage": "up", "sessionId": "test"}
+    )
+    assert response.status_code == 200
+    # NaN is not valid JSON; parse_constant only sees NaN/Infinity
+    body = json.loads(response.get_data(as_text=True), parse_constant=lambda value: pytest.fail(value))
+    assert np.isfinite(body["arms"]["right"]["peak_velocity"])
+
+
+@pytest.mark.parametrize("body", [
+    {"frames": [{"landmarks": [{"x": 0.5, "y": 0.5}]}]},
+    {"frames": [{"landmarks": ["not a point"]}]},
+    {"frames": [_frame(0.7, 0)], "fps": "abc"},
+    {"frames": [_frame(0.7, 0)], "fps": 0},
+])
+def test_batch_endpoint_rejects_malformed_input(monkeypatch, body):
+    monkeypatch.setenv("gemini_api_key1", "test-key")
+    feedback = importlib.import_module("feedback")
+    response = feedback.app.test_client().post("/live-feedback/batch", json={**body, "sessionId": "test"})
+    assert response.status_code == 400
+
+
+def test_unusable_timestamps_fall_back_to_fps():
+    assert np.allclose(lm.frame_timestamps(2, ["a", "b"], fps=10), [0.0, 0.1])
@@ -0,0 +1,56 @@
+import json
+from types import SimpleNamespace
+
+import plan_table as pt
+from condition_normalizer import ConditionKey
+
+CONDITION = ConditionKey("sprain", "ankle", "mild", "acute")
+PLAN = [
+    {"name": "Calf Raises", "description": "Rise onto the toes", "frequency": "Daily", "duration": "2 sets of 12"},
+    {"name": "Squats", "description": "Partial range", "frequency": "Daily", "duration": "2 sets of 10"},
+]
+
+
+class FakeModel:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        return SimpleNamespace(text=self.replies.pop(0))
+
+
+def test_lookups_are_counted():
+    table = pt.PlanTable({CONDITION.key: PLAN})
+    assert table.get(CONDITION) == PLAN
+    assert table.get(CONDITION._replace(severity="severe")) is None
+    assert table.get(None) is None
+    stats = table.stats()
+    assert (stats["hits"], stats["misses"], stats["unusual"]) == (1, 1, 1)
+    assert stats["hit_rate"] == round(1 / 3, 4)
+
+
+def test_load_round_trips_a_saved_table(tmp_path):
+    path = str(tmp_path / "plans.json")
+    pt._save(path, {CONDITION.key: PLAN}, "test-model")
+    table = pt.PlanTable.load(path)
+    assert table.get(CONDITION) == PLAN
+    assert table.stats()["model"] == "test-model"
+
+
+def test_missing_or_outdated_table_loads_empty(tmp_path):
+    assert pt.PlanTable.load(str(tmp_path / "missing.json")).plans == {}
+    path = tmp_path / "old.json"
+    path.write_text(json.dumps({"version": pt.TABLE_VERSION + 1, "plans": {CONDITION.key: PLAN}}))
+    assert pt.PlanTable.load(str(path)).plans == {}
+
+
+def test_generate_plan_retries_until_a_plan_validates():
+    model = FakeModel(["not a plan", json.dumps(PLAN)])
+    assert pt.generate_plan(model, CONDITION, attempts=2) == PLAN
+    assert model.calls == 2
+
+    model = FakeModel([json.dumps(PLAN[:1])] * 2)
+    assert pt.generate_plan(model, CONDITION, attempts=2) is None
+    assert model.calls == 2
@@ -0,0 +1 @@
+"""Code shared by the Yantra services (backend/ and ChatBackend/)."""
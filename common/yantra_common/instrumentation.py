@@ -0,0 +1,298 @@
+"""Per-stage latency metrics, Prometheus text export and sampled logging.
+
+Shared by the exercise/feedback services (backend/) and the chat
+service (ChatBackend/). Each app process keeps its own in-memory
+registry and serves it at ``/metrics`` in the Prometheus text format
+(no client library needed):
+
+- ``http_request_duration_seconds`` / ``http_requests_total`` /
+  ``http_requests_in_flight`` per route, from ``instrument_flask`` or
+  ``instrument_fastapi``,
+- ``stage_duration_seconds{stage=...}`` for request parse, retrieval,
+  prompt build, LLM call, reply parse, serialize, ... via ``timed``,
+- ``llm_tokens_total`` from Gemini usage metadata (``record_usage``),
+- ``cache_lookups_total{cache, result}`` (``record_cache``),
+- gauges read from existing ``stats()`` methods at scrape time
+  (``add_collector``).
+
+``log_event`` replaces unconditional prints of prompts and replies: it
+writes one JSON line for a LOG_SAMPLE_RATE fraction of events (errors
+always), so logging cost stays flat at volume. The rate is read from
+the environment on first use, after the app has loaded its ``.env``, or
+set explicitly with ``set_log_sample_rate``.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_LOG_SAMPLE_RATE = 0.01
+# Seconds; covers in-process stages (sub-millisecond) up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_logger = logging.getLogger("yantra")
+if not _logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    _logger.addHandler(_handler)
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # per-bucket counts (last slot is +Inf), then sum
+                counts = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts[0][bisect_left(self.buckets, value)] += 1
+            counts[1] += value
+
+    def _samples(self, key, value):
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, prefix, stats_func):
+        """Export the numeric values of ``stats_func()`` as ``<prefix>_<key>`` gauges at scrape time."""
+        self.collectors.append((prefix, stats_func))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for prefix, stats_func in self.collectors:
+            try:
+                stats = stats_func()
+            except Exception as e:
+                log_event("metrics_collector_failed", level="error", collector=prefix, error=str(e))
+                continue
+            for name, value in _flatten(prefix, stats):
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(prefix, stats):
+    for key, value in stats.items():
+        name = f"{prefix}_{key}".replace("-", "_").replace(".", "_")
+        if isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+        elif isinstance(value, dict):
+            yield from _flatten(name, value)
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route")))
+REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "Requests by route and status", ("method", "route", "status")))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Requests currently being handled", ("route",)))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "stage_duration_seconds", "Time spent in each request stage", ("stage",)))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "llm_tokens_total", "Gemini tokens by model and kind (prompt/completion)", ("model", "kind")))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "cache_lookups_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result")))
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the wall time of the enclosed block under ``stage``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+def record_usage(response, model: str):
+    """Add a Gemini response's prompt/completion token counts, when it reports them."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    LLM_TOKENS.inc(getattr(usage, "prompt_token_count", 0) or 0, model=model, kind="prompt")
+    LLM_TOKENS.inc(getattr(usage, "candidates_token_count", 0) or 0, model=model, kind="completion")
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+_log_sample_rate = None
+
+
+def set_log_sample_rate(rate: float):
+    """Fraction of info events ``log_event`` writes (default: LOG_SAMPLE_RATE from the environment)."""
+    global _log_sample_rate
+    _log_sample_rate = float(rate)
+
+
+def log_event(event: str, level: str = "info", sample_rate: float = None, **fields):
+    """Structured JSON log line; info events are sampled, warnings and errors always written."""
+    if sample_rate is None:
+        if _log_sample_rate is None:
+            set_log_sample_rate(os.getenv("LOG_SAMPLE_RATE", DEFAULT_LOG_SAMPLE_RATE))
+        sample_rate = _log_sample_rate
+    if level == "info" and random.random() >= sample_rate:
+        return
+    record = {"ts": round(time.time(), 3), "level": level, "event": event, **fields}
+    _logger.log(logging.getLevelName(level.upper()), json.dumps(record, default=str))
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+def instrument_flask(app):
+    """Time every request by route and serve ``/metrics``."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_started = time.perf_counter()
+        g._metrics_route = request.url_rule.rule if request.url_rule else "unmatched"
+        IN_FLIGHT.inc(route=g._metrics_route)
+
+    @app.after_request
+    def _record_request(response):
+        if hasattr(g, "_metrics_started"):
+            REQUESTS.inc(method=request.method, route=g._metrics_route, status=response.status_code)
+            REQUEST_SECONDS.observe(time.perf_counter() - g._metrics_started,
+                                    method=request.method, route=g._metrics_route)
+        return response
+
+    @app.teardown_request
+    def _finish_request(_exc):
+        if hasattr(g, "_metrics_route"):
+            IN_FLIGHT.dec(route=g._metrics_route)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(render_metrics(), mimetype="text/plain", content_type=CONTENT_TYPE)
+
+
+def instrument_fastapi(app):
+    """Time every HTTP request by route template and serve ``/metrics``.
+
+    Streaming responses are timed to their first byte.
+    """
+    from fastapi import Request
+    from fastapi.responses import Response
+    from starlette.routing import Match
+
+    def route_template(scope):
+        for route in app.router.routes:
+            if route.matches(scope)[0] == Match.FULL:
+                return route.path
+        return "unmatched"
+
+    @app.middleware("http")
+    async def _metrics_middleware(request: Request, call_next):
+        started = time.perf_counter()
+        route = route_template(request.scope)
+        IN_FLIGHT.inc(route=route)
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            IN_FLIGHT.dec(route=route)
+            REQUESTS.inc(method=request.method, route=route, status=status)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -0,0 +1,113 @@
+"""Single-flight coalescing of identical Gemini calls.
+
+Bursts of identical requests (a class of patients starting the same
+program, several clients in the same pose state, sessions on the same
+document asking the same question) would each make their own Gemini
+call. ``do(key, func)`` runs ``func`` once per key at a time:
+callers that arrive while a call for the same key is in flight wait for
+it and share its result (or its exception) instead of calling Gemini
+again. Nothing is kept once the call finishes; reuse after that is the
+caches' job.
+
+``SingleFlight`` is for the threaded Flask apps, ``AsyncSingleFlight``
+for the asyncio servers (the feedback stream and the chat service).
+"""
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Counters:
+    def __init__(self):
+        self.upstream = 0
+        self.coalesced = 0
+
+    def _stats(self, in_flight: int) -> dict:
+        calls = self.upstream + self.coalesced
+        return {
+            "calls": calls,
+            "upstream": self.upstream,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / calls, 4) if calls else 0.0,
+            "in_flight": in_flight,
+        }
+
+
+class SingleFlight(_Counters):
+    """Thread-safe single-flight group."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        """Result of ``func()``, shared with concurrent callers using the same ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.upstream += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return self._stats(len(self._calls))
+
+
+class AsyncSingleFlight(_Counters):
+    """Single-flight group for coroutines on one event loop.
+
+    The shared call runs as its own task, so a caller that is cancelled
+    (e.g. its client disconnected) does not cancel it for the others.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._tasks = {}
+
+    async def do(self, key, func):
+        """Result of ``await func()``, shared with concurrent callers using the same ``key``."""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.upstream += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so an error with no waiters left is not reported as unhandled
+
+    def stats(self) -> dict:
+        return self._stats(len(self._tasks))